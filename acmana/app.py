@@ -1,3 +1,4 @@
+import concurrent.futures
 import datetime
 import json
 import logging
@@ -9,15 +10,38 @@ import acmana
 from acmana.crawler.nowcoder.contest import NowcoderContestCrawler
 from acmana.crawler.nowcoder.title_retriver import NowcoderContestRetriever
 from acmana.crawler.vjudge.contest import VjudgeContestCrawler
+from acmana.crawler.vjudge.contest.parallel_simulation import (
+    simulate_contests_in_parallel,
+)
 from acmana.crawler.vjudge.title_retriver import VjudgeContestRetriever
-from acmana.export.nowcoder.nowcoder_ranking import NowcoderExcelBook
-from acmana.export.vjudge.vjudge_ranking import VjudgeExcelBook
+from acmana.export.activity import ActivityExcelBook
+from acmana.export.master_scoreboard import MasterExcelBook
+from acmana.export.nowcoder.nowcoder_ranking import (
+    NowcoderExcelBook,
+    NowcoderExportData,
+)
+from acmana.export.vjudge.rescoring import (
+    RescoringExcelBook,
+    ScoringRules,
+    VjudgeRescoringData,
+)
+from acmana.export.vjudge.vjudge_ranking import (
+    VjudgeExcelBook,
+    VjudgeExportData,
+)
+from acmana.models import use_read_only_engine
+from acmana.models.contest.nowcoder_contest import NowcoderContest
 from acmana.models.contest.vjudge_contest import VjudgeContest
+from acmana.models.rating.nowcoder_rating import NowcoderRating
+from acmana.models.rating.vjudge_rating import VjudgeRating
 
 logger = logging.getLogger(__name__)
 
 
 def retrive_vjudge_contests():
+    # 并行模拟：先爬取所有比赛，再在多个进程中同时模拟，最后一起提交
+    parallel: bool = acmana.config["vjudge"]["parallel_simulation"]
+    vjudge_contest_crawlers: list[VjudgeContestCrawler] = []
     for div, instance in dict(acmana.config["vjudge"]["instances"]).items():
         logger.info(
             f"Retriving {div} contests from title_prefix '{instance['title_prefix']}'......"
@@ -33,7 +57,9 @@ def retrive_vjudge_contests():
                 continue
 
             try:
-                vjudge_contest_crawler = VjudgeContestCrawler(contest.id, div=div)
+                vjudge_contest_crawler = VjudgeContestCrawler(
+                    contest.id, div=div, simulate=not parallel
+                )
             except requests.exceptions.JSONDecodeError:
                 logger.critical(f"JSONDecodeError: {contest}。这场比赛可能设置有密码，跳过......")
                 continue
@@ -43,7 +69,13 @@ def retrive_vjudge_contests():
                     f"请检查现在是否还设有密码并 unset 环境变量 `DEBUG_CACHE`"
                 )
             else:
-                vjudge_contest_crawler.db_vjudge_contest.commit_to_db()
+                if parallel:
+                    vjudge_contest_crawlers.append(vjudge_contest_crawler)
+                else:
+                    vjudge_contest_crawler.db_vjudge_contest.commit_to_db()
+
+    if parallel:
+        simulate_contests_in_parallel(vjudge_contest_crawlers)
 
 
 def retrive_nowcoder_contests():
@@ -69,73 +101,158 @@ def retrive_nowcoder_contests():
             nowcoder_contest_crawler.simulate_contest()
 
 
-def export_vjudge_contests_to_excel():
-    """将 `数据库` 中的 VjudgeContest 导出到 Excel 文件中"""
-    for div, instance in dict(acmana.config["vjudge"]["instances"]).items():
-        logger.info(
-            f"Exporting {div} contests from title_prefix '{instance['title_prefix']}'......"
-        )
-        total_excel_file_path: str = os.path.join(
-            "outputs", instance["export_filename"] + "_All_Contestant.xlsx"
-        )
-        logger.warning(f"Exporting to {total_excel_file_path}")
-        total_excel_book = VjudgeExcelBook(
-            path=total_excel_file_path,
-            div=div,
-            only_attendance=False,
-            sheet_name_remover=instance["sheet_name_remover"],
-        )
-        total_excel_book.write_book()
+def update_ratings(rebuild: bool = False):
+    """按结束时间依次为每个 instance 中新结束的比赛计算 rating（已经计算过的比赛不重新计算）
 
-        attendance_excel_file_path: str = os.path.join(
-            "outputs", instance["export_filename"] + "_Attendance_Only.xlsx"
-        )
-        logger.warning(f"Exporting to {attendance_excel_file_path}")
-        attendance_excel_book = VjudgeExcelBook(
-            path=attendance_excel_file_path,
-            div=div,
-            only_attendance=True,
-            sheet_name_remover=instance["sheet_name_remover"],
-        )
-        attendance_excel_book.write_book()
+    :param rebuild: 重新计算所有比赛（修改 rating 规则之后）"""
+    for platform, rating_cls in (
+        ("vjudge", VjudgeRating),
+        ("nowcoder", NowcoderRating),
+    ):
+        for div in dict(acmana.config[platform]["instances"]):
+            rated_num = rating_cls.update_div_ratings(div, rebuild=rebuild)
+            logger.info(f"Rated {rated_num} {platform} {div} contests")
 
 
-def export_nowcoder_contests_to_excel():
-    """将 `数据库` 中的 NowcoderContest 导出到 Excel 文件中"""
-    for div, instance in dict(acmana.config["nowcoder"]["instances"]).items():
-        logger.info(
-            f"Exporting {div} contests from title_prefix '{instance['title_prefix']}'......"
-        )
-        total_excel_file_path: str = os.path.join(
-            "outputs", instance["export_filename"] + "_All_Contestant.xlsx"
+def _write_excel_book(excel_book: VjudgeExcelBook | NowcoderExcelBook) -> str:
+    """按配置写入一个 Excel，或者拆分为每场比赛一个 Excel 并打包为 zip，返回写入的路径"""
+    if acmana.config["common"]["export"]["split_per_contest"]:
+        zip_path = excel_book.write_split_books()
+        logger.warning(f"Exported split workbooks to {zip_path}")
+        return zip_path
+    excel_book.write_book()
+    return excel_book.path
+
+
+def _export_instance(platform: str, div: str) -> list[str]:
+    """导出一个 instance 的两个 Excel（所有同学、只包含选课同学），返回导出的路径
+
+    两个 Excel 共用同一份数据，只查询、计算一次"""
+    instance = acmana.config[platform]["instances"][div]
+    logger.info(
+        f"Exporting {div} contests from title_prefix '{instance['title_prefix']}'......"
+    )
+    if platform == "vjudge":
+        excel_book_cls, export_data = VjudgeExcelBook, VjudgeExportData(div)
+    else:
+        excel_book_cls, export_data = NowcoderExcelBook, NowcoderExportData(div)
+    paths: list[str] = []
+    for only_attendance, suffix in (
+        (False, "_All_Contestant.xlsx"),
+        (True, "_Attendance_Only.xlsx"),
+    ):
+        excel_file_path: str = os.path.join(
+            "outputs", instance["export_filename"] + suffix
         )
-        logger.warning(f"Exporting to {total_excel_file_path}")
-        total_excel_book = NowcoderExcelBook(
-            path=total_excel_file_path,
+        logger.warning(f"Exporting to {excel_file_path}")
+        excel_book = excel_book_cls(
+            path=excel_file_path,
             div=div,
-            only_attendance=False,
+            only_attendance=only_attendance,
             sheet_name_remover=instance["sheet_name_remover"],
+            export_data=export_data,  # type: ignore
+            constant_memory=acmana.config["common"]["export"]["constant_memory"],
+            incremental=acmana.config["common"]["export"]["incremental"],
         )
-        total_excel_book.write_book()
+        paths.append(_write_excel_book(excel_book))
+    return paths
 
-        attendance_excel_file_path: str = os.path.join(
-            "outputs", instance["export_filename"] + "_Attendance_Only.xlsx"
-        )
-        logger.warning(f"Exporting to {attendance_excel_file_path}")
-        attendance_excel_book = NowcoderExcelBook(
-            path=attendance_excel_file_path,
-            div=div,
-            only_attendance=True,
-            sheet_name_remover=instance["sheet_name_remover"],
+
+def refresh_missing_aggregates():
+    """为旧数据库中还没有存储参赛人数、得分与活跃度的比赛计算并存储（导出只读取数据库，在导出之前调用一次）"""
+    VjudgeContest.refresh_missing_aggregates()
+    NowcoderContest.refresh_missing_aggregates()
+
+
+def export_contests_to_excel_in_parallel(max_workers: int | None = None):
+    """将 `数据库` 中所有 instance 的比赛并行导出到 Excel 文件中
+
+    每个 instance 在单独的进程中用只读的 SQLite 连接查询一次、渲染两个 Excel（pandas 与 xlsxwriter 都是 CPU 密集型）
+    子进程是只读的，旧数据库中缺少的得分需要先由 `refresh_missing_aggregates` 补全"""
+    tasks: list[tuple[str, str]] = [
+        (platform, div)
+        for platform in ("vjudge", "nowcoder")
+        for div in dict(acmana.config[platform]["instances"])
+    ]
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=max_workers, initializer=use_read_only_engine
+    ) as executor:
+        futures = [executor.submit(_export_instance, *task) for task in tasks]
+        for future in concurrent.futures.as_completed(futures):
+            logger.info(f"Exported {', '.join(future.result())}")
+
+
+def export_master_scoreboard_to_excel():
+    """将所有平台、所有 instance 的得分按学号汇总导出到一个 Excel 文件中"""
+    for only_attendance, suffix in (
+        (False, "_All_Contestant.xlsx"),
+        (True, "_Attendance_Only.xlsx"),
+    ):
+        excel_file_path: str = os.path.join(
+            "outputs", acmana.config["common"]["export"]["master_filename"] + suffix
         )
-        attendance_excel_book.write_book()
+        logger.warning(f"Exporting to {excel_file_path}")
+        MasterExcelBook(
+            path=excel_file_path,
+            only_attendance=only_attendance,
+            constant_memory=acmana.config["common"]["export"]["constant_memory"],
+        ).write_book()
+
+
+def export_activity_to_excel():
+    """将每个 instance 整个学期的提交活跃度（比赛期间每小时、补题期间每天，按是否选课分开）导出到 Excel 文件中"""
+    for platform, contest_cls in (
+        ("vjudge", VjudgeContest),
+        ("nowcoder", NowcoderContest),
+    ):
+        for div, instance in dict(acmana.config[platform]["instances"]).items():
+            excel_file_path: str = os.path.join(
+                "outputs", instance["export_filename"] + "_Activity.xlsx"
+            )
+            logger.warning(f"Exporting to {excel_file_path}")
+            ActivityExcelBook(
+                path=excel_file_path,
+                contest_cls=contest_cls,
+                div=div,
+                sheet_name_remover=instance["sheet_name_remover"],
+                constant_memory=acmana.config["common"]["export"]["constant_memory"],
+            ).write_book()
+
+
+def rescore_vjudge_contests():
+    """用存储的提交按照 `common.rescore` 中的规则重新计算得分，导出与现行规则的对比（不修改数据库）
+
+    修改补题有效期、罚时、补题得分、排名分位之前先用它试算，不需要重新爬取"""
+    rules = ScoringRules.from_config(acmana.config["common"]["rescore"])
+    logger.info(f"Rescoring vjudge contests with {rules}......")
+    for div, instance in dict(acmana.config["vjudge"]["instances"]).items():
+        # 两个 Excel 共用同一次模拟的结果
+        rescoring_data = VjudgeRescoringData(div, rules)
+        for only_attendance, suffix in (
+            (False, "_Rescore_All_Contestant.xlsx"),
+            (True, "_Rescore_Attendance_Only.xlsx"),
+        ):
+            excel_file_path: str = os.path.join(
+                "outputs", instance["export_filename"] + suffix
+            )
+            logger.warning(f"Exporting to {excel_file_path}")
+            RescoringExcelBook(
+                path=excel_file_path,
+                only_attendance=only_attendance,
+                rescoring_data=rescoring_data,
+                sheet_name_remover=instance["sheet_name_remover"],
+                constant_memory=acmana.config["common"]["export"]["constant_memory"],
+            ).write_book()
 
 
 def run():
     retrive_vjudge_contests()
-    export_vjudge_contests_to_excel()
     retrive_nowcoder_contests()
-    export_nowcoder_contests_to_excel()
+    update_ratings()
+    refresh_missing_aggregates()
+    export_contests_to_excel_in_parallel()
+    export_master_scoreboard_to_excel()
+    export_activity_to_excel()
 
 
 if __name__ == "__main__":
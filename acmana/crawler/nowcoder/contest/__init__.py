@@ -1,13 +1,17 @@
 import asyncio
 import datetime
+import functools
 import json
 import logging
 import os
 import re
 
 import fake_useragent
+import pandas as pd
 import requests
 
+import acmana
+from acmana.crawler.problem_stats import ProblemStatsCollector
 from acmana.crawler.nowcoder.contest.nowcoder_competition_ranking import (
     fetch_contest_ranking,
 )
@@ -15,9 +19,13 @@ from acmana.crawler.nowcoder.contest.nowcoder_ranking_item import NowcoderRankin
 from acmana.crawler.nowcoder.contest.nowcoder_submission import (
     NowcoderSubmission,
     fetch_contest_submisions,
+    fetch_contest_upsolve_submissions,
 )
 from acmana.models.contest.nowcoder_contest import NowcoderContest
+from acmana.models.problem_stats.nowcoder_problem_stats import NowcoderProblemStats
 from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
+from acmana.models.submission import digest_submissions
+from acmana.models.submission.nowcoder_submission import NowcoderSubmissionRecord
 
 logger = logging.getLogger(__name__)
 
@@ -40,6 +48,22 @@ class NowcoderContestCrawler:
         self.nowcoder_ranking_items_dict: dict[
             int, NowcoderRankingItem
         ] = {}  # User ID -> NowcoderRankingItem
+        self.problem_indices: dict[int, int] = {}  # 牛客题目 ID -> 比赛内的序号
+        # 比赛期间排名的 api 信息，每场比赛只获取一次（参见 `refresh_competition_ranking`）
+        self._api_ranking_list: list[dict] | None = None
+        # 每道题的统计：比赛期间的部分在读取排名时累计，补题的部分在模拟补题时累计
+        self.problem_stats: ProblemStatsCollector = ProblemStatsCollector()
+        # 上一次爬取时比赛已经结束：从存储的补题数、题目状态与每道题的补题人数继续，只模拟之后的新补题提交
+        # 存储的补题数与题目状态在建立 NowcoderRankingItem 时保留或者清空，所以补题提交与上一次爬取时不一致时，
+        # 需要在获取排名之前（`_check_resume_upsolve`）改为重新模拟所有补题
+        self.resume_upsolve: bool = (
+            acmana.config["common"]["upsolve"]["incremental"]
+            and self.db_nowcoder_contest.processed_submissions_num is not None
+            and self.db_nowcoder_contest.processed_submissions_digest is not None
+            and not NowcoderProblemStats.query_contests_stats(
+                [self.db_nowcoder_contest.id]
+            ).empty  # 旧数据库中还没有存储每道题的统计，重新模拟一次
+        )
 
     def crawl_contest_metadata_json(self) -> dict:
         """获取比赛的基础信息"""
@@ -76,16 +100,52 @@ class NowcoderContestCrawler:
 
     def get_competition_ranking(self):
         """从 API 接口中获取比赛结束为止的排名信息和题目通过信息（不包含补题）
-        这里不需管理员权限，因此不需要登录 cookies"""
-        api_ranking_list = asyncio.run(
+        这里不需管理员权限，因此不需要登录 cookies
+
+        获取的排名与建立的 NowcoderRankingItem 在爬虫中复用，已经获取过时直接返回"""
+        if self._api_ranking_list is not None:
+            return
+        self._check_resume_upsolve()
+        self._api_ranking_list = asyncio.run(
             fetch_contest_ranking(self.db_nowcoder_contest.id)
         )
+        self._update_from_api_ranking_list(self._api_ranking_list)
+
+    def refresh_competition_ranking(self):
+        """丢弃已经获取的排名，重新从 API 接口获取并更新已有的 NowcoderRankingItem"""
+        self._api_ranking_list = None
+        self.get_competition_ranking()
+
+    def _check_resume_upsolve(self):
+        """在建立任何 NowcoderRankingItem 之前确定是否可以增量模拟补题：
+        补题提交比上一次爬取时少，或者已经模拟过的补题提交有变化（重测、删除之后又有新的提交），则重新模拟所有补题"""
+        if not self.resume_upsolve:
+            return
+        processed_submissions_num: int = self.db_nowcoder_contest.processed_submissions_num  # type: ignore
+        if (
+            processed_submissions_num > len(self.upsolve_submissions)
+            or self._digest_upsolve_submissions(processed_submissions_num)
+            != self.db_nowcoder_contest.processed_submissions_digest
+        ):
+            logger.warning(f"{self.db_nowcoder_contest} 的补题提交与上一次爬取时不一致，重新模拟所有补题......")
+            self.resume_upsolve = False
+
+    def _update_from_api_ranking_list(self, api_ranking_list: list[dict]):
+        self.problem_stats = ProblemStatsCollector()
+        for api_ranking in api_ranking_list[:1]:  # 题目按照在比赛中的顺序编号（存储的题目状态依赖这个顺序）
+            for problem in api_ranking["scoreList"]:
+                self.problem_indices.setdefault(
+                    problem["problemId"], len(self.problem_indices)
+                )
         for api_ranking in api_ranking_list:
-            self.nowcoder_ranking_items_dict[api_ranking["uid"]] = NowcoderRankingItem(
-                nowcoder_account_id=api_ranking["uid"],
-                nowcoder_account_nickename=api_ranking["userName"],
-                nowcoder_contest_crawler=self,
-            )
+            if api_ranking["uid"] not in self.nowcoder_ranking_items_dict:
+                self.nowcoder_ranking_items_dict[
+                    api_ranking["uid"]
+                ] = NowcoderRankingItem(
+                    nowcoder_account_id=api_ranking["uid"],
+                    nowcoder_account_nickename=api_ranking["userName"],
+                    nowcoder_contest_crawler=self,
+                )
 
             # db_nowcoder_ranking_item = NowcoderRanking.index_query(
             #     contest_id=self.db_nowcoder_contest.id,
@@ -122,32 +182,126 @@ class NowcoderContestCrawler:
 
     def simulate_contest(self):
         """牛客虽然比赛期间不用模拟，但是需要模拟提交后的补题以避免重复 AC 计数"""
-        self.get_competition_ranking()  # 先获取比赛期间的排名信息
-        # 模拟比赛结束后的补题
-        for api_submission_dict in self.get_upsolve_info():
+        # 先确定是否增量模拟并获取比赛期间的排名信息（已经获取过时不会重新获取）
+        self.get_competition_ranking()
+        upsolve_submissions = self.upsolve_submissions
+        processed_submissions_num = (
+            self.db_nowcoder_contest.processed_submissions_num
+            if self.resume_upsolve
+            else 0
+        )
+        if self.resume_upsolve:  # 继续累计每道题已经存储的补题人数
+            for problem_index, upsolved_cnt in (
+                NowcoderProblemStats.query_contests_stats([self.db_nowcoder_contest.id])
+                .droplevel("contest_id")["upsolved_cnt"]
+                .items()
+            ):
+                self.problem_stats.upsolve(int(problem_index), int(upsolved_cnt))
+        # 模拟比赛结束后的补题（增量模拟时只模拟上一次爬取之后的提交）
+        submission_records: list[dict] = []
+        for api_submission_dict in upsolve_submissions[processed_submissions_num:]:
             nowcoder_submission = NowcoderSubmission.from_api_submission_dict(
                 api_submission_dict=api_submission_dict,
                 contest_crawler=self,
             )
+            submission_records.append(
+                dict(
+                    id=api_submission_dict["submissionId"],
+                    contest_id=self.db_nowcoder_contest.id,
+                    account_id=nowcoder_submission.account_id,
+                    problem_id=nowcoder_submission.problem_id,
+                    accepted=nowcoder_submission.accepted,
+                    seconds=int(nowcoder_submission.seconds),
+                )
+            )
             self.nowcoder_ranking_items_dict[
                 api_submission_dict["userId"]
             ].submit_after_competiton(
                 nowcoder_submission
             )  # 模拟补题
 
+        if not self.resume_upsolve:  # 重新模拟时删除已经不在排名与补题提交中的账号的排名
+            for ranking in list(self.db_nowcoder_contest.rankings):
+                if ranking.account_id not in self.nowcoder_ranking_items_dict:
+                    self.db_nowcoder_contest.rankings.remove(ranking)
+
+        # 存储模拟过的提交，之后可以只用数据库重新计算补题（重新模拟时先删除已经存储的提交）
+        if not self.resume_upsolve:
+            NowcoderSubmissionRecord.delete_contest_submissions(
+                self.db_nowcoder_contest.id
+            )
+        NowcoderSubmissionRecord.upsert_all(submission_records)
+        NowcoderProblemStats.replace_contest_stats(
+            self.db_nowcoder_contest.id,
+            self.problem_stats.to_frame(  # 增量模拟时没有新提交的账号只在已经存储的排名中
+                len(
+                    {
+                        ranking.account_id
+                        for ranking in self.db_nowcoder_contest.rankings
+                    }
+                )
+            ),
+        )
+
+        for nowcoder_ranking_item in self.nowcoder_ranking_items_dict.values():
+            nowcoder_ranking_item.db_nowcoder_ranking.accepted_mask = (
+                nowcoder_ranking_item.problem_set.accepted_mask
+            )
+        # 比赛结束之后记录已经模拟过的补题提交数，之后只需要模拟新的补题提交
+        if datetime.datetime.now(datetime.timezone.utc) >= self.db_nowcoder_contest.end:
+            self.db_nowcoder_contest.processed_submissions_num = len(
+                upsolve_submissions
+            )
+            self.db_nowcoder_contest.processed_submissions_digest = (
+                self._digest_upsolve_submissions(len(upsolve_submissions))
+            )
+        else:
+            self.db_nowcoder_contest.processed_submissions_num = None
+            self.db_nowcoder_contest.processed_submissions_digest = None
+
+        # 存储参赛人数、选课同学的「相对排名」与得分，导出时直接读取（增量模拟时只将新提交累加到活跃度上）
+        self.db_nowcoder_contest.refresh_aggregates(
+            new_submissions=pd.DataFrame(
+                submission_records, columns=["account_id", "seconds"]
+            )
+            if self.resume_upsolve
+            else None
+        )
+
+    def _digest_upsolve_submissions(self, end: int) -> str:
+        """前 `end` 个补题提交（按照提交顺序）的指纹"""
+        return digest_submissions(
+            [
+                (
+                    api_submission_dict["submissionId"],
+                    api_submission_dict["userId"],
+                    api_submission_dict["problemId"],
+                    api_submission_dict["statusMessage"] == "答案正确",
+                    api_submission_dict["submitTime"],
+                )
+                for api_submission_dict in self.upsolve_submissions[:end]
+            ]
+        )
+
+    @functools.cached_property
+    def upsolve_submissions(self) -> list[dict]:
+        """补题提交的 api 信息，每场比赛只获取一次（参见 `get_upsolve_info`）"""
+        return self.get_upsolve_info()
+
     def get_upsolve_info(self) -> list[dict]:
         """获取补题提交的 api 信息并按照 `提交顺序` 排序后返回
 
         注意：这里需要管理员权限才能爬取所有提交，因此需要具有管理员权限的 cookies"""
-        all_submissions = asyncio.run(fetch_contest_submisions(self._contest_id))
-
-        upsovle_submissions: list[dict] = list(
-            filter(
-                lambda x: x["submitTime"]
-                > self.db_nowcoder_contest.end.timestamp() * 1000,
-                all_submissions,
+        end_time = self.db_nowcoder_contest.end.timestamp() * 1000
+        if acmana.config["nowcoder"]["upsolve_only_fetch"]:  # 不下载只包含比赛期间提交的页面
+            upsovle_submissions: list[dict] = asyncio.run(
+                fetch_contest_upsolve_submissions(self._contest_id, end_time)
+            )
+        else:
+            all_submissions = asyncio.run(fetch_contest_submisions(self._contest_id))
+            upsovle_submissions = list(
+                filter(lambda x: x["submitTime"] > end_time, all_submissions)
             )
-        )
 
         upsovle_submissions.sort(key=lambda x: x["submitTime"])
 
@@ -13,29 +13,42 @@ logger = logging.getLogger(__name__)
 
 
 class NowcoderProblemSet:
-    """这里仅仅在牛客补题时的题目状态时使用。并不将其用于模拟整场比赛"""
+    """这里仅仅在牛客补题时的题目状态时使用。并不将其用于模拟整场比赛
 
-    class Problem:
-        def __init__(self) -> None:
-            self.accepted: bool | None = None  # 是否已经通过
-            # self.penalty: datetime.timedelta = datetime.timedelta()  # 补题时不需要计算罚时
+    牛客的题目 ID 是全站唯一的大整数，先由爬虫按照题目在比赛中的顺序映射为序号，通过状态存为一个 bitmask"""
 
-    def __init__(self) -> None:
-        self.problem_dict: dict[int, NowcoderProblemSet.Problem] = {}
-        pass
+    __slots__ = ("problem_indices", "accepted_mask")
 
-    def __getitem__(self, problem_id: int):
-        """获取题目状态，如果没有这道题，创建一个
+    def __init__(self, problem_indices: dict[int, int]) -> None:
+        """:param problem_indices: 牛客 api 的唯一题目 ID -> 比赛内的序号，同一场比赛的所有账号共用"""
+        self.problem_indices: dict[int, int] = problem_indices
+        self.accepted_mask: int = 0  # 补题时不需要计算罚时
 
-        :param problem_id: 牛客 api 的唯一题目 ID"""
-        if problem_id not in self.problem_dict:
-            self.problem_dict[problem_id] = NowcoderProblemSet.Problem()  # 如果没有这道题，创建一个
-            return self.problem_dict[problem_id]
-        else:
-            return self.problem_dict[problem_id]
+    def index(self, problem_id: int) -> int:
+        """:return: 题目在比赛内的序号"""
+        if problem_id not in self.problem_indices:
+            self.problem_indices[problem_id] = len(self.problem_indices)
+        return self.problem_indices[problem_id]
+
+    def _bit(self, problem_id: int) -> int:
+        return 1 << self.index(problem_id)
+
+    def is_accepted(self, problem_id: int) -> bool:
+        """:param problem_id: 牛客 api 的唯一题目 ID"""
+        return self.accepted_mask & self._bit(problem_id) != 0
+
+    def set_accepted(self, problem_id: int) -> None:
+        self.accepted_mask |= self._bit(problem_id)
 
 
 class NowcoderRankingItem:
+    __slots__ = (
+        "db_account",
+        "nowcoder_contest_crawler",
+        "db_nowcoder_ranking",
+        "problem_set",
+    )
+
     def __init__(
         self,
         nowcoder_account_id: int,
@@ -71,19 +84,29 @@ class NowcoderRankingItem:
                 solved_cnt=0,
                 upsolved_cnt=0,
                 penalty=0,
+                accepted_mask=0,
             )
 
-        # 清空之前的数据库
-        self.db_nowcoder_ranking.competition_rank = None
-        self.db_nowcoder_ranking.solved_cnt = 0
-        self.db_nowcoder_ranking.upsolved_cnt = 0
-        self.db_nowcoder_ranking.penalty = datetime.timedelta()
+        if (
+            self.nowcoder_contest_crawler.resume_upsolve
+            and self.db_nowcoder_ranking.accepted_mask is not None
+        ):  # 增量模拟补题：保留已经存储的补题数与题目状态（比赛期间的排名之后从 api 中更新）
+            pass
+        else:  # 清空之前的数据库
+            self.db_nowcoder_ranking.competition_rank = None
+            self.db_nowcoder_ranking.solved_cnt = 0
+            self.db_nowcoder_ranking.upsolved_cnt = 0
+            self.db_nowcoder_ranking.penalty = datetime.timedelta()
+            self.db_nowcoder_ranking.accepted_mask = 0
 
         self.nowcoder_contest_crawler.db_nowcoder_contest.rankings.append(  # commit to database with `db_nowcoder_contest`
             self.db_nowcoder_ranking
         )
 
-        self.problem_set: NowcoderProblemSet = NowcoderProblemSet()
+        self.problem_set: NowcoderProblemSet = NowcoderProblemSet(
+            self.nowcoder_contest_crawler.problem_indices
+        )
+        self.problem_set.accepted_mask = self.db_nowcoder_ranking.accepted_mask or 0
 
     def __repr__(self) -> str:
         return f"NowcoderRankingItem(db_account={self.db_account}, db_nowcoder_ranking={self.db_nowcoder_ranking})"
@@ -91,51 +114,58 @@ class NowcoderRankingItem:
     def update_problem_set_status_from_api_scoreList(
         self, api_problem_score_list: list[dict]
     ) -> None:
+        """同时累计每道题比赛期间的统计：排名 api 中只有通过前的错误次数，通过后的提交不计入提交数"""
+        problem_stats = self.nowcoder_contest_crawler.problem_stats
+        begin_ms = (
+            self.nowcoder_contest_crawler.db_nowcoder_contest.begin.timestamp() * 1000
+        )
         for problem in api_problem_score_list:
-            self.problem_set[problem["problemId"]].accepted = problem["accepted"]
+            problem_index = self.problem_set.index(problem["problemId"])
+            problem_stats.add_attempts(
+                problem_index,
+                problem.get("failedCount", 0) + problem["accepted"],
+                problem["accepted"],
+            )
+            if problem["accepted"]:
+                self.problem_set.set_accepted(problem["problemId"])
+                accepted_time = problem.get("acceptedTime")  # 通过的时间戳（毫秒）
+                problem_stats.solve(
+                    problem_index,
+                    self.db_account.id,
+                    int((accepted_time - begin_ms) / 1000) if accepted_time else None,
+                )
 
     def submit_after_competiton(self, submission: "NowcoderSubmission") -> None:
         """在比赛结束后提交补题。
 
         由于没有模拟正常比赛，只是计算补题的数据
         所以注意需要在这一步之前将在牛客终榜中的数据 db_nowcoder_ranking 导入数据库中"""
-        if (
-            submission.time_from_begin
-            < self.nowcoder_contest_crawler.db_nowcoder_contest.length
-        ):  # 在比赛时间内提交
+        length_seconds = (
+            self.nowcoder_contest_crawler.db_nowcoder_contest.length.total_seconds()
+        )
+        if submission.seconds < length_seconds:  # 在比赛时间内提交
             logger.warning(
                 f"不能通过 submit_after_competiton 提交比赛期间的 submission！{submission}"
             )
             return
-            raise ValueError(f"已经爬取过比赛期间的排名数据了，不能重复计算！ {submission}")
-            if not self.problem_set[submission.problem_id].accepted:  # 如果之前还没有通过这道题
-                if submission.accepted:  # 如果通过这道题——>通过题目数+1，总罚时 += 此题的罚时
-                    self.db_nowcoder_ranking.solved_cnt += 1
-                    self.db_nowcoder_ranking.penalty += (
-                        submission.time_from_begin
-                        + self.problem_set[submission.problem_id].penalty
-                    )
-                    self.problem_set[submission.problem_id].accepted = True
-                else:  # 如果没有通过这道题——>此题的罚时+20min（只有过题后才会纳入罚时计算）
-                    self.problem_set[
-                        submission.problem_id
-                    ].penalty += datetime.timedelta(minutes=20)
-            else:  # 对于已经通过的题目，不再进行处理
-                if submission.accepted:
-                    logger.debug(f"比赛时重复提交已经通过的题目并通过，跳过: {submission}")
-                else:
-                    logger.debug(f"比赛时重复提交已经通过的题目但没有通过，跳过: {submission}")
         elif (
-            submission.time_from_begin
-            <= self.nowcoder_contest_crawler.db_nowcoder_contest.length
-            + datetime.timedelta(days=acmana.config["common"]["upsolve"]["expiration"])
+            submission.seconds
+            <= length_seconds
+            + datetime.timedelta(
+                days=acmana.config["common"]["upsolve"]["expiration"]
+            ).total_seconds()
         ):  # 7 天内补题
+            problem_index = self.problem_set.index(submission.problem_id)
+            self.nowcoder_contest_crawler.problem_stats.submit(
+                problem_index, submission.accepted, False
+            )
             if submission.accepted:
-                if self.problem_set[submission.problem_id].accepted:  # 过题后重复提交
+                if self.problem_set.is_accepted(submission.problem_id):  # 过题后重复提交
                     logger.debug(f"补题重复提交已经通过的题目并通过，跳过: {submission}")
                 else:
                     self.db_nowcoder_ranking.upsolved_cnt += 1
-                    self.problem_set[submission.problem_id].accepted = True
+                    self.problem_set.set_accepted(submission.problem_id)
+                    self.nowcoder_contest_crawler.problem_stats.upsolve(problem_index)
             else:  # 补题没有通过不计算罚时
                 pass
         else:
@@ -9,7 +9,6 @@ import aiohttp
 import fake_useragent
 
 from acmana.crawler.nowcoder.contest.nowcoder_ranking_item import NowcoderRankingItem
-from acmana.models.account.nowcoder_account import NowcoderAccount
 
 if TYPE_CHECKING:
     from acmana.crawler.nowcoder.contest import NowcoderContestCrawler
@@ -20,19 +19,26 @@ cookie = os.environ["NOWCODER_COOKIE"]
 
 
 class NowcoderSubmission:
+    """一个提交。只保存整数（账号 id、从比赛开始的秒数），不持有 ORM 对象与爬虫的引用，
+    并使用 `__slots__` 以减少上万个提交时的内存占用"""
+
+    __slots__ = ("account_id", "problem_id", "accepted", "seconds")
+
     def __init__(
         self,
+        account_id: int,
         problem_id: int,
         accepted: bool,
-        time_from_begin: datetime.timedelta,
-        db_nowcoder_account: NowcoderAccount,
-        contest_crawler: "NowcoderContestCrawler",
+        seconds: float,
     ) -> None:
-        self.problem_id = problem_id
+        self.account_id: int = account_id
+        self.problem_id: int = problem_id
         self.accepted: bool = accepted
-        self.time_from_begin: datetime.timedelta = time_from_begin
-        self.db_nowcoder_account: NowcoderAccount = db_nowcoder_account
-        self.contest_crawler: "NowcoderContestCrawler" = contest_crawler
+        self.seconds: float = seconds  # 从比赛开始到提交的秒数
+
+    @property
+    def time_from_begin(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.seconds)
 
     @classmethod
     def from_api_submission_dict(
@@ -44,11 +50,9 @@ class NowcoderSubmission:
         accepted: bool = (
             True if api_submission_dict["statusMessage"] == "答案正确" else False
         )
-        time_from_begin = (
-            datetime.datetime.utcfromtimestamp(
-                int(api_submission_dict["submitTime"] / 1000)
-            ).replace(tzinfo=datetime.timezone.utc)
-            - contest_crawler.db_nowcoder_contest.begin
+        seconds = (
+            int(api_submission_dict["submitTime"] / 1000)
+            - contest_crawler.db_nowcoder_contest.begin.timestamp()
         )
         nowcoder_account_id = api_submission_dict["userId"]
         if nowcoder_account_id not in contest_crawler.nowcoder_ranking_items_dict:
@@ -67,17 +71,16 @@ class NowcoderSubmission:
             ].db_account.commit_to_db()
 
         return cls(
+            account_id=contest_crawler.nowcoder_ranking_items_dict[
+                nowcoder_account_id
+            ].db_account.id,
             problem_id=problem_id,
             accepted=accepted,
-            time_from_begin=time_from_begin,
-            db_nowcoder_account=contest_crawler.nowcoder_ranking_items_dict[
-                nowcoder_account_id
-            ].db_account,
-            contest_crawler=contest_crawler,
+            seconds=seconds,
         )
 
     def __repr__(self) -> str:
-        return f"account: {self.db_nowcoder_account} promble_id: {self.problem_id}, accepted: {self.accepted}, time: {self.time_from_begin}"
+        return f"account_id: {self.account_id} promble_id: {self.problem_id}, accepted: {self.accepted}, time: {self.time_from_begin}"
 
 
 async def get_submission_page(
@@ -108,6 +111,15 @@ async def get_submission_page(
         submission_jsons.append(await response.json())
 
 
+def _check_status_count(contest_id: int, basic_info: dict):
+    if basic_info["statusCount"] == 200:
+        raise ValueError(
+            f"比赛 {contest_id} 只爬取到 200 条提交，这多半是因为 NOWCODER_COOKIE 过期导致的"
+            "（当然也不排除这次比赛的提交次数刚好等于 200 次数导致的）"
+            "请更新 NOWCODER_COOKIE 环境变量！"
+        )
+
+
 async def fetch_contest_submisions(contest_id: int) -> list[dict]:
     """去除其他信息，只保留提交 `列表`"""
     submission_jsons: list[dict] = []
@@ -123,12 +135,7 @@ async def fetch_contest_submisions(contest_id: int) -> list[dict]:
         ]
         await asyncio.gather(*tasks)
 
-    if submission_jsons[0]["data"]["basicInfo"]["statusCount"] == 200:
-        raise ValueError(
-            f"比赛 {contest_id} 只爬取到 200 条提交，这多半是因为 NOWCODER_COOKIE 过期导致的"
-            "（当然也不排除这次比赛的提交次数刚好等于 200 次数导致的）"
-            "请更新 NOWCODER_COOKIE 环境变量！"
-        )
+    _check_status_count(contest_id, submission_jsons[0]["data"]["basicInfo"])
 
     submission_jsons.sort(key=lambda x: x["data"]["basicInfo"]["pageCurrent"])
     submission_list: list[dict] = []
@@ -143,6 +150,59 @@ async def fetch_contest_submisions(contest_id: int) -> list[dict]:
     return submission_list
 
 
+async def fetch_contest_upsolve_submissions(
+    contest_id: int, end_time: float
+) -> list[dict]:
+    """只获取比赛结束之后（`submitTime` > end_time）的提交列表
+
+    提交列表按时间倒序分页：从最新的一页开始逐页获取，获取到包含比赛结束前提交的一页后停止，
+    之后只包含比赛期间提交的页面不会被下载（若按时间正序分页，则从最后一页开始向前获取）
+
+    :param end_time: 比赛结束的时间戳（毫秒）"""
+    submission_jsons: list[dict] = []
+    upsolve_pages: dict[int, list[dict]] = {}  # 页码 -> 这一页中比赛结束之后的提交
+    async with aiohttp.ClientSession(trust_env=True) as client_session:
+        await get_submission_page(contest_id, 1, client_session, submission_jsons)
+        basic_info = submission_jsons[0]["data"]["basicInfo"]
+        _check_status_count(contest_id, basic_info)
+
+        first_page: list[dict] = submission_jsons[0]["data"]["data"]
+        if (
+            len(first_page) < 2
+            or first_page[0]["submitTime"] >= first_page[-1]["submitTime"]
+        ):
+            pages = range(1, basic_info["pageCount"] + 1)
+        else:
+            pages = range(basic_info["pageCount"], 0, -1)
+
+        for page in pages:
+            if page == 1:
+                page_submissions = first_page
+            else:
+                await get_submission_page(
+                    contest_id, page, client_session, submission_jsons
+                )
+                page_submissions = submission_jsons[-1]["data"]["data"]
+            upsolve_pages[page] = [
+                submission
+                for submission in page_submissions
+                if submission["submitTime"] > end_time
+            ]
+            if any(
+                submission["submitTime"] <= end_time for submission in page_submissions
+            ):
+                break
+
+    # 与 `fetch_contest_submisions` 相同，按照页码顺序排列（同一时间的提交顺序保持一致）
+    upsolve_submissions: list[dict] = []
+    for page in sorted(upsolve_pages):
+        upsolve_submissions.extend(upsolve_pages[page])
+    logger.info(
+        f"fetch {len(upsolve_submissions)} upsolve submissions from {len(submission_jsons)}/{basic_info['pageCount']} pages of nowcoder contest {contest_id}"
+    )
+    return upsolve_submissions
+
+
 if __name__ == "__main__":
     submission_jsons = asyncio.run(fetch_contest_submisions(67976))
     with open("acmana/tmp/nowcoder_submissions_aio.json", "w", encoding="utf-8") as f:
@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+
+from acmana.models.problem_stats import PROBLEM_STATS_COLUMNS
+
+
+def problem_rates(
+    attempt_cnt: np.ndarray,
+    accepted_cnt: np.ndarray,
+    solved_cnt: np.ndarray,
+    upsolved_cnt: np.ndarray,
+    accounts_num: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """每道题的通过率（通过的提交数 / 提交数）与补题率（补题人数 / 比赛期间没有通过的人数），分母为 0 时为 NaN"""
+    attempt_cnt = np.asarray(attempt_cnt, dtype=float)
+    unsolved = np.asarray(accounts_num, dtype=float) - solved_cnt
+    ac_rate = np.divide(
+        accepted_cnt,
+        attempt_cnt,
+        out=np.full(len(attempt_cnt), np.nan),
+        where=attempt_cnt > 0,
+    )
+    upsolve_rate = np.divide(
+        upsolved_cnt, unsolved, out=np.full(len(unsolved), np.nan), where=unsolved > 0
+    )
+    return ac_rate, upsolve_rate
+
+
+class ProblemStatsCollector:
+    """逐个提交模拟比赛时，在同一遍遍历中累计每道题的统计（结果与 `simulate_contests` 的 `with_problem_stats` 一致）"""
+
+    __slots__ = ("stats",)
+
+    def __init__(self) -> None:
+        # 题号 -> [首杀账号, 首杀时间, 提交数, 通过的提交数, 过题人数, 补题人数]
+        self.stats: dict[int, list] = {}
+
+    def _problem(self, problem_index: int) -> list:
+        if problem_index not in self.stats:
+            self.stats[problem_index] = [None, None, 0, 0, 0, 0]
+        return self.stats[problem_index]
+
+    def submit(self, problem_index: int, accepted: bool, in_contest: bool):
+        """一个补题有效期内的提交，比赛期间的提交计入提交数、通过的提交数"""
+        problem = self._problem(problem_index)
+        if in_contest:
+            problem[2] += 1
+            problem[3] += accepted
+
+    def add_attempts(self, problem_index: int, attempt_cnt: int, accepted_cnt: int):
+        """直接累加比赛期间的提交数、通过的提交数（牛客排名 api 中只有汇总的次数）"""
+        problem = self._problem(problem_index)
+        problem[2] += attempt_cnt
+        problem[3] += accepted_cnt
+
+    def solve(self, problem_index: int, account_id: int, seconds: int | None):
+        """比赛期间一个账号第一次通过这道题，时间最早的为首杀（时间相同时先到先得）"""
+        problem = self._problem(problem_index)
+        problem[4] += 1
+        if seconds is not None and (problem[1] is None or seconds < problem[1]):
+            problem[0], problem[1] = account_id, seconds
+
+    def upsolve(self, problem_index: int, upsolved_cnt: int = 1):
+        """一个（或 `upsolved_cnt` 个）账号补题通过这道题"""
+        self._problem(problem_index)[5] += upsolved_cnt
+
+    def load(self, stats: pd.DataFrame):
+        """从已经存储的统计继续累计（增量模拟补题）"""
+        for problem_index, row in stats.iterrows():
+            self.stats[int(problem_index)] = [  # type: ignore
+                None
+                if pd.isna(row["first_blood_account_id"])
+                else int(row["first_blood_account_id"]),
+                None
+                if pd.isna(row["first_blood_seconds"])
+                else int(row["first_blood_seconds"]),
+                int(row["attempt_cnt"]),
+                int(row["accepted_cnt"]),
+                int(row["solved_cnt"]),
+                int(row["upsolved_cnt"]),
+            ]
+
+    def to_frame(self, accounts_num: int) -> pd.DataFrame:
+        """
+        :param accounts_num: 有提交的账号数（补题率的分母为其中比赛期间没有通过的人数）
+        :return: 以 problem_index 为 index，包含 `PROBLEM_STATS_COLUMNS` 列的 DataFrame（按题号排序）
+        """
+        problem_indices = sorted(self.stats)
+        values = [self.stats[problem_index] for problem_index in problem_indices]
+        counts = np.array([value[2:] for value in values], dtype=np.int64).reshape(
+            -1, 4
+        )
+        ac_rate, upsolve_rate = problem_rates(*counts.T, accounts_num)  # type: ignore
+        return pd.DataFrame(
+            {
+                "first_blood_account_id": pd.array(
+                    [value[0] for value in values], dtype="Int64"
+                ),
+                "first_blood_seconds": pd.array(
+                    [value[1] for value in values], dtype="Int64"
+                ),
+                "attempt_cnt": counts[:, 0],
+                "accepted_cnt": counts[:, 1],
+                "solved_cnt": counts[:, 2],
+                "upsolved_cnt": counts[:, 3],
+                "ac_rate": ac_rate,
+                "upsolve_rate": upsolve_rate,
+            },
+            index=pd.Index(problem_indices, dtype=np.int64, name="problem_index"),
+        )[list(PROBLEM_STATS_COLUMNS)]
@@ -1,22 +1,52 @@
 import bisect
 import datetime
+import functools
 import json
 import logging
 import os
 
 import fake_useragent
+import numpy as np
+import pandas as pd
 import requests
 
+import acmana
+from acmana.crawler.problem_stats import ProblemStatsCollector
 from acmana.crawler.vjudge.contest.vjudge_ranking_item import VjudgeRankingItem
+from acmana.crawler.vjudge.contest.vjudge_simulation import (
+    StandingsTimeline,
+    simulate_submissions,
+)
 from acmana.crawler.vjudge.contest.vjudge_submission import VjudgeSubmission
 from acmana.models.account.vjudge_account import VjudgeAccount
 from acmana.models.contest.vjudge_contest import VjudgeContest
+from acmana.models.problem_stats.vjudge_problem_stats import VjudgeProblemStats
+from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+from acmana.models.submission import digest_submissions
+from acmana.models.submission.vjudge_submission import VjudgeSubmissionRecord
 
 logger = logging.getLogger(__name__)
 
 
 class VjudgeContestCrawler:
-    def __init__(self, contest_id: int, div: str | None) -> None:
+    def __init__(
+        self,
+        contest_id: int,
+        div: str | None,
+        engine: str | None = None,
+        simulate: bool = True,
+    ) -> None:
+        """
+        :param: engine: 模拟比赛的方式，"object" 按时间顺序逐个提交模拟，
+            "numpy" 用数组运算一次性模拟所有提交（两者结果一致）；为 None 时使用 `vjudge.engine` 的配置
+        :param: simulate: 是否在初始化时就模拟比赛，为 False 时需要之后调用 `simulate_contest`
+            （参见 `simulate_contests_in_parallel`）
+        """
+        if engine is None:
+            engine = acmana.config["vjudge"]["engine"]
+        if engine not in ("numpy", "object"):
+            raise ValueError(f"未知的模拟方式: {engine}")
+        self.engine: str = engine
         self._contest_id = contest_id
         self._contest_api_metadata: dict = self.crawl_ranking_metadata_json()
         _id: int = int(self._contest_api_metadata["id"])
@@ -38,49 +68,363 @@ class VjudgeContestCrawler:
 
         self.participants_vjudge_account: dict[int, VjudgeAccount] = {}
 
-        for vaccount_id, val in self._contest_api_metadata["participants"].items():
-            vaccount_id = int(vaccount_id)
-            username, nickname = val[0], val[1]
-
-            self.participants_vjudge_account[vaccount_id] = VjudgeAccount.query_from_username(  # type: ignore
-                username=username
+        participants: dict[int, tuple[str, str]] = {
+            int(vaccount_id): (val[0], val[1])
+            for vaccount_id, val in self._contest_api_metadata["participants"].items()
+        }
+        # 一次查询取出所有已经存在的账号（先按用户名匹配，用户名改过的按账号 id 匹配）
+        existing_accounts = VjudgeAccount.query_from_usernames_or_ids(
+            usernames=[username for username, _ in participants.values()],
+            ids=list(participants),
+        )
+        accounts_by_username: dict[str, VjudgeAccount] = {
+            account.username: account for account in existing_accounts
+        }
+        accounts_by_id: dict[int, VjudgeAccount] = {
+            account.id: account for account in existing_accounts
+        }
+        new_accounts: list[VjudgeAccount] = []
+        for vaccount_id, (username, nickname) in participants.items():
+            account = accounts_by_username.get(
+                username, accounts_by_id.get(vaccount_id)
             )
-            if (
-                self.participants_vjudge_account[vaccount_id] is None
-            ):  # 在解析的时候就直接将没有见过的用户存入数据库
+            if account is None:  # 在解析的时候就直接将没有见过的用户存入数据库
                 logger.warning(
                     f"vjudge account {username}, {nickname} not found, create a new one and commit to db......"
                 )
-                self.participants_vjudge_account[vaccount_id] = VjudgeAccount(
+                account = VjudgeAccount(
                     username=username, nickname=nickname, id=vaccount_id
                 )
-                self.participants_vjudge_account[vaccount_id].commit_to_db()  # type: ignore
+                new_accounts.append(account)
+            self.participants_vjudge_account[vaccount_id] = account
+        if new_accounts:  # 在一个事务中批量插入
+            VjudgeAccount.commit_all_to_db(new_accounts)  # type: ignore
+
+        self.submissions = [VjudgeSubmission.from_api_list(submission, self.participants_vjudge_account) for submission in self._contest_api_metadata["submissions"]]  # type: ignore
 
-        self.submissions = [VjudgeSubmission.from_api_list(submission, self.participants_vjudge_account, self) for submission in self._contest_api_metadata["submissions"]]  # type: ignore
+        self.submissions.sort(key=lambda x: x.seconds)  # 按照时间顺序模拟提交
+        if simulate:
+            self.simulate_contest()
 
-        self.submissions.sort(key=lambda x: x.time)  # 按照时间顺序模拟提交
-        self.simulate_contest()
+    def simulate_contest(
+        self,
+        simulated: pd.DataFrame | None = None,
+        commit: bool = True,
+        simulated_problem_stats: pd.DataFrame | None = None,
+    ):
+        """模拟整场比赛，同时统计每道题的首杀、提交数、过题与补题人数，存入 `VjudgeProblemStats`
 
-    def simulate_contest(self):
-        """模拟整场比赛"""
-        self.submissions.sort(key=lambda x: x.time)  # 按照时间顺序模拟提交
+        :param simulated: 已经在其他进程中由 `simulate_submissions` 模拟好的结果，只需要存储
+        :param commit: 是否提交到数据库，为 False 时只 flush，由调用者统一提交
+        :param simulated_problem_stats: 与 `simulated` 一起模拟好的每道题的统计
+        """
+        # 一次查询取出这场比赛已有的排名，VjudgeRankingItem 从中取出并重置
+        self.existing_rankings: dict[
+            int, VjudgeRanking
+        ] = VjudgeRanking.query_contest_rankings(self.db_vjudge_contest.id)
+        # 逐个提交模拟时在 VjudgeRankingItem.submit 中累计每道题的统计
+        self.problem_stats: ProblemStatsCollector = ProblemStatsCollector()
+        new_submissions: pd.DataFrame | None = None  # 增量模拟时只将新提交累加到活跃度上
+        if simulated is None and self.resume_upsolve:
+            start: int = self.db_vjudge_contest.processed_submissions_num  # type: ignore
+            self._store_submissions(start=start)
+            problem_stats = self._simulate_upsolve_incrementally()
+            new_submissions = pd.DataFrame(
+                [
+                    (submission.account_id, submission.seconds)
+                    for submission in self.submissions[start:]
+                ],
+                columns=["account_id", "seconds"],
+            )
+        else:
+            self._store_submissions()
+            if simulated is not None or self.engine == "numpy":
+                problem_stats = self._simulate_contest_numpy(
+                    simulated, simulated_problem_stats
+                )
+            else:
+                problem_stats = self._simulate_contest_objects()
+
+            if acmana.config["vjudge"]["freeze"]:  # 存储封榜时刻的排名，导出封榜 Sheet 时直接读取
+                self._store_frozen_standings(
+                    self.db_vjudge_contest.length
+                    - datetime.timedelta(minutes=acmana.config["vjudge"]["freeze"])
+                )
+        VjudgeProblemStats.replace_contest_stats(
+            self.db_vjudge_contest.id, problem_stats
+        )
+        # 比赛结束之后比赛期间的提交不会再变化，记录已经模拟过的提交数，之后只需要模拟新的补题提交
+        if datetime.datetime.now(datetime.timezone.utc) >= self.db_vjudge_contest.end:
+            self.db_vjudge_contest.processed_submissions_num = len(self.submissions)
+            self.db_vjudge_contest.processed_submissions_digest = (
+                self._digest_submissions(len(self.submissions))
+            )
+        else:
+            self.db_vjudge_contest.processed_submissions_num = None
+            self.db_vjudge_contest.processed_submissions_digest = None
+
+        # 存储参赛人数、选课同学的「相对排名」与得分，导出时直接读取
+        self.db_vjudge_contest.refresh_aggregates(
+            commit=commit, new_submissions=new_submissions
+        )
+
+    def _store_submissions(self, start: int = 0):
+        """将第 `start` 个之后的提交（按时间排序）存入 `VjudgeSubmissionRecord`，之后可以只用数据库重新计算排名"""
+        VjudgeSubmissionRecord.upsert_all(
+            [
+                dict(
+                    contest_id=self.db_vjudge_contest.id,
+                    seq=seq,
+                    account_id=submission.account_id,
+                    problem_id=submission.problem_id,
+                    accepted=submission.accepted,
+                    seconds=submission.seconds,
+                )
+                for seq, submission in enumerate(self.submissions[start:], start=start)
+            ]
+        )
+        VjudgeSubmissionRecord.delete_from_seq(
+            self.db_vjudge_contest.id, len(self.submissions)
+        )
+
+    @functools.cached_property
+    def resume_upsolve(self) -> bool:
+        """上一次爬取时比赛已经结束，并且之后只有新的补题提交时，可以从存储的题目状态继续模拟
+
+        每个爬虫只判断一次（`simulate_contests_in_parallel` 划分比赛时与 `simulate_contest` 共用）"""
+        processed_submissions_num = self.db_vjudge_contest.processed_submissions_num
+        if (
+            not acmana.config["common"]["upsolve"]["incremental"]
+            or processed_submissions_num is None
+            or self.db_vjudge_contest.processed_submissions_digest is None  # 旧数据库
+        ):
+            return False
+        # 提交按时间排序，之后才出现的比赛期间提交（或者更早的补题提交）会排在已经模拟过的提交之间，
+        # 所以除了新提交，还要用指纹检查已经模拟过的提交
+        if (
+            processed_submissions_num > len(self.submissions)
+            or any(
+                submission.seconds <= self.db_vjudge_contest.length.total_seconds()
+                for submission in self.submissions[processed_submissions_num:]
+            )
+            or self._digest_submissions(processed_submissions_num)
+            != self.db_vjudge_contest.processed_submissions_digest
+        ):
+            logger.warning(f"{self.db_vjudge_contest} 的提交与上一次爬取时不一致，重新模拟整场比赛......")
+            return False
+        if VjudgeProblemStats.query_contests_stats([self.db_vjudge_contest.id]).empty:
+            return False  # 旧数据库中还没有存储每道题的统计，重新模拟一次
+        return True
+
+    def _digest_submissions(self, end: int) -> str:
+        """前 `end` 个提交（按时间排序）的指纹"""
+        return digest_submissions(
+            [
+                (
+                    submission.account_id,
+                    submission.problem_id,
+                    submission.accepted,
+                    submission.seconds,
+                )
+                for submission in self.submissions[:end]
+            ]
+        )
+
+    def _simulate_upsolve_incrementally(self) -> pd.DataFrame:
+        """比赛结束之后只有补题会变化：从存储的排名、题目状态与每道题的统计继续，只模拟上一次爬取之后的新提交
+
+        :return: 每道题的统计"""
+        new_submissions = self.submissions[
+            self.db_vjudge_contest.processed_submissions_num :
+        ]
+        logger.info(
+            f"{self.db_vjudge_contest}: resume upsolve simulation with {len(new_submissions)} new submissions"
+        )
+        self.problem_stats.load(
+            VjudgeProblemStats.query_contests_stats(
+                [self.db_vjudge_contest.id]
+            ).droplevel("contest_id")
+        )
         vjudge_ranking_items_dict: dict[int, VjudgeRankingItem] = {}
+        accounts: dict[int, VjudgeAccount] = {
+            account.id: account for account in self.participants_vjudge_account.values()
+        }
+        for submission in new_submissions:
+            if submission.account_id not in vjudge_ranking_items_dict:
+                vjudge_ranking_items_dict[submission.account_id] = VjudgeRankingItem(
+                    account=accounts[submission.account_id],
+                    vjudge_contest_crawler=self,
+                    resume=True,
+                )
+            vjudge_ranking_items_dict[submission.account_id].submit(
+                submission=submission
+            )
+
+        for item in vjudge_ranking_items_dict.values():
+            item.db_vjudge_ranking.accepted_mask = item.problem_set.accepted_mask
+            self.db_vjudge_contest.rankings.append(item.db_vjudge_ranking)
+        return self.problem_stats.to_frame(
+            len(self.existing_rankings.keys() | vjudge_ranking_items_dict.keys())
+        )
+
+    @functools.cached_property
+    def standings_timeline(self) -> StandingsTimeline:
+        """由所有提交一次性构建，之后查询任意时刻的排名不需要重新模拟"""
+        account_ids, problem_ids, accepted, seconds = self._submission_arrays()
+        return StandingsTimeline(
+            account_ids=account_ids,
+            problem_ids=problem_ids,
+            accepted=accepted,
+            seconds=seconds,
+            length=self.db_vjudge_contest.length.total_seconds(),
+        )
+
+    def standings_at(self, time: datetime.timedelta) -> pd.DataFrame:
+        """比赛开始 `time` 时的排名（如一小时、封榜时刻），参见 `StandingsTimeline.standings_at`"""
+        return self.standings_timeline.standings_at(time.total_seconds())
+
+    def standings_replay(
+        self, interval: datetime.timedelta = datetime.timedelta(hours=1)
+    ) -> list[tuple[datetime.timedelta, pd.DataFrame]]:
+        """每隔 `interval` 的排名（最后一个为终榜），用于回放比赛"""
+        times: list[datetime.timedelta] = []
+        time = interval
+        while time < self.db_vjudge_contest.length:
+            times.append(time)
+            time += interval
+        times.append(self.db_vjudge_contest.length)
+        return [(time, self.standings_at(time)) for time in times]
+
+    def _store_frozen_standings(self, freeze_time: datetime.timedelta):
+        """将封榜时刻的排名存入 `VjudgeRanking.frozen_*`，封榜时还没有提交的账号为 None"""
+        frozen = self.standings_at(freeze_time)
+        for db_vjudge_ranking in self.db_vjudge_contest.rankings:
+            if db_vjudge_ranking.account_id in frozen.index:
+                row = frozen.loc[db_vjudge_ranking.account_id]
+                db_vjudge_ranking.frozen_rank = int(row["competition_rank"])
+                db_vjudge_ranking.frozen_solved_cnt = int(row["solved_cnt"])
+                db_vjudge_ranking.frozen_penalty = datetime.timedelta(
+                    seconds=int(row["penalty_seconds"])
+                )
+            else:
+                db_vjudge_ranking.frozen_rank = None
+                db_vjudge_ranking.frozen_solved_cnt = None
+                db_vjudge_ranking.frozen_penalty = None
+
+    def _submission_arrays(
+        self,
+    ) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """将 api 中的提交转换为 (账号 id, 题目, 是否通过, 秒数) 四列，账号 id 为数据库中的账号 id"""
+        api_submissions = np.array(
+            [
+                submission[:4]
+                for submission in self._contest_api_metadata["submissions"]
+            ],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        api_account_ids, account_index = np.unique(
+            api_submissions[:, 0], return_inverse=True
+        )
+        account_ids = np.array(
+            [
+                self.participants_vjudge_account[int(api_account_id)].id
+                for api_account_id in api_account_ids
+            ],
+            dtype=np.int64,
+        )
+        return (
+            account_ids[account_index],
+            api_submissions[:, 1],
+            api_submissions[:, 2].astype(bool),
+            api_submissions[:, 3],
+        )
+
+    def simulation_args(self) -> dict:
+        """`simulate_submissions` 的参数（提交的四列与比赛时长、补题有效期）"""
+        account_ids, problem_ids, accepted, seconds = self._submission_arrays()
+        return dict(
+            account_ids=account_ids,
+            problem_ids=problem_ids,
+            accepted=accepted,
+            seconds=seconds,
+            length=self.db_vjudge_contest.length.total_seconds(),
+            expiration=datetime.timedelta(
+                days=acmana.config["common"]["upsolve"]["expiration"]
+            ).total_seconds(),
+        )
+
+    def _simulate_contest_numpy(
+        self,
+        result: pd.DataFrame | None = None,
+        problem_stats: pd.DataFrame | None = None,
+    ) -> pd.DataFrame:
+        """用数组运算一次性模拟所有提交
+
+        :param result, problem_stats: 已经模拟好的结果（`simulate_submissions` 的返回值），为 None 时在这里模拟
+        :return: 每道题的统计"""
+        simulation_args = self.simulation_args()
+        if result is None or problem_stats is None:
+            result, problem_stats = simulate_submissions(
+                **simulation_args, with_problem_stats=True
+            )
+        account_ids, seconds = (
+            simulation_args["account_ids"],
+            simulation_args["seconds"],
+        )
+
+        # 与逐个提交模拟时一样，按照第一次提交的时间顺序创建排名
+        accounts: dict[int, VjudgeAccount] = {
+            account.id: account for account in self.participants_vjudge_account.values()
+        }
+        first_submit_order = pd.unique(account_ids[np.argsort(seconds, kind="stable")])
+        for account_id in first_submit_order:
+            account = accounts[int(account_id)]
+            ranking_item = VjudgeRankingItem(
+                account=account, vjudge_contest_crawler=self
+            )
+            row = result.loc[account.id]
+            db_vjudge_ranking = ranking_item.db_vjudge_ranking
+            db_vjudge_ranking.competition_rank = (
+                None
+                if pd.isna(row["competition_rank"])
+                else int(row["competition_rank"])
+            )
+            db_vjudge_ranking.solved_cnt = int(row["solved_cnt"])
+            db_vjudge_ranking.upsolved_cnt = int(row["upsolved_cnt"])
+            db_vjudge_ranking.penalty = datetime.timedelta(
+                seconds=int(row["penalty_seconds"])
+            )
+            db_vjudge_ranking.accepted_mask = int(row["accepted_mask"])
+            self.db_vjudge_contest.rankings.append(db_vjudge_ranking)
+        return problem_stats
+
+    def _simulate_contest_objects(self) -> pd.DataFrame:
+        """按照时间顺序逐个提交模拟
+
+        :return: 每道题的统计"""
+        self.submissions.sort(key=lambda x: x.seconds)  # 按照时间顺序模拟提交
+        vjudge_ranking_items_dict: dict[int, VjudgeRankingItem] = {}
+        accounts: dict[int, VjudgeAccount] = {
+            account.id: account for account in self.participants_vjudge_account.values()
+        }
 
         truncation = bisect.bisect_right(  # 找到第一个比赛结束的提交分割点
-            self.submissions, self.db_vjudge_contest.length, key=lambda x: x.time
+            self.submissions,
+            self.db_vjudge_contest.length.total_seconds(),
+            key=lambda x: x.seconds,
         )
 
         # 比赛中的提交
         for submission in self.submissions[:truncation]:  # 按照时间顺序模拟提交
             if (
-                submission.account.id not in vjudge_ranking_items_dict
+                submission.account_id not in vjudge_ranking_items_dict
             ):  # 如果还未创建过这个人的 VjudgeRankingItem
-                vjudge_ranking_items_dict[submission.account.id] = VjudgeRankingItem(
-                    account=submission.account,
+                vjudge_ranking_items_dict[submission.account_id] = VjudgeRankingItem(
+                    account=accounts[submission.account_id],
                     vjudge_contest_crawler=self,
                 )
 
-            vjudge_ranking_items_dict[submission.account.id].submit(
+            vjudge_ranking_items_dict[submission.account_id].submit(
                 submission=submission
             )
 
@@ -92,16 +436,15 @@ class VjudgeContestCrawler:
 
         # 比赛结束后的提交
         for submission in self.submissions[truncation:]:
-            if submission.account.id not in vjudge_ranking_items_dict:
-                vjudge_ranking_items_dict[submission.account.id] = VjudgeRankingItem(
-                    account=submission.account,
+            if submission.account_id not in vjudge_ranking_items_dict:
+                vjudge_ranking_items_dict[submission.account_id] = VjudgeRankingItem(
+                    account=accounts[submission.account_id],
                     vjudge_contest_crawler=self,
                 )
 
-            vjudge_ranking_items_dict[submission.account.id].submit(
+            vjudge_ranking_items_dict[submission.account_id].submit(
                 submission=submission
             )
-            # print(vjudge_ranking_items_dict[submission.account.id].db_vjudge_ranking.penalty)
 
         # vjudge_competition_ranking_items_list = list(
         #     filter(
@@ -116,7 +459,9 @@ class VjudgeContestCrawler:
 
         # 将`所有的` db_vjudge_ranking 添加到 db_vjudge_contest
         for item in vjudge_ranking_items_dict.values():
+            item.db_vjudge_ranking.accepted_mask = item.problem_set.accepted_mask
             self.db_vjudge_contest.rankings.append(item.db_vjudge_ranking)
+        return self.problem_stats.to_frame(len(vjudge_ranking_items_dict))
 
     def __repr__(self) -> str:
         return f"VjudgeContestCrawler(vjudge_contest={self.db_vjudge_contest}, submissions={self.submissions}, participants={self.participants_vjudge_account})"
@@ -0,0 +1,139 @@
+import concurrent.futures
+import logging
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from acmana.crawler.vjudge.contest import VjudgeContestCrawler
+from acmana.crawler.vjudge.contest.vjudge_simulation import simulate_submissions
+from acmana.models import sqlsession
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_COLUMNS = ("account_ids", "problem_ids", "accepted", "seconds")
+
+
+def _simulate_in_worker(
+    shm_name: str,
+    total: int,
+    start: int,
+    stop: int,
+    length: float,
+    expiration: float,
+) -> tuple[np.ndarray, pd.DataFrame]:
+    """在子进程中模拟一场比赛：直接读取共享内存中第 [start, stop) 个提交（不复制、不序列化）
+
+    :return: 紧凑的结果，每个账号一行
+        (account_id, competition_rank（不参与排名为 0）, solved_cnt, upsolved_cnt, penalty_seconds, accepted_mask)；
+        以及每道题的统计（每道题一行，直接返回）
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)  # 由父进程负责释放（unlink）
+    try:
+        submissions = np.ndarray((total, 4), dtype=np.int64, buffer=shm.buf)[start:stop]
+        result, problem_stats = simulate_submissions(
+            account_ids=submissions[:, 0],
+            problem_ids=submissions[:, 1],
+            accepted=submissions[:, 2].astype(bool),
+            seconds=submissions[:, 3],
+            length=length,
+            expiration=expiration,
+            with_problem_stats=True,
+        )
+        del submissions  # 关闭共享内存之前需要释放所有引用它的数组
+    finally:
+        shm.close()
+    records = np.column_stack(
+        [
+            result.index.to_numpy(dtype=np.int64),
+            result["competition_rank"].fillna(0).to_numpy(dtype=np.int64),
+            result["solved_cnt"].to_numpy(dtype=np.int64),
+            result["upsolved_cnt"].to_numpy(dtype=np.int64),
+            result["penalty_seconds"].to_numpy(dtype=np.int64),
+            result["accepted_mask"].to_numpy(dtype=np.int64),
+        ]
+    )
+    return records, problem_stats
+
+
+def _from_records(records: np.ndarray) -> pd.DataFrame:
+    """将 `_simulate_in_worker` 的结果还原为 `simulate_submissions` 的返回值"""
+    competition_rank = pd.array(records[:, 1], dtype="Int64")
+    competition_rank[records[:, 1] == 0] = pd.NA
+    return pd.DataFrame(
+        {
+            "competition_rank": competition_rank,
+            "solved_cnt": records[:, 2],
+            "upsolved_cnt": records[:, 3],
+            "penalty_seconds": records[:, 4],
+            "accepted_mask": records[:, 5],
+        },
+        index=pd.Index(records[:, 0], name="account_id"),
+    )
+
+
+def simulate_contests_in_parallel(
+    crawlers: list[VjudgeContestCrawler], max_workers: int | None = None
+):
+    """在多个进程中同时模拟多场比赛（补全一个学期的比赛、修改规则之后重新计算时使用）
+
+    父进程将每场比赛的提交解码为 (账号 id, 题目, 是否通过, 秒数) 四列，依次放入同一块共享内存；
+    子进程直接在共享内存上模拟，只返回每个账号一行的紧凑结果；最后父进程将所有比赛的结果存储到数据库并一起提交。
+    可以增量模拟补题的比赛（参见 `VjudgeContestCrawler.resume_upsolve`）只需要模拟少量新提交，直接在父进程中模拟
+
+    :param crawlers: 以 `simulate=False` 创建的爬虫"""
+    to_simulate: list[VjudgeContestCrawler] = [
+        crawler for crawler in crawlers if not crawler.resume_upsolve
+    ]
+    simulation_args: list[dict] = [crawler.simulation_args() for crawler in to_simulate]
+    offsets = np.cumsum([0] + [len(args["seconds"]) for args in simulation_args])
+    total = int(offsets[-1])
+
+    results: dict[int, tuple[pd.DataFrame, pd.DataFrame]] = {}
+    shm = shared_memory.SharedMemory(create=True, size=max(total * 4 * 8, 1))
+    try:
+        submissions = np.ndarray((total, 4), dtype=np.int64, buffer=shm.buf)
+        for args, start, stop in zip(simulation_args, offsets[:-1], offsets[1:]):
+            for column, name in enumerate(SUBMISSION_COLUMNS):
+                submissions[start:stop, column] = args[name]
+        del submissions
+
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers
+        ) as executor:
+            futures = {
+                executor.submit(
+                    _simulate_in_worker,
+                    shm.name,
+                    total,
+                    int(start),
+                    int(stop),
+                    args["length"],
+                    args["expiration"],
+                ): crawler
+                for crawler, args, start, stop in zip(
+                    to_simulate, simulation_args, offsets[:-1], offsets[1:]
+                )
+            }
+            for future in concurrent.futures.as_completed(futures):
+                crawler = futures[future]
+                logger.info(f"Simulated {crawler.db_vjudge_contest}")
+                records, problem_stats = future.result()
+                results[crawler.db_vjudge_contest.id] = (
+                    _from_records(records),
+                    problem_stats,
+                )
+    finally:
+        shm.close()
+        shm.unlink()
+
+    for crawler in crawlers:  # 所有比赛的结果一起提交
+        simulated, problem_stats = results.get(
+            crawler.db_vjudge_contest.id, (None, None)
+        )
+        crawler.simulate_contest(
+            simulated=simulated,
+            commit=False,
+            simulated_problem_stats=problem_stats,
+        )
+    sqlsession.commit()
@@ -1,8 +1,10 @@
+import array
 import datetime
 import logging
 from typing import TYPE_CHECKING
 
 import acmana
+from acmana.crawler.vjudge.contest.vjudge_simulation import WRONG_ATTEMPT_PENALTY
 from acmana.crawler.vjudge.contest.vjudge_submission import VjudgeSubmission
 from acmana.models.account.vjudge_account import VjudgeAccount
 from acmana.models.ranking.vjudge_ranking import VjudgeRanking
@@ -14,34 +16,58 @@ logger = logging.getLogger(__name__)
 
 
 class ProblemSet:
-    class Problem:
-        def __init__(self) -> None:
-            self.accepted: bool | None = None  # 是否已经通过
-            self.penalty: datetime.timedelta = datetime.timedelta()  # 罚时
+    """一个账号所有题目的状态：通过状态为一个 bitmask，罚时为每道题通过前的错误次数（按题号增长的小数组），
+    避免为每个 (账号, 题目) 创建一个对象"""
+
+    __slots__ = ("accepted_mask", "wrong_attempts")
 
     def __init__(self) -> None:
-        self.problem_dict: dict[int, ProblemSet.Problem] = {}
-        pass
+        self.accepted_mask: int = 0  # 第 i 位为 1 表示第 i 题已经通过
+        self.wrong_attempts: array.array = array.array("I")  # 第 i 题通过前的错误次数
 
-    def __getitem__(self, index):  # 获取第 i 题
-        if index not in self.problem_dict:
-            self.problem_dict[index] = ProblemSet.Problem()  # 如果没有这道题，创建一个
-            return self.problem_dict[index]
-        else:
-            return self.problem_dict[index]
+    def is_accepted(self, problem_id: int) -> bool:
+        return (self.accepted_mask >> problem_id) & 1 == 1
+
+    def set_accepted(self, problem_id: int) -> None:
+        self.accepted_mask |= 1 << problem_id
+
+    def add_wrong_attempt(self, problem_id: int) -> None:
+        if problem_id >= len(self.wrong_attempts):
+            self.wrong_attempts.extend(
+                [0] * (problem_id + 1 - len(self.wrong_attempts))
+            )
+        self.wrong_attempts[problem_id] += 1
+
+    def penalty_seconds(self, problem_id: int) -> int:
+        """此题的错误提交罚时（秒），只有过题后才会纳入罚时计算"""
+        if problem_id >= len(self.wrong_attempts):
+            return 0
+        return self.wrong_attempts[problem_id] * WRONG_ATTEMPT_PENALTY
 
 
 class VjudgeRankingItem:
+    __slots__ = (
+        "db_account",
+        "vjudge_contest_crawler",
+        "db_vjudge_ranking",
+        "first_submit_time",
+        "problem_set",
+    )
+
     def __init__(
         self,
         account: VjudgeAccount,
         vjudge_contest_crawler: "VjudgeContestCrawler",
+        resume: bool = False,
     ) -> None:
+        """
+        :param: resume: 从已经存储的排名与题目状态（`accepted_mask`）继续模拟，而不是清空之后重新计算，
+            用于比赛结束后增量模拟补题
+        """
         self.db_account: VjudgeAccount = account
         self.vjudge_contest_crawler: "VjudgeContestCrawler" = vjudge_contest_crawler
-        self.db_vjudge_ranking: VjudgeRanking = VjudgeRanking.index_query(  # type: ignore
-            contest_id=self.vjudge_contest_crawler.db_vjudge_contest.id,
-            account_id=self.db_account.id,
+        self.db_vjudge_ranking: VjudgeRanking = (  # type: ignore
+            self.vjudge_contest_crawler.existing_rankings.get(self.db_account.id)
         )
 
         if self.db_vjudge_ranking is None:  # 如果还没有创建过 “这个人这场比赛” 对应的 VjudgeRanking
@@ -52,15 +78,18 @@ class VjudgeRankingItem:
                 solved_cnt=0,
                 upsolved_cnt=0,
                 penalty=datetime.timedelta(),
+                accepted_mask=0,
             )
-        else:  # 如果已经创建过了——>清空数据以在之后重新计算
+        elif not resume:  # 如果已经创建过了——>清空数据以在之后重新计算
             self.db_vjudge_ranking.competition_rank = None
             self.db_vjudge_ranking.solved_cnt = 0
             self.db_vjudge_ranking.upsolved_cnt = 0
             self.db_vjudge_ranking.penalty = datetime.timedelta()
+            self.db_vjudge_ranking.accepted_mask = 0
 
-        self.first_submit_time: datetime.timedelta
+        self.first_submit_time: datetime.timedelta | None = None
         self.problem_set: ProblemSet = ProblemSet()
+        self.problem_set.accepted_mask = self.db_vjudge_ranking.accepted_mask or 0
 
     def __repr__(self) -> str:
         return f"account: {self.db_account}, contest_id: {self.vjudge_contest_crawler.db_vjudge_contest.id}, db_vjudge_ranking: {self.db_vjudge_ranking}, first_submit_time: {self.first_submit_time}"
@@ -90,40 +119,48 @@ class VjudgeRankingItem:
     def submit(self, submission: VjudgeSubmission):
         """提交题目。注意！需要按照提交时间排序顺序提交！"""
 
-        if getattr(self, "first_submit_time", None) is None:  # 第一次提交
+        if self.first_submit_time is None:  # 第一次提交
             self.first_submit_time = submission.time
 
-        if (
-            submission.time < self.vjudge_contest_crawler.db_vjudge_contest.length
-        ):  # 在比赛时间内提交
-            if not self.problem_set[submission.problem_id].accepted:  # 如果之前还没有通过这道题
+        length_seconds = (
+            self.vjudge_contest_crawler.db_vjudge_contest.length.total_seconds()
+        )
+        problem_stats = self.vjudge_contest_crawler.problem_stats  # 同时累计每道题的统计
+        if submission.seconds < length_seconds:  # 在比赛时间内提交
+            problem_stats.submit(submission.problem_id, submission.accepted, True)
+            if not self.problem_set.is_accepted(submission.problem_id):  # 如果之前还没有通过这道题
                 if submission.accepted:  # 如果通过这道题——>通过题目数+1，总罚时 += 此题的罚时
                     self.db_vjudge_ranking.solved_cnt += 1
-                    self.db_vjudge_ranking.penalty += (
-                        submission.time
-                        + self.problem_set[submission.problem_id].penalty
+                    self.db_vjudge_ranking.penalty += datetime.timedelta(
+                        seconds=submission.seconds
+                        + self.problem_set.penalty_seconds(submission.problem_id)
+                    )
+                    self.problem_set.set_accepted(submission.problem_id)
+                    problem_stats.solve(
+                        submission.problem_id, self.db_account.id, submission.seconds
                     )
-                    self.problem_set[submission.problem_id].accepted = True
                 else:  # 如果没有通过这道题——>此题的罚时+20min（只有过题后才会纳入罚时计算）
-                    self.problem_set[
-                        submission.problem_id
-                    ].penalty += datetime.timedelta(minutes=20)
+                    self.problem_set.add_wrong_attempt(submission.problem_id)
             else:  # 对于已经通过的题目，不再进行处理
                 if submission.accepted:
                     logger.debug(f"比赛时重复提交已经通过的题目并通过，跳过: {submission}")
                 else:
                     logger.debug(f"比赛时重复提交已经通过的题目但没有通过，跳过: {submission}")
         elif (
-            submission.time
-            <= self.vjudge_contest_crawler.db_vjudge_contest.length
-            + datetime.timedelta(days=acmana.config["common"]["upsolve"]["expiration"])
+            submission.seconds
+            <= length_seconds
+            + datetime.timedelta(
+                days=acmana.config["common"]["upsolve"]["expiration"]
+            ).total_seconds()
         ):  # 7 天内补题
+            problem_stats.submit(submission.problem_id, submission.accepted, False)
             if submission.accepted:
-                if self.problem_set[submission.problem_id].accepted:  # 过题后重复提交
+                if self.problem_set.is_accepted(submission.problem_id):  # 过题后重复提交
                     logger.debug(f"补题重复提交已经通过的题目并通过，跳过: {submission}")
                 else:
                     self.db_vjudge_ranking.upsolved_cnt += 1
-                    self.problem_set[submission.problem_id].accepted = True
+                    self.problem_set.set_accepted(submission.problem_id)
+                    problem_stats.upsolve(submission.problem_id)
             else:  # 补题没有通过不计算罚时
                 pass
         else:
@@ -0,0 +1,424 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from acmana.crawler.problem_stats import problem_rates
+from acmana.models.problem_stats import PROBLEM_STATS_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+WRONG_ATTEMPT_PENALTY = 20 * 60  # 每次错误提交的罚时（秒），只有过题后才会纳入罚时计算
+
+
+def _sort_by_time(
+    account_ids: np.ndarray,
+    problem_ids: np.ndarray,
+    accepted: np.ndarray,
+    seconds: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """按照时间顺序排序（同一时间保持 api 中的顺序）"""
+    order = np.argsort(seconds, kind="stable")
+    return (
+        np.asarray(account_ids, dtype=np.int64)[order],
+        np.asarray(problem_ids, dtype=np.int64)[order],
+        np.asarray(accepted, dtype=bool)[order],
+        np.asarray(seconds, dtype=np.int64)[order],
+    )
+
+
+def _first_accepted(
+    account_index: np.ndarray,
+    problem_ids: np.ndarray,
+    accepted: np.ndarray,
+    seconds: np.ndarray,
+    in_contest: np.ndarray,
+    wrong_attempt_penalty: int = WRONG_ATTEMPT_PENALTY,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """按 (账号, 题目) 分组，找出比赛期间每道题第一次通过的提交（提交需要已经按时间排序）
+
+    :return: pair_index（每个提交所属的分组）, pair_account（每个分组的账号序号）, pair_problem（每个分组的题目）,
+        first_ac（每个分组第一次通过的提交位置，没有通过为提交数）, pair_penalty（每个分组的罚时，没有通过为 0）"""
+    n = len(seconds)
+    positions = np.arange(n)
+    pairs, pair_index = np.unique(
+        np.stack([account_index, problem_ids], axis=1), axis=0, return_inverse=True
+    )
+    pair_index = pair_index.reshape(-1)
+
+    # 比赛期间每道题第一次通过的位置
+    first_ac = np.full(len(pairs), n)
+    np.minimum.at(first_ac, pair_index, np.where(in_contest & accepted, positions, n))
+    solved = first_ac < n
+    # 第一次通过之前的错误次数
+    wrong_before_ac = np.bincount(
+        pair_index,
+        weights=in_contest & ~accepted & (positions < first_ac[pair_index]),
+        minlength=len(pairs),
+    ).astype(np.int64)
+    pair_penalty = np.where(
+        solved,
+        seconds[np.minimum(first_ac, n - 1)] + wrong_attempt_penalty * wrong_before_ac,
+        0,
+    )
+    return pair_index, pairs[:, 0], pairs[:, 1], first_ac, pair_penalty
+
+
+def _rank(
+    accounts: np.ndarray, solved_cnt: np.ndarray, penalty_seconds: np.ndarray
+) -> np.ndarray:
+    """过题数多、罚时少、账号 id 小的排名靠前，返回按排名排序的下标"""
+    return np.lexsort((accounts, penalty_seconds, -solved_cnt))
+
+
+def simulate_submissions(
+    account_ids: np.ndarray,
+    problem_ids: np.ndarray,
+    accepted: np.ndarray,
+    seconds: np.ndarray,
+    length: float,
+    expiration: float,
+    wrong_attempt_penalty: int = WRONG_ATTEMPT_PENALTY,
+    with_problem_stats: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """用分组、排序的数组运算模拟整场比赛，结果与逐个提交模拟的 `VjudgeRankingItem.submit` 一致
+
+    - 比赛期间（`seconds < length`）：每道题第一次通过时计入过题数，罚时为通过时间 + 之前的错误次数 * 20min
+    - 补题（`length <= seconds <= length + expiration`）：比赛期间没有通过的题目通过后计入补题数
+    - 在比赛结束前（`seconds <= length`）有提交的账号参与排名：过题数多、罚时少、账号 id 小的排名靠前
+
+    :param account_ids, problem_ids, accepted, seconds: 每个提交一个元素的列
+    :param length: 比赛时长（秒）
+    :param expiration: 补题有效期（秒）
+    :param wrong_attempt_penalty: 每次错误提交的罚时（秒）
+    :param with_problem_stats: 是否同时返回每道题的统计
+    :return: 以 account_id 为 index，包含 competition_rank, solved_cnt, upsolved_cnt, penalty_seconds, accepted_mask 列的 DataFrame，
+        每个有提交的账号一行（按 account_id 排序）；`with_problem_stats` 时另外返回以 problem_index 为 index 的每道题的统计
+    """
+    result = simulate_contests(
+        contest_index=np.zeros(len(seconds), dtype=np.int64),
+        account_ids=account_ids,
+        problem_ids=problem_ids,
+        accepted=accepted,
+        seconds=seconds,
+        length=np.array([length]),
+        expiration=np.array([expiration]),
+        wrong_attempt_penalty=wrong_attempt_penalty,
+        with_problem_stats=with_problem_stats,
+    )
+    if with_problem_stats:
+        result, problem_stats = result
+        return result.droplevel("contest_index"), problem_stats.droplevel(
+            "contest_index"
+        )
+    return result.droplevel("contest_index")
+
+
+def simulate_contests(
+    contest_index: np.ndarray,
+    account_ids: np.ndarray,
+    problem_ids: np.ndarray,
+    accepted: np.ndarray,
+    seconds: np.ndarray,
+    length: np.ndarray,
+    expiration: np.ndarray,
+    wrong_attempt_penalty: int = WRONG_ATTEMPT_PENALTY,
+    with_problem_stats: bool = False,
+) -> pd.DataFrame | tuple[pd.DataFrame, pd.DataFrame]:
+    """一次模拟多场比赛：所有比赛的提交按 (比赛, 账号) 一起分组、排序，每场比赛的结果与 `simulate_submissions` 一致
+
+    :param contest_index: 每个提交所属比赛的序号
+    :param account_ids, problem_ids, accepted, seconds: 每个提交一个元素的列
+    :param length, expiration: 每场比赛的比赛时长、补题有效期（秒），按比赛的序号索引
+    :param wrong_attempt_penalty: 每次错误提交的罚时（秒）
+    :param with_problem_stats: 是否同时返回每道题的统计（在同一次分组中计算），参见 `_problem_stats`
+    :return: 以 (contest_index, account_id) 为 index，列与 `simulate_submissions` 相同的 DataFrame；
+        `with_problem_stats` 时另外返回以 (contest_index, problem_index) 为 index 的每道题的统计
+    """
+    if len(seconds) == 0:
+        result = pd.DataFrame(
+            {
+                "competition_rank": pd.array([], dtype="Int64"),
+                "solved_cnt": np.zeros(0, dtype=np.int64),
+                "upsolved_cnt": np.zeros(0, dtype=np.int64),
+                "penalty_seconds": np.zeros(0, dtype=np.int64),
+                "accepted_mask": np.zeros(0, dtype=np.int64),
+            },
+            index=pd.MultiIndex.from_arrays(
+                [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)],
+                names=["contest_index", "account_id"],
+            ),
+        )
+        if with_problem_stats:
+            return result, pd.DataFrame(
+                columns=list(PROBLEM_STATS_COLUMNS),
+                index=pd.MultiIndex.from_arrays(
+                    [np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)],
+                    names=["contest_index", "problem_index"],
+                ),
+            )
+        return result
+    order = np.argsort(seconds, kind="stable")
+    contest_index = np.asarray(contest_index, dtype=np.int64)[order]
+    account_ids, problem_ids, accepted, seconds = _sort_by_time(
+        account_ids, problem_ids, accepted, seconds
+    )
+    length = np.asarray(length, dtype=float)[contest_index]
+    expiration = np.asarray(expiration, dtype=float)[contest_index]
+
+    in_contest = seconds < length
+    in_upsolve = (seconds >= length) & (seconds <= length + expiration)
+    if np.any(seconds > length + expiration):
+        logger.warning(f"{int(np.sum(seconds > length + expiration))} 个提交的补题时间超过有效期，跳过")
+
+    # 每个 (比赛, 账号) 作为一个分组
+    accounts, account_index = np.unique(
+        np.stack([contest_index, account_ids], axis=1), axis=0, return_inverse=True
+    )
+    account_index = account_index.reshape(-1)
+    pair_index, pair_account, pair_problem, first_ac, pair_penalty = _first_accepted(
+        account_index, problem_ids, accepted, seconds, in_contest, wrong_attempt_penalty
+    )
+    solved = first_ac < len(seconds)
+    # 比赛期间没有通过、补题时通过
+    upsolved = ~solved & (
+        np.bincount(pair_index, weights=in_upsolve & accepted, minlength=len(solved))
+        > 0
+    )
+
+    solved_cnt = np.bincount(pair_account, weights=solved, minlength=len(accounts))
+    upsolved_cnt = np.bincount(pair_account, weights=upsolved, minlength=len(accounts))
+    penalty_seconds = np.bincount(
+        pair_account, weights=pair_penalty, minlength=len(accounts)
+    )
+    # 通过的题目（比赛期间或者补题）的 bitmask，补题期间增量模拟时从这里继续
+    accepted_mask = np.zeros(len(accounts), dtype=np.int64)
+    np.bitwise_or.at(
+        accepted_mask,
+        pair_account[solved | upsolved],
+        np.left_shift(1, pair_problem[solved | upsolved]),
+    )
+
+    # 比赛结束前有提交的账号参与排名，每场比赛分别排名
+    participated = np.zeros(len(accounts), dtype=bool)
+    participated[account_index[seconds <= length]] = True
+    ranked = np.flatnonzero(participated)
+    ranked = ranked[
+        np.lexsort(
+            (
+                accounts[ranked, 1],
+                penalty_seconds[ranked],
+                -solved_cnt[ranked],
+                accounts[ranked, 0],
+            )
+        )
+    ]
+    ranked_contest = accounts[ranked, 0]
+    competition_rank = pd.array([None] * len(accounts), dtype="Int64")
+    competition_rank[ranked] = (
+        np.arange(len(ranked)) - np.searchsorted(ranked_contest, ranked_contest) + 1
+    )
+
+    result = pd.DataFrame(
+        {
+            "competition_rank": competition_rank,
+            "solved_cnt": solved_cnt.astype(np.int64),
+            "upsolved_cnt": upsolved_cnt.astype(np.int64),
+            "penalty_seconds": penalty_seconds.astype(np.int64),
+            "accepted_mask": accepted_mask,
+        },
+        index=pd.MultiIndex.from_arrays(
+            [accounts[:, 0], accounts[:, 1]], names=["contest_index", "account_id"]
+        ),
+    )
+    if with_problem_stats:
+        return result, _problem_stats(
+            contest_index,
+            account_ids,
+            problem_ids,
+            seconds,
+            in_contest & accepted,
+            in_contest,
+            in_upsolve,
+            pair_index,
+            first_ac,
+            solved,
+            upsolved,
+            accounts[:, 0],
+        )
+    return result
+
+
+def _problem_stats(
+    contest_index: np.ndarray,
+    account_ids: np.ndarray,
+    problem_ids: np.ndarray,
+    seconds: np.ndarray,
+    contest_accepted: np.ndarray,
+    in_contest: np.ndarray,
+    in_upsolve: np.ndarray,
+    pair_index: np.ndarray,
+    first_ac: np.ndarray,
+    solved: np.ndarray,
+    upsolved: np.ndarray,
+    account_contest: np.ndarray,
+) -> pd.DataFrame:
+    """由 `simulate_contests` 中已经按时间排序的提交与 (账号, 题目) 分组计算每道题的统计，
+    结果与逐个提交模拟时的 `ProblemStatsCollector` 一致
+
+    - 提交数、通过的提交数只统计比赛期间的提交
+    - 首杀为比赛期间第一个通过的提交（时间相同时按 api 中的顺序）
+    - 只包含在比赛期间或补题有效期内有提交的题目
+
+    :param account_contest: 每个 (比赛, 账号) 分组所属的比赛序号
+    :return: 以 (contest_index, problem_index) 为 index，包含 `PROBLEM_STATS_COLUMNS` 列的 DataFrame
+    """
+    n = len(seconds)
+    problems, problem_index = np.unique(
+        np.stack([contest_index, problem_ids], axis=1), axis=0, return_inverse=True
+    )
+    problem_index = problem_index.reshape(-1)
+    n_problems = len(problems)
+    pair_problem = np.zeros(len(solved), dtype=np.int64)
+    pair_problem[pair_index] = problem_index
+
+    attempt_cnt = np.bincount(problem_index, weights=in_contest, minlength=n_problems)
+    accepted_cnt = np.bincount(
+        problem_index, weights=contest_accepted, minlength=n_problems
+    )
+    solved_cnt = np.bincount(pair_problem, weights=solved, minlength=n_problems)
+    upsolved_cnt = np.bincount(pair_problem, weights=upsolved, minlength=n_problems)
+    first_blood = np.full(n_problems, n)
+    np.minimum.at(first_blood, pair_problem[solved], first_ac[solved])
+    has_first_blood = first_blood < n
+    first_blood_account_id = pd.array([None] * n_problems, dtype="Int64")
+    first_blood_account_id[has_first_blood] = account_ids[first_blood[has_first_blood]]
+    first_blood_seconds = pd.array([None] * n_problems, dtype="Int64")
+    first_blood_seconds[has_first_blood] = seconds[first_blood[has_first_blood]]
+
+    accounts_num = np.bincount(account_contest)  # 每场比赛有提交的账号数
+    ac_rate, upsolve_rate = problem_rates(
+        attempt_cnt,
+        accepted_cnt,
+        solved_cnt,
+        upsolved_cnt,
+        accounts_num[problems[:, 0]],
+    )
+    problem_stats = pd.DataFrame(
+        {
+            "first_blood_account_id": first_blood_account_id,
+            "first_blood_seconds": first_blood_seconds,
+            "attempt_cnt": attempt_cnt.astype(np.int64),
+            "accepted_cnt": accepted_cnt.astype(np.int64),
+            "solved_cnt": solved_cnt.astype(np.int64),
+            "upsolved_cnt": upsolved_cnt.astype(np.int64),
+            "ac_rate": ac_rate,
+            "upsolve_rate": upsolve_rate,
+        },
+        index=pd.MultiIndex.from_arrays(
+            [problems[:, 0], problems[:, 1]], names=["contest_index", "problem_index"]
+        ),
+    )[list(PROBLEM_STATS_COLUMNS)]
+    # 只有超过补题有效期的提交的题目不计入
+    valid = (
+        np.bincount(
+            problem_index, weights=in_contest | in_upsolve, minlength=n_problems
+        )
+        > 0
+    )
+    return problem_stats[valid]
+
+
+class StandingsTimeline:
+    """比赛期间任意时刻的排名（「时间旅行」），用于查询一小时、封榜时刻的排名或者逐小时回放
+
+    由按时间排序的提交一次性构建：
+    - 比赛期间每道题第一次通过是一个事件（时间、账号、此题罚时），所有事件按时间排序
+    - 每隔 `checkpoint_interval` 个事件存储一次所有账号过题数、罚时的前缀和作为检查点
+
+    查询时刻 t 时从 t 之前最近的检查点出发，只需再累加不超过 `checkpoint_interval` 个事件，
+    不需要重新模拟所有提交"""
+
+    def __init__(
+        self,
+        account_ids: np.ndarray,
+        problem_ids: np.ndarray,
+        accepted: np.ndarray,
+        seconds: np.ndarray,
+        length: float,
+        checkpoint_interval: int | None = None,
+    ) -> None:
+        """
+        :param account_ids, problem_ids, accepted, seconds: 每个提交一个元素的列
+        :param length: 比赛时长（秒）
+        :param checkpoint_interval: 检查点之间的事件数，默认为事件数的平方根
+        """
+        account_ids, problem_ids, accepted, seconds = _sort_by_time(
+            account_ids, problem_ids, accepted, seconds
+        )
+        self.length: float = length
+        self.accounts, account_index = np.unique(account_ids, return_inverse=True)
+        n_accounts = len(self.accounts)
+
+        # 第一次提交之后参与排名
+        self.first_submit_seconds = np.full(n_accounts, np.iinfo(np.int64).max)
+        np.minimum.at(self.first_submit_seconds, account_index, seconds)
+
+        _, pair_account, _, first_ac, pair_penalty = _first_accepted(
+            account_index, problem_ids, accepted, seconds, seconds < length
+        )
+        solved = first_ac < len(seconds)
+        event_order = np.argsort(first_ac[solved], kind="stable")  # 提交已经按时间排序
+        self.event_seconds: np.ndarray = seconds[first_ac[solved]][event_order]
+        self.event_account: np.ndarray = pair_account[solved][event_order]
+        self.event_penalty: np.ndarray = pair_penalty[solved][event_order]
+
+        n_events = len(self.event_seconds)
+        if checkpoint_interval is None:
+            checkpoint_interval = max(1, int(np.sqrt(n_events)))
+        self.checkpoint_interval: int = checkpoint_interval
+        # 第 k 个检查点为前 k * checkpoint_interval 个事件的累计
+        n_checkpoints = n_events // checkpoint_interval + 1
+        event_checkpoint = np.arange(n_events) // checkpoint_interval + 1
+        counted = event_checkpoint < n_checkpoints
+        self.checkpoint_solved = np.zeros((n_checkpoints, n_accounts), dtype=np.int64)
+        self.checkpoint_penalty = np.zeros((n_checkpoints, n_accounts), dtype=np.int64)
+        np.add.at(
+            self.checkpoint_solved,
+            (event_checkpoint[counted], self.event_account[counted]),
+            1,
+        )
+        np.add.at(
+            self.checkpoint_penalty,
+            (event_checkpoint[counted], self.event_account[counted]),
+            self.event_penalty[counted],
+        )
+        np.cumsum(self.checkpoint_solved, axis=0, out=self.checkpoint_solved)
+        np.cumsum(self.checkpoint_penalty, axis=0, out=self.checkpoint_penalty)
+
+    def standings_at(self, seconds: float) -> pd.DataFrame:
+        """比赛开始 `seconds` 秒时的排名（包括这一秒的提交），超过比赛时长时为终榜
+
+        :return: 以 account_id 为 index，包含 competition_rank, solved_cnt, penalty_seconds 列的 DataFrame，
+            只包含此时已经有提交的账号（按排名排序）"""
+        seconds = min(seconds, self.length)
+        n_events = int(np.searchsorted(self.event_seconds, seconds, side="right"))
+        checkpoint = n_events // self.checkpoint_interval
+        solved_cnt = self.checkpoint_solved[checkpoint].copy()
+        penalty_seconds = self.checkpoint_penalty[checkpoint].copy()
+        rest = slice(checkpoint * self.checkpoint_interval, n_events)
+        np.add.at(solved_cnt, self.event_account[rest], 1)
+        np.add.at(penalty_seconds, self.event_account[rest], self.event_penalty[rest])
+
+        ranked = np.flatnonzero(self.first_submit_seconds <= seconds)
+        ranked = ranked[
+            _rank(self.accounts[ranked], solved_cnt[ranked], penalty_seconds[ranked])
+        ]
+        return pd.DataFrame(
+            {
+                "competition_rank": np.arange(1, len(ranked) + 1),
+                "solved_cnt": solved_cnt[ranked],
+                "penalty_seconds": penalty_seconds[ranked],
+            },
+            index=pd.Index(self.accounts[ranked], name="account_id"),
+        )
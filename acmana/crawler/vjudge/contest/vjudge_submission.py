@@ -1,41 +1,42 @@
 import datetime
-from typing import TYPE_CHECKING
 
 from acmana.models.account.vjudge_account import VjudgeAccount
 
-if TYPE_CHECKING:
-    from acmana.crawler.vjudge.contest import VjudgeContestCrawler
-
 
 class VjudgeSubmission:
+    """一个提交。只保存整数（账号 id、从比赛开始的秒数），不持有 ORM 对象与爬虫的引用，
+    并使用 `__slots__` 以减少上万个提交时的内存占用"""
+
+    __slots__ = ("account_id", "problem_id", "accepted", "seconds")
+
     def __init__(
         self,
+        account_id: int,
         problem_id: int,
         accepted: bool,
-        time: datetime.timedelta,
-        account: VjudgeAccount,
-        contest: "VjudgeContestCrawler",
+        seconds: int,
     ) -> None:
-        self.problem_id = problem_id
+        self.account_id: int = account_id
+        self.problem_id: int = problem_id
         self.accepted: bool = accepted
-        self.time: datetime.timedelta = time
-        self.account: VjudgeAccount = account
-        self.contest: VjudgeContestCrawler = contest
+        self.seconds: int = seconds  # 从比赛开始到提交的秒数
+
+    @property
+    def time(self) -> datetime.timedelta:
+        return datetime.timedelta(seconds=self.seconds)
 
     @classmethod
     def from_api_list(
         cls,
         l: list,
         participants_dict: dict[int, VjudgeAccount],
-        contest: "VjudgeContestCrawler",
     ) -> "VjudgeSubmission":
         return cls(
+            account_id=participants_dict[int(l[0])].id,
             problem_id=int(l[1]),
             accepted=bool(l[2]),
-            time=datetime.timedelta(seconds=int(l[3])),
-            account=participants_dict[int(l[0])],
-            contest=contest,
+            seconds=int(l[3]),
         )
 
     def __repr__(self) -> str:
-        return f"account: {self.account} promble_id: {self.problem_id}, accepted: {self.accepted}, time: {self.time}"
+        return f"account_id: {self.account_id} promble_id: {self.problem_id}, accepted: {self.accepted}, time: {self.time}"
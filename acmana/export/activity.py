@@ -0,0 +1,142 @@
+import pandas as pd
+
+from acmana.export.vjudge.vjudge_ranking import Sheet
+from acmana.models.contest import ContestBase
+from acmana.models.contest.activity import ACTIVITY_COHORTS, unpack_activity
+
+
+class ActivityExcelBook:
+    def __init__(
+        self,
+        path: str,
+        contest_cls: type[ContestBase],
+        div: str | None,
+        sheet_name_remover: str | None = None,
+        constant_memory: bool = False,
+    ) -> None:
+        """一个 div 整个学期的提交活跃度：比赛期间每小时、补题期间每天的提交数，选课同学与其他同学分开
+
+        直接读取爬取时为每场比赛存储的活跃度（`ContestBase.activity`），不需要重新扫描提交。
+        牛客只存储了补题提交，不导出比赛期间的提交数（参见 `ContestBase.has_contest_submissions`）
+
+        :param: contest_cls: VjudgeContest 或者 NowcoderContest
+        :param: sheet_name_remover: 用于 replace 比赛名称中的字符串
+        :param: constant_memory: 参见 `VjudgeExcelBook`
+        """
+        self.writer = pd.ExcelWriter(
+            path,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": constant_memory}},
+        )
+        self.workbook = self.writer.book
+        self.constant_memory: bool = constant_memory
+        self.sheet_name_remover: str | None = sheet_name_remover
+        self.has_contest_submissions: bool = contest_cls.has_contest_submissions
+
+        self.contests: list[ContestBase] = contest_cls.query_finished_contests(div=div)  # type: ignore
+        self.contests.sort(key=lambda x: x.end)
+        # 每场比赛：(比赛期间每小时, 补题期间每天)
+        self.activities: list[tuple[pd.DataFrame, pd.DataFrame]] = [
+            unpack_activity(contest.activity, contest.length.total_seconds())  # type: ignore
+            for contest in self.contests
+        ]
+
+    def write_book(self):
+        sheets: list[ActivitySheet] = [DailySheet(self), ContestActivitySheet(self)]
+        if self.has_contest_submissions:
+            sheets.insert(0, HourlySheet(self))
+        for sheet in sheets:
+            sheet.write_sheet()
+        self.writer.close()
+
+
+class ActivitySheet(Sheet):
+    """第一列为横轴、其余列为各个系列的 Sheet，写入之后在表格右侧插入柱状图"""
+
+    chart_options: dict = {}
+
+    def write_sheet(self):
+        super().write_sheet()
+        if self.df.empty:
+            return
+        worksheet = self.excel_book.workbook.get_worksheet_by_name(self.sheet_name)  # type: ignore
+        chart = self.excel_book.workbook.add_chart({"type": "column", **self.chart_options})  # type: ignore
+        first_row, last_row = 2, 2 + len(self.df) - 1  # 数据从第 3 行开始（标题、表头之后）
+        for col in range(1, len(self.df.columns)):
+            chart.add_series(
+                {
+                    "name": [self.sheet_name, 1, col],
+                    "categories": [self.sheet_name, first_row, 0, last_row, 0],
+                    "values": [self.sheet_name, first_row, col, last_row, col],
+                }
+            )
+        chart.set_title({"name": self.sheet_title})
+        chart.set_size({"width": 720, "height": 400})
+        worksheet.insert_chart(1, len(self.df.columns) + 1, chart)
+
+
+def _sum_activity(frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """将各场比赛的活跃度按照第几小时（天）相加（各场比赛的时长可能不同）"""
+    if not frames:
+        return pd.DataFrame(columns=list(ACTIVITY_COHORTS), dtype=int)
+    return pd.concat(frames).groupby(level=0).sum()
+
+
+class HourlySheet(ActivitySheet):
+    def __init__(self, excel_book: ActivityExcelBook) -> None:
+        self.excel_book: ActivityExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Hourly"
+        self.sheet_title: str = "比赛期间每小时的提交数"
+
+        df = _sum_activity([hourly for hourly, _ in excel_book.activities])
+        self.df = pd.DataFrame(
+            {
+                "时间": [f"第 {hour + 1} 小时" for hour in df.index],
+                **{cohort: df[cohort] for cohort in ACTIVITY_COHORTS},
+            }
+        ).reset_index(drop=True)
+
+
+class DailySheet(ActivitySheet):
+    def __init__(self, excel_book: ActivityExcelBook) -> None:
+        self.excel_book: ActivityExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Daily"
+        self.sheet_title: str = "补题期间每天的提交数"
+
+        df = _sum_activity([daily for _, daily in excel_book.activities])
+        self.df = pd.DataFrame(
+            {
+                "时间": [f"第 {day + 1} 天" for day in df.index],
+                **{cohort: df[cohort] for cohort in ACTIVITY_COHORTS},
+            }
+        ).reset_index(drop=True)
+
+
+class ContestActivitySheet(ActivitySheet):
+    chart_options: dict = {"subtype": "stacked"}
+
+    def __init__(self, excel_book: ActivityExcelBook) -> None:
+        self.excel_book: ActivityExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Contests"
+        self.sheet_title: str = "每场比赛的提交数"
+
+        titles: list[str] = [contest.title for contest in excel_book.contests]
+        if excel_book.sheet_name_remover:
+            titles = [
+                title.replace(excel_book.sheet_name_remover, "") for title in titles
+            ]
+        self.df = pd.DataFrame(
+            {
+                "比赛": titles,
+                **{
+                    f"{phase}({cohort})": [
+                        int(activity[i][cohort].sum())
+                        for activity in excel_book.activities
+                    ]
+                    for i, phase in enumerate(("比赛期间", "补题"))
+                    # 没有比赛期间的提交时，比赛期间的提交数恒为 0
+                    if i or excel_book.has_contest_submissions
+                    for cohort in ACTIVITY_COHORTS
+                },
+            }
+        )
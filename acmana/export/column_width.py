@@ -0,0 +1,37 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+
+def display_widths(series: pd.Series) -> np.ndarray:
+    """向量化计算一列中每个单元格的显示宽度
+
+    East Asian Width 为 W（中文、全角标点等）或 F（全角字母）的字符占 2 个宽度，其余占 1 个宽度"""
+    strings: np.ndarray = series.astype(str).to_numpy(dtype=str)
+    if strings.size == 0:
+        return np.zeros(0, dtype=int)
+    # 定长的 unicode 数组可以直接看作码位矩阵，较短的字符串以 0 填充
+    codepoints = strings.view(np.uint32).reshape(len(strings), -1)
+    # 只需要对出现过的码位查询一次 East Asian Width
+    unique_codepoints, inverse = np.unique(codepoints, return_inverse=True)
+    unique_widths = np.array(
+        [_char_width(codepoint) for codepoint in unique_codepoints.tolist()]
+    )
+    return unique_widths[inverse.reshape(codepoints.shape)].sum(axis=1)
+
+
+def _char_width(codepoint: int) -> int:
+    if codepoint == 0:  # 填充
+        return 0
+    if unicodedata.east_asian_width(chr(codepoint)) in ("W", "F"):
+        return 2
+    return 1
+
+
+def column_width(series: pd.Series) -> int:
+    """一列的宽度：最宽的单元格与列名中较大者"""
+    return max(
+        int(display_widths(series).max(initial=0)),  # len of largest item
+        len(str(series.name)),  # len of column name/header
+    )
@@ -0,0 +1,108 @@
+import pandas as pd
+from sqlalchemy import select
+
+import acmana
+from acmana.export.vjudge.vjudge_ranking import Sheet
+from acmana.models import sqlsession
+from acmana.models.account.nowcoder_account import NowcoderAccount
+from acmana.models.account.vjudge_account import VjudgeAccount
+from acmana.models.student import Student
+
+
+class MasterExcelBook:
+    def __init__(
+        self, path: str, only_attendance: bool, constant_memory: bool = False
+    ) -> None:
+        """以学号为主键，汇总一个学期所有平台、所有 instance 的得分
+
+        :param: only_attendance: 只包含选课的同学，得分使用在选课同学中的得分
+        :param: constant_memory: 参见 `VjudgeExcelBook`
+        """
+        self.writer = pd.ExcelWriter(
+            path,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": constant_memory}},
+        )
+        self.workbook = self.writer.book
+        self.only_attendance: bool = only_attendance
+        self.constant_memory: bool = constant_memory
+
+    def write_book(self):
+        master_sheet = MasterSheet(self)
+        if acmana.config["common"]["upsolve"]["sort_by_score"]:
+            master_sheet.df.sort_values(by=["Score"], ascending=False, inplace=True)
+        master_sheet.write_sheet()
+        self.writer.close()
+
+
+class MasterSheet(Sheet):
+    def __init__(self, excel_book: MasterExcelBook) -> None:
+        self.excel_book: MasterExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Master"
+        self.sheet_title: str = "Master Scoreboard"
+        if excel_book.only_attendance:
+            self.sheet_title += "(选课同学)"
+        else:
+            self.sheet_title += "(所有同学)"
+
+        stmt = select(
+            Student.id.label("student_id"), Student.real_name, Student.in_course
+        ).order_by(Student.id)
+        if excel_book.only_attendance:
+            stmt = stmt.where(Student.in_course == True)
+        result = sqlsession.execute(stmt)
+        students = pd.DataFrame(result.all(), columns=list(result.keys()))
+        students = students.set_index("student_id")
+
+        # 每个平台一次聚合查询，得到 (学号, 比赛组别) 的总分，再透视为每个 instance 一列
+        totals: list[pd.DataFrame] = []
+        for platform, account_cls in (
+            ("vjudge", VjudgeAccount),
+            ("nowcoder", NowcoderAccount),
+        ):
+            platform_totals = account_cls.query_student_totals_by_div(
+                excel_book.only_attendance
+            )
+            platform_totals = platform_totals[
+                platform_totals["div"].isin(list(acmana.config[platform]["instances"]))
+            ]
+            totals.append(
+                platform_totals.assign(instance=f"{platform} " + platform_totals["div"])
+            )
+        df = pd.concat(totals)
+        instance_scores = df.pivot_table(
+            index="student_id",
+            columns="instance",
+            values="score",
+            aggfunc="sum",
+            fill_value=0,
+        )
+        overall = df.groupby("student_id")[
+            ["score", "solved_cnt", "upsolved_cnt"]
+        ].sum()
+
+        # 没有参加过任何比赛的同学记为 0
+        instance_scores = instance_scores.reindex(students.index, fill_value=0)
+        overall = overall.reindex(students.index, fill_value=0).astype(int)
+        self.df = pd.DataFrame(
+            {
+                "姓名": students["real_name"].fillna(""),
+                "学号": students.index,
+                **{
+                    f"Score({instance})": instance_scores[instance]
+                    for instance in instance_scores.columns
+                },
+                "Score": overall["score"],
+                "Solved": overall["solved_cnt"],
+                "Upsolved": overall["upsolved_cnt"],
+                "选课": students["in_course"]
+                .astype(object)
+                .where(students["in_course"].notna(), ""),
+            }
+        ).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    MasterExcelBook(
+        path="acmana/tmp/master(选课同学).xlsx", only_attendance=True
+    ).write_book()
@@ -1,12 +1,122 @@
 import datetime
+import functools
+import logging
 import pandas as pd
 import pytz
+from sqlalchemy import select
 from xlsxwriter import Workbook
+from xlsxwriter.worksheet import Worksheet
 
 import acmana
+from acmana.export.column_width import column_width
+from acmana.export.render_cache import RenderCache, fingerprint
+from acmana.export.split_books import write_split_books
+from acmana.export.vjudge.vjudge_ranking import ProblemSheet
+from acmana.models import sqlsession
 from acmana.models.account.nowcoder_account import NowcoderAccount
 from acmana.models.contest.nowcoder_contest import NowcoderContest
+from acmana.models.problem_stats.nowcoder_problem_stats import NowcoderProblemStats
 from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
+from acmana.models.rating.nowcoder_rating import NowcoderRating
+from acmana.models.student import Student
+
+logger = logging.getLogger(__name__)
+
+
+class NowcoderExportData:
+    def __init__(self, div: str | None) -> None:
+        """导出一个 div 所需的全部数据：已结束的比赛、每场比赛的排名与得分、按账号聚合的过题数等
+
+        排名与得分已经在爬取时存储了 `所有同学` 与 `选课同学` 两种口径，所以两个 Excel 可以共用同一份数据，
+        只需查询一次。排名、按账号聚合的结果与每道题的统计在第一次使用时才查询，
+        增量导出时两个 Excel 都没有变化（`fingerprint`）就不需要查询"""
+        self.div: str | None = div
+        self.finished_nowcoder_contests: list[
+            NowcoderContest
+        ] = NowcoderContest.query_finished_contests(div=div)
+        self.finished_nowcoder_contests.sort(key=lambda x: x.end)
+
+        # 每个账号在这个 div 中当前的 rating（`NowcoderRating.update_div_ratings` 已经计算并存储）
+        self.ratings: pd.Series = (
+            NowcoderRating.query_div_ratings(div)["rating"]
+            if div is not None
+            else pd.Series(dtype="Int64")
+        )
+
+    @functools.cached_property
+    def fingerprint(self) -> str:
+        """导出内容的指纹：只由比赛（排名的指纹 `standings_digest`）、账号与学生信息、rating 这些不需要查询排名的列计算"""
+        now = datetime.datetime.now(datetime.timezone.utc)
+        expiration = datetime.timedelta(
+            days=acmana.config["common"]["upsolve"]["expiration"]
+        )
+        return fingerprint(
+            [
+                (
+                    contest.id,
+                    contest.title,
+                    contest.begin,
+                    contest.end,
+                    contest.standings_digest,
+                )
+                for contest in self.finished_nowcoder_contests
+            ],
+            pd.DataFrame(
+                sqlsession.execute(
+                    select(
+                        NowcoderAccount.id,
+                        NowcoderAccount.nickname,
+                        Student.id,
+                        Student.real_name,
+                        Student.in_course,
+                    )
+                    .outerjoin(Student)
+                    .order_by(NowcoderAccount.id)
+                ).all()
+            ),
+            self.ratings,
+            # 补题期间的比赛 Sheet 中有更新时间，每次都需要重新写入
+            now.strftime("%Y-%m-%d %H:%M")
+            if any(
+                now < contest.end + expiration
+                for contest in self.finished_nowcoder_contests
+            )
+            else None,
+        )
+
+    @functools.cached_property
+    def standings(self) -> dict[int, pd.DataFrame]:
+        """一次查询取出 ranking ⨝ account ⨝ student 的所有列"""
+        return {
+            nowcoder_contest.id: NowcoderRanking.query_contest_standings(
+                nowcoder_contest.id,
+                Student.real_name,
+                Student.id.label("student_id"),
+                NowcoderAccount.nickname,
+                NowcoderRanking.solved_cnt,
+                NowcoderRanking.penalty,
+            )
+            for nowcoder_contest in self.finished_nowcoder_contests
+        }
+
+    @functools.cached_property
+    def rankings_summary(self) -> pd.DataFrame:
+        """过题数、补题数、罚时在数据库中按账号聚合（选课同学是其中 in_course 的子集）"""
+        return NowcoderAccount.query_rankings_summary(
+            [contest.id for contest in self.finished_nowcoder_contests],
+            False,
+            Student.real_name,
+            Student.id.label("student_id"),
+            NowcoderAccount.nickname,
+        )
+
+    @functools.cached_property
+    def problem_stats(self) -> pd.DataFrame:
+        """每道题的统计在爬取时已经存储，首杀账号的昵称一并查询"""
+        return NowcoderProblemStats.query_contests_stats(
+            [contest.id for contest in self.finished_nowcoder_contests],
+            NowcoderAccount.nickname.label("first_blood_nickname"),
+        )
 
 
 class NowcoderExcelBook:
@@ -16,34 +126,114 @@ class NowcoderExcelBook:
         div: str | None,
         only_attendance: bool,
         sheet_name_remover: str | None = None,
+        export_data: NowcoderExportData | None = None,
+        constant_memory: bool = False,
+        incremental: bool = False,
     ) -> None:
         """
         :param: sheet_name_remover: 用于 replace `sheet_name` 中的字符串
+        :param: export_data: 与另一个口径的 Excel 共用的数据，为 None 时重新查询
+        :param: constant_memory: 使用 xlsxwriter 的 constant_memory 模式逐行写入，
+            每写完一行就落盘，内存占用不随比赛数、参赛人数增长
+        :param: incremental: 增量导出：数据没有变化的比赛复用上一次渲染的结果，
+            整个 Excel 都没有变化时不重新写入
         """
-        self.writer = pd.ExcelWriter(path, engine="xlsxwriter")
-        self.workbook = self.writer.book
+        self.path: str = path
+        self.constant_memory: bool = constant_memory
+        self.render_cache: RenderCache | None = (
+            RenderCache(path) if incremental else None
+        )
         self.div: str | None = div
         self.only_attendance: bool = only_attendance
         self.sheet_name_remover: str | None = sheet_name_remover
+        self.export_data: NowcoderExportData = (
+            export_data if export_data is not None else NowcoderExportData(div)
+        )
+        assert self.export_data.div == div
         self.finished_nowcoder_contests: list[
             NowcoderContest
-        ] = NowcoderContest.query_finished_contests(div=div)
-
-        self.finished_nowcoder_contests.sort(key=lambda x: x.end)
+        ] = self.export_data.finished_nowcoder_contests
         self.sheets: list["Sheet"] = []
 
     def write_book(self):
+        if self.render_cache is not None:
+            # 在查询排名、建立 Sheet 之前判断：整个 Excel 没有变化时不需要查询排名
+            book_fingerprint = fingerprint(
+                self.export_data.fingerprint,
+                self.only_attendance,
+                self.sheet_name_remover,
+                acmana.config["common"]["upsolve"]["sort_by_score"],
+                self.constant_memory,
+            )
+            if self.render_cache.is_book_unchanged(book_fingerprint):
+                logger.info(f"{self.path} unchanged, skip......")
+                return
+        contest_sheets: list[Sheet] = [
+            Sheet(self, nowcoder_contest)
+            for nowcoder_contest in self.finished_nowcoder_contests
+        ]
+        problem_sheet: ProblemSheet = ProblemSheet(
+            self, self.finished_nowcoder_contests
+        )
+
+        # 打开 writer 会清空已有的文件，所以在确定需要重新写入之后再打开
+        self.writer = pd.ExcelWriter(
+            self.path,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": self.constant_memory}},
+        )
+        self.workbook = self.writer.book
+
         self.summary_sheet: SummarySheet = SummarySheet(self)
         self.sheets.append(self.summary_sheet)
-        for nowcoder_contest in self.finished_nowcoder_contests:
-            self.sheets.append(Sheet(self, nowcoder_contest))
+        self.sheets.extend(contest_sheets)
+        self.sheets.append(problem_sheet)
 
         for sheet in self.sheets:
-            if acmana.config["common"]["upsolve"]["sort_by_score"]:
+            if (
+                acmana.config["common"]["upsolve"]["sort_by_score"]
+                and "Score" in sheet.df
+            ):
                 sheet.df.sort_values(by=["Score"], ascending=False, inplace=True)
             sheet.write_sheet()
         self.writer.close()
 
+        if self.render_cache is not None:
+            self.render_cache.save(
+                book_fingerprint,
+                [
+                    nowcoder_contest.id
+                    for nowcoder_contest in self.finished_nowcoder_contests
+                ],
+            )
+
+    def write_split_books(self, max_workers: int | None = None) -> str:
+        """每场比赛单独导出一个 Excel（在多个进程中同时写入），Summary、索引与题目统计导出到另一个 Excel，
+        最后打包为一个 zip
+
+        :return: zip 的路径"""
+        self.summary_sheet: SummarySheet = SummarySheet(self)
+        problem_sheet: ProblemSheet = ProblemSheet(
+            self, self.finished_nowcoder_contests
+        )
+        contest_sheets: list[Sheet] = [
+            Sheet(self, nowcoder_contest)
+            for nowcoder_contest in self.finished_nowcoder_contests
+        ]
+        self.sheets.append(self.summary_sheet)
+        self.sheets.extend(contest_sheets)
+        if acmana.config["common"]["upsolve"]["sort_by_score"]:
+            for sheet in self.sheets:
+                sheet.df.sort_values(by=["Score"], ascending=False, inplace=True)
+        return write_split_books(
+            self.path,
+            self.summary_sheet,
+            contest_sheets,
+            extra_sheets=[problem_sheet],
+            constant_memory=self.constant_memory,
+            max_workers=max_workers,
+        )
+
 
 class Sheet:
     def __init__(
@@ -66,7 +256,6 @@ class Sheet:
             self.sheet_title += "(选课同学)"
         else:
             self.sheet_title += "(所有同学)"
-        self.df = pd.DataFrame()
 
         if datetime.datetime.now(datetime.timezone.utc) < self.deadline:
             beijing_tz = pytz.timezone("Asia/Shanghai")
@@ -78,73 +267,44 @@ class Sheet:
             )
 
             # self.sheet_title = self.sheet_title + self.ddl_info
+
+        df = self.excel_book.export_data.standings[self.nowcoder_contest.id]
         if self.excel_book.only_attendance:  # 只计算选课的同学的排名（排除未选课的同学）
-            rankings = self.nowcoder_contest.get_only_attendance_rankings()
+            df = df[df["in_course"]].sort_values(by="student_id")
+            ranking_column, score_column = "attendance_rank", "attendance_score"
         else:  # 计算所有参加比赛的同学的排名
-            rankings = self.nowcoder_contest.get_all_rankings()
+            ranking_column, score_column = "competition_rank", "score"
 
-        for ranking in rankings:
-            crt_ranking_is_in_course: bool = bool(
-                ranking.account.student and ranking.account.student.in_course
-            )
-
-            self.df = pd.concat(
-                [
-                    self.df,
-                    pd.DataFrame(
-                        {
-                            "姓名": [
-                                ranking.account.student.real_name
-                                if ranking.account.student is not None
-                                else ""
-                            ],
-                            "学号": [
-                                ranking.account.student.id
-                                if ranking.account.student is not None
-                                else ""
-                            ],
-                            "Nickname": [ranking.account.nickname],
-                            "Ranking": [
-                                ranking.get_attendance_ranking()
-                                if self.excel_book.only_attendance
-                                and crt_ranking_is_in_course
-                                else ranking.competition_rank
-                            ],
-                            "Score": [
-                                ranking.get_score(
-                                    only_among_attendance=self.excel_book.only_attendance
-                                )
-                            ],
-                            "Solved": [ranking.solved_cnt],
-                            "Upsolved": [ranking.upsolved_cnt],
-                            "Penalty": [str(ranking.penalty)],
-                            "选课": [crt_ranking_is_in_course],
-                        }
-                    ),
-                ]
+        # 排名、学生信息、标题都没有变化时直接复用上一次渲染的结果
+        self.fingerprint: str = fingerprint(
+            df, self.sheet_title, self.sheet_name, getattr(self, "ddl_info", None)
+        )
+        render_cache = self.excel_book.render_cache
+        if render_cache is not None:
+            cached_df = render_cache.get_sheet(
+                self.nowcoder_contest.id, self.fingerprint
             )
+            if cached_df is not None:
+                self.df = cached_df
+                return
 
-    @staticmethod
-    def _chinese_len(s: str) -> int:
-        """计算中文字符的长度"""
-        cnt = 0  # 长宽度中文字符数量
-        for word in s:  # 检测长宽度中文字符
-            if (word >= "\u4e00" and word <= "\u9fa5") or word in {
-                "；",
-                "：",
-                "，",
-                "（",
-                "）",
-                "！",
-                "？",
-                "——",
-                "……",
-                "、",
-                "》",
-                "《",
-            }:
-                cnt += 1
-        return len(s) + cnt
+        self.df = pd.DataFrame(
+            {
+                "姓名": df["real_name"].fillna(""),
+                "学号": df["student_id"].fillna(""),
+                "Nickname": df["nickname"],
+                "Ranking": df[ranking_column],
+                "Score": df[score_column],
+                "Solved": df["solved_cnt"],
+                "Upsolved": df["upsolved_cnt"],
+                "Penalty": df["penalty"].map(
+                    lambda penalty: str(pd.Timedelta(penalty).to_pytimedelta())
+                ),
+                "选课": df["in_course"],
+            }
+        ).reset_index(drop=True)
+        if render_cache is not None:
+            render_cache.put_sheet(self.nowcoder_contest.id, self.fingerprint, self.df)
 
     def write_sheet(self):
         # writer = pd.ExcelWriter()
@@ -152,15 +312,18 @@ class Sheet:
         if getattr(self, "ddl_info", None):
             start_row += 1
 
-        self.df.to_excel(
-            self.excel_book.writer,
-            startrow=start_row,
-            sheet_name=self.sheet_name,
-            index=False,
-            header=False,
-        )
-
-        worksheet = self.excel_book.writer.sheets[self.sheet_name]
+        if self.excel_book.constant_memory:
+            # constant_memory 模式下只能按行的顺序写入，数据行在标题、表头之后再写
+            worksheet = self.excel_book.workbook.add_worksheet(self.sheet_name)  # type: ignore
+        else:
+            self.df.to_excel(
+                self.excel_book.writer,
+                startrow=start_row,
+                sheet_name=self.sheet_name,
+                index=False,
+                header=False,
+            )
+            worksheet = self.excel_book.writer.sheets[self.sheet_name]
 
         # Add a title row.
         title_format = self.excel_book.workbook.add_format(  # type: ignore
@@ -205,117 +368,65 @@ class Sheet:
 
         # Set the column width and format.
         for idx, col in enumerate(self.df):  # loop through all columns
-            series = self.df[col]
-            max_len = (
-                max(
-                    (
-                        int(
-                            series.astype(str).map(self._chinese_len).max()
-                        ),  # len of largest item
-                        len(str(series.name)),  # len of column name/header
-                    )
-                )
-                + 1
-            )  # adding a little extra space
+            max_len = column_width(self.df[col]) + 1  # adding a little extra space
             worksheet.set_column(idx, idx, max_len)  # set column width
 
+        if self.excel_book.constant_memory:
+            self._write_rows(worksheet, start_row)
+
+    def _write_rows(self, worksheet: Worksheet, start_row: int):
+        """从 `start_row` 开始逐行写入数据（空值写为空白单元格，与 `DataFrame.to_excel` 一致）"""
+        rows = self.df.astype(object).where(self.df.notna(), None)
+        for row_num, row in enumerate(rows.itertuples(index=False), start=start_row):
+            worksheet.write_row(row_num, 0, row)
+
 
 class SummarySheet(Sheet):
     def __init__(self, excel_book: "NowcoderExcelBook") -> None:
         self.excel_book: NowcoderExcelBook = excel_book
         self.sheet_name: str = "Summary"
         self.sheet_title: str = self.sheet_name
-        self.df = pd.DataFrame()
-        if self.excel_book.only_attendance:
-            self.nowcoder_accounts: list[
-                NowcoderAccount
-            ] = NowcoderAccount.query_all_attendance()
-        else:
-            self.nowcoder_accounts: list[
-                NowcoderAccount
-            ] = NowcoderAccount.query_all_append_unregistered()
-
         if excel_book.only_attendance:
             self.sheet_title += "(选课同学)"
         else:
             self.sheet_title += "(所有同学)"
-        self.df = pd.DataFrame()
-        for nowcoder_account in self.nowcoder_accounts:
-            if self.excel_book.div:
-                nowcoder_account.rankings = list(
-                    filter(
-                        lambda x: x.contest.div == self.excel_book.div,
-                        nowcoder_account.rankings,
-                    )
-                )
-            if self.excel_book.only_attendance:
-                nowcoder_account.rankings = list(
-                    filter(
-                        lambda x: x.account.student is not None
-                        and x.account.student.in_course,
-                        nowcoder_account.rankings,
-                    )
-                )
-            self.df = pd.concat(
-                [
-                    self.df,
-                    pd.DataFrame(
-                        {
-                            "姓名": [
-                                nowcoder_account.student.real_name
-                                if nowcoder_account.student is not None
-                                else ""
-                            ],
-                            "学号": [
-                                nowcoder_account.student.id
-                                if nowcoder_account.student is not None
-                                else ""
-                            ],
-                            "Nickname": [nowcoder_account.nickname],
-                            "Score": [
-                                sum(
-                                    map(
-                                        lambda x: x.get_score(
-                                            only_among_attendance=self.excel_book.only_attendance
-                                        ),
-                                        nowcoder_account.rankings,
-                                    )
-                                )
-                            ],
-                            "Solved": [
-                                sum(
-                                    map(
-                                        lambda x: x.solved_cnt,
-                                        nowcoder_account.rankings,
-                                    )
-                                )
-                            ],
-                            "Upsolved": [
-                                sum(
-                                    map(
-                                        lambda x: x.upsolved_cnt,
-                                        nowcoder_account.rankings,
-                                    )
-                                )
-                            ],
-                            "Penalty": [
-                                sum(
-                                    map(  # type: ignore
-                                        lambda x: x.penalty.total_seconds(),
-                                        nowcoder_account.rankings,
-                                    )
-                                )
-                            ],
-                            "选课": [
-                                nowcoder_account.student.in_course
-                                if nowcoder_account.student
-                                else ""
-                            ],
-                        }
-                    ),
-                ]
+
+        df = self.excel_book.export_data.rankings_summary
+        if self.excel_book.only_attendance:
+            df = df[df["in_course"] == True].sort_values(by="student_id")
+        # 得分直接累加各场比赛已经存储的得分
+        score_column = "attendance_score" if excel_book.only_attendance else "score"
+        contest_scores: list[pd.Series] = [
+            standings[score_column]
+            for standings in self.excel_book.export_data.standings.values()
+            if not standings.empty
+        ]
+        df = df.assign(score=0)
+        if contest_scores:
+            df["score"] = (
+                pd.concat(contest_scores)
+                .groupby(level=0)
+                .sum()
+                .reindex(df.index, fill_value=0)
             )
 
+        # 没有比赛期间排名的账号没有 rating
+        rating = self.excel_book.export_data.ratings.reindex(df.index).astype("Int64")
+
+        self.df = pd.DataFrame(
+            {
+                "姓名": df["real_name"].fillna(""),
+                "学号": df["student_id"].fillna(""),
+                "Nickname": df["nickname"],
+                "Score": df["score"],
+                "Rating": rating.astype(object).where(rating.notna(), ""),
+                "Solved": df["solved_cnt"],
+                "Upsolved": df["upsolved_cnt"],
+                "Penalty": df["penalty_seconds"].astype(float),
+                "选课": df["in_course"].astype(object).where(df["in_course"].notna(), ""),
+            }
+        ).reset_index(drop=True)
+
 
 if __name__ == "__main__":
     excel_book = NowcoderExcelBook(
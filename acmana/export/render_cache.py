@@ -0,0 +1,72 @@
+import hashlib
+import logging
+import os
+import pickle
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = "acmana/tmp/cache/export"
+
+
+def fingerprint(*contents) -> str:
+    """计算内容指纹：DataFrame 按内容（包括 index）哈希，其他对象按 repr 哈希"""
+    sha1 = hashlib.sha1()
+    for content in contents:
+        if isinstance(content, pd.DataFrame):
+            sha1.update(pd.util.hash_pandas_object(content).to_numpy().tobytes())
+            sha1.update(repr(list(content.columns)).encode())
+        else:
+            sha1.update(repr(content).encode())
+    return sha1.hexdigest()
+
+
+class RenderCache:
+    """一个 Excel 的渲染缓存：每个 Sheet 渲染好的 DataFrame 及其数据的指纹，以及整个 Excel 的指纹
+
+    指纹没有变化的 Sheet 直接复用上一次渲染的 DataFrame；整个 Excel 的指纹没有变化时不需要重新写入"""
+
+    def __init__(self, excel_path: str) -> None:
+        self.excel_path: str = excel_path
+        self.cache_path: str = os.path.join(
+            CACHE_DIR, os.path.basename(excel_path) + ".pkl"
+        )
+        self.book_fingerprint: str | None = None
+        self.sheets: dict[int, tuple[str, pd.DataFrame]] = {}  # contest_id -> (指纹, df)
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, "rb") as f:
+                self.book_fingerprint, self.sheets = pickle.load(f)
+
+    def get_sheet(self, contest_id: int, sheet_fingerprint: str) -> pd.DataFrame | None:
+        """指纹一致时返回缓存的 DataFrame（副本），否则返回 None"""
+        if (
+            contest_id in self.sheets
+            and self.sheets[contest_id][0] == sheet_fingerprint
+        ):
+            logger.debug(
+                f"Sheet of contest {contest_id} unchanged, reuse cached render"
+            )
+            return self.sheets[contest_id][1].copy()
+        return None
+
+    def put_sheet(self, contest_id: int, sheet_fingerprint: str, df: pd.DataFrame):
+        self.sheets[contest_id] = (sheet_fingerprint, df.copy())
+
+    def is_book_unchanged(self, book_fingerprint: str) -> bool:
+        """整个 Excel 的指纹没有变化，并且上一次导出的文件还在"""
+        return self.book_fingerprint == book_fingerprint and os.path.exists(
+            self.excel_path
+        )
+
+    def save(self, book_fingerprint: str, contest_ids: list[int]):
+        """保存缓存（只保留这次导出的比赛）"""
+        self.book_fingerprint = book_fingerprint
+        self.sheets = {
+            contest_id: self.sheets[contest_id]
+            for contest_id in contest_ids
+            if contest_id in self.sheets
+        }
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(self.cache_path, "wb") as f:
+            pickle.dump((self.book_fingerprint, self.sheets), f)
@@ -0,0 +1,111 @@
+import concurrent.futures
+import logging
+import os
+import re
+import zipfile
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class _SingleBook:
+    """子进程中只提供 `Sheet.write_sheet` 需要的 writer、workbook、constant_memory"""
+
+    def __init__(self, path: str, constant_memory: bool) -> None:
+        self.writer = pd.ExcelWriter(
+            path,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": constant_memory}},
+        )
+        self.workbook = self.writer.book
+        self.constant_memory: bool = constant_memory
+
+
+def _sheet_state(sheet) -> tuple[type, dict]:
+    """Sheet 写入时需要的属性（不包含 excel_book 与数据库对象，可以传给子进程）"""
+    state = {
+        attr: getattr(sheet, attr)
+        for attr in ("sheet_name", "sheet_title", "df", "ddl_info")
+        if hasattr(sheet, attr)
+    }
+    return type(sheet), state
+
+
+def _write_book(
+    path: str, sheet_states: list[tuple[type, dict]], constant_memory: bool
+):
+    """在子进程中将若干个 Sheet 写入到一个 Excel"""
+    book = _SingleBook(path, constant_memory)
+    for sheet_cls, state in sheet_states:
+        sheet = sheet_cls.__new__(sheet_cls)
+        sheet.__dict__.update(state)
+        sheet.excel_book = book
+        sheet.write_sheet()
+    book.writer.close()
+    return path
+
+
+def _safe_filename(name: str) -> str:
+    return re.sub(r'[\\/:*?"<>|]', "_", name).strip()
+
+
+def write_split_books(
+    path: str,
+    summary_sheet,
+    contest_sheets: list,
+    extra_sheets: list | None = None,
+    constant_memory: bool = False,
+    max_workers: int | None = None,
+) -> str:
+    """每场比赛单独写入一个 Excel，另外写入一个包含 Summary 与索引的 Excel，最后打包为一个 zip
+
+    xlsxwriter 只能依次写入一个 Excel 中的各个 Sheet，拆分为多个 Excel 之后可以在多个进程中同时写入
+
+    :param path: 原本合并导出的 Excel 路径，拆分后的 Excel 放在同名的目录中，zip 与之同名
+    :param extra_sheets: 写入到 Summary 与索引之后的其他 Sheet（如题目统计）
+    :return: zip 的路径"""
+    output_dir, _ = os.path.splitext(path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    contest_paths: list[str] = [
+        os.path.join(output_dir, f"{i:02d}-{_safe_filename(sheet.sheet_name)}.xlsx")
+        for i, sheet in enumerate(contest_sheets, start=1)
+    ]
+    index_path: str = os.path.join(output_dir, "00-Summary.xlsx")
+    index_state = {
+        "sheet_name": "Index",
+        "sheet_title": "Index",
+        "df": pd.DataFrame(
+            {
+                "比赛": [sheet.sheet_title for sheet in contest_sheets],
+                "文件": [os.path.basename(p) for p in contest_paths],
+            }
+        ),
+    }
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _write_book,
+                index_path,
+                [_sheet_state(summary_sheet), (type(summary_sheet), index_state)]
+                + [_sheet_state(sheet) for sheet in extra_sheets or []],
+                constant_memory,
+            )
+        ]
+        futures += [
+            executor.submit(_write_book, p, [_sheet_state(sheet)], constant_memory)
+            for p, sheet in zip(contest_paths, contest_sheets)
+        ]
+        for future in concurrent.futures.as_completed(futures):
+            logger.debug(f"Exported {future.result()}")
+
+    zip_path: str = output_dir + ".zip"
+    with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_STORED) as zf:  # xlsx 本身已经压缩
+        for p in [index_path] + contest_paths:
+            zf.write(
+                p,
+                arcname=os.path.join(os.path.basename(output_dir), os.path.basename(p)),
+            )
+    return zip_path
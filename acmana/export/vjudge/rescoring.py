@@ -0,0 +1,474 @@
+import datetime
+import json
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+
+import acmana
+from acmana.crawler.vjudge.contest.vjudge_simulation import (
+    WRONG_ATTEMPT_PENALTY,
+    simulate_contests,
+)
+from acmana.export.vjudge.vjudge_ranking import Sheet
+from acmana.models import sqlsession
+from acmana.models.account.vjudge_account import VjudgeAccount
+from acmana.models.contest.vjudge_contest import VjudgeContest
+from acmana.models.ranking.scoreboard import (
+    SCORE_BANDS,
+    UPSOLVE_WEIGHT,
+    calculate_scores,
+)
+from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+from acmana.models.student import Student
+from acmana.models.submission.vjudge_submission import VjudgeSubmissionRecord
+
+logger = logging.getLogger(__name__)
+
+
+class ScoringRules:
+    def __init__(
+        self,
+        expiration: float,
+        penalty: float,
+        upsolve_weight: int,
+        score_bands: list[float],
+    ) -> None:
+        """一套计分规则
+
+        :param expiration: 补题有效期（天）
+        :param penalty: 每次错误提交的罚时（分钟）
+        :param upsolve_weight: 每补一题的得分
+        :param score_bands: 4 个排名百分比分位，分别得 100, 90, 80, 70 分，其余 60 分
+        """
+        self.expiration: float = expiration
+        self.penalty: float = penalty
+        self.upsolve_weight: int = upsolve_weight
+        self.score_bands: list[float] = list(score_bands)
+        if len(self.score_bands) != 4 or self.score_bands != sorted(self.score_bands):
+            raise ValueError(f"score_bands 需要是 4 个递增的分位: {score_bands}")
+
+    def __repr__(self) -> str:
+        return f"ScoringRules(expiration={self.expiration}, penalty={self.penalty}, upsolve_weight={self.upsolve_weight}, score_bands={self.score_bands})"
+
+    @classmethod
+    def current(cls) -> "ScoringRules":
+        """现行规则"""
+        return cls(
+            expiration=acmana.config["common"]["upsolve"]["expiration"],
+            penalty=WRONG_ATTEMPT_PENALTY // 60,
+            upsolve_weight=UPSOLVE_WEIGHT,
+            score_bands=list(SCORE_BANDS),
+        )
+
+    @classmethod
+    def from_config(cls, config: dict | None) -> "ScoringRules":
+        """`common.rescore` 中没有列出的规则沿用现行规则"""
+        current = cls.current()
+        config = config or {}
+        return cls(
+            expiration=config.get("expiration", current.expiration),
+            penalty=config.get("penalty", current.penalty),
+            upsolve_weight=config.get("upsolve_weight", current.upsolve_weight),
+            score_bands=config.get("score_bands", current.score_bands),
+        )
+
+    def describe(self) -> list[str]:
+        return [
+            f"{self.expiration} 天",
+            f"{self.penalty} 分钟",
+            f"{self.upsolve_weight} 分",
+            " / ".join(f"{band:.0%}" for band in self.score_bands),
+        ]
+
+
+def _load_cached_submissions(vjudge_contests: list[VjudgeContest]) -> pd.DataFrame:
+    """读取爬取时缓存的 api json（`VjudgeContestCrawler.crawl_ranking_metadata_json`）中的提交，账号 id 转换为数据库中的账号 id
+
+    :return: 与 `SubmissionBase.query_contests_submissions` 相同的 DataFrame，没有缓存的比赛跳过"""
+    api_metadatas: dict[int, dict] = {}
+    for vjudge_contest in vjudge_contests:
+        cache_path = f"acmana/tmp/cache/vjudge_rank_{vjudge_contest.id}.json"
+        if not os.path.exists(cache_path):
+            logger.warning(f"{vjudge_contest} 没有存储或者缓存的提交，跳过......")
+            continue
+        with open(cache_path, encoding="utf-8") as f:
+            api_metadatas[vjudge_contest.id] = json.load(f)
+
+    # 一次查询取出所有比赛的账号（与爬取时一样，先按用户名匹配，用户名改过的按账号 id 匹配）
+    participants: dict[int, str] = {
+        int(vaccount_id): val[0]
+        for api_metadata in api_metadatas.values()
+        for vaccount_id, val in api_metadata["participants"].items()
+    }
+    existing_accounts = VjudgeAccount.query_from_usernames_or_ids(
+        usernames=list(participants.values()), ids=list(participants)
+    )
+    accounts_by_username: dict[str, int] = {
+        account.username: account.id for account in existing_accounts
+    }
+
+    frames: list[pd.DataFrame] = []
+    for contest_id, api_metadata in api_metadatas.items():
+        api_submissions = np.array(
+            [submission[:4] for submission in api_metadata["submissions"]],
+            dtype=np.int64,
+        ).reshape(-1, 4)
+        api_account_ids, account_index = np.unique(
+            api_submissions[:, 0], return_inverse=True
+        )
+        account_ids = np.array(
+            [
+                accounts_by_username.get(
+                    participants[int(api_account_id)], api_account_id
+                )
+                for api_account_id in api_account_ids
+            ],
+            dtype=np.int64,
+        )
+        frames.append(
+            pd.DataFrame(
+                {
+                    "contest_id": contest_id,
+                    "account_id": account_ids[account_index],
+                    "problem_id": api_submissions[:, 1],
+                    "accepted": api_submissions[:, 2].astype(bool),
+                    "seconds": api_submissions[:, 3],
+                }
+            )
+        )
+    if not frames:
+        return pd.DataFrame(
+            columns=["contest_id", "account_id", "problem_id", "accepted", "seconds"]
+        )
+    return pd.concat(frames)
+
+
+def load_submissions(
+    vjudge_contests: list[VjudgeContest],
+) -> tuple[list[VjudgeContest], dict[str, np.ndarray]]:
+    """一次查询取出爬取时存储的提交（`VjudgeSubmissionRecord`），在此之前爬取的比赛读取缓存的 api json，
+    将所有比赛的提交拼接为 (比赛序号, 账号 id, 题目, 是否通过, 秒数) 五列
+
+    :return: 有提交的比赛（比赛序号为在其中的下标）与提交的各列"""
+    stored = VjudgeSubmissionRecord.query_contests_submissions(
+        [vjudge_contest.id for vjudge_contest in vjudge_contests]
+    )
+    stored_contest_ids = set(stored["contest_id"].tolist())
+    cached = _load_cached_submissions(
+        [
+            vjudge_contest
+            for vjudge_contest in vjudge_contests
+            if vjudge_contest.id not in stored_contest_ids
+        ]
+    )
+    submissions = pd.concat([df for df in (stored, cached) if not df.empty] or [stored])
+    loaded_contest_ids = set(submissions["contest_id"].tolist())
+    contests: list[VjudgeContest] = [
+        vjudge_contest
+        for vjudge_contest in vjudge_contests
+        if vjudge_contest.id in loaded_contest_ids
+    ]
+    contest_index = pd.Series(
+        range(len(contests)), index=[contest.id for contest in contests]
+    )
+    return contests, {
+        "contest_index": contest_index[submissions["contest_id"]].to_numpy(
+            dtype=np.int64
+        ),
+        "account_ids": submissions["account_id"].to_numpy(dtype=np.int64),
+        "problem_ids": submissions["problem_id"].to_numpy(dtype=np.int64),
+        "accepted": submissions["accepted"].to_numpy(dtype=bool),
+        "seconds": submissions["seconds"].to_numpy(dtype=np.int64),
+    }
+
+
+def rescore_contests(
+    contests: list[VjudgeContest],
+    submissions: dict[str, np.ndarray],
+    in_course: pd.Series,
+    rules: ScoringRules,
+) -> pd.DataFrame:
+    """按照 `rules` 一次模拟所有比赛并计算两种口径的排名与得分（与 `ContestScoreboard` 一致）
+
+    :param submissions: `load_submissions` 返回的提交
+    :param in_course: 以 account_id 为 index 的是否选课
+    :return: 以 (contest_id, account_id) 为 index，包含 competition_rank, attendance_rank, solved_cnt, upsolved_cnt,
+        penalty_seconds, score, attendance_score 列的 DataFrame"""
+    result = simulate_contests(
+        **submissions,
+        length=np.array(
+            [contest.length.total_seconds() for contest in contests], dtype=float
+        ),
+        expiration=np.full(
+            len(contests),
+            datetime.timedelta(days=rules.expiration).total_seconds(),
+        ),
+        wrong_attempt_penalty=int(rules.penalty * 60),
+    )
+    contest_ids = np.array([contest.id for contest in contests], dtype=np.int64)
+    result.index = pd.MultiIndex.from_arrays(
+        [
+            contest_ids[result.index.get_level_values("contest_index")],
+            result.index.get_level_values("account_id"),
+        ],
+        names=["contest_id", "account_id"],
+    )
+
+    competition_rank = result["competition_rank"].astype(float)
+    participated = competition_rank.notna()
+    attendance_participated = participated & in_course.reindex(
+        result.index.get_level_values("account_id"), fill_value=False
+    ).to_numpy(dtype=bool)
+    # 只计算在课程中的同学的排名（排除未选课的同学）
+    attendance_rank = (
+        competition_rank.where(attendance_participated)
+        .groupby(level="contest_id")
+        .rank(method="first")
+    )
+    result["attendance_rank"] = attendance_rank.astype("Int64")
+    result["score"] = calculate_scores(
+        competition_rank,
+        participated.groupby(level="contest_id").transform("sum").to_numpy(),
+        result["upsolved_cnt"],
+        score_bands=rules.score_bands,
+        upsolve_weight=rules.upsolve_weight,
+    )
+    result["attendance_score"] = calculate_scores(
+        attendance_rank,
+        attendance_participated.groupby(level="contest_id").transform("sum").to_numpy(),
+        result["upsolved_cnt"],
+        score_bands=rules.score_bands,
+        upsolve_weight=rules.upsolve_weight,
+    )
+    return result.drop(columns="accepted_mask")
+
+
+class VjudgeRescoringData:
+    def __init__(self, div: str | None, rules: ScoringRules) -> None:
+        """用存储的提交按照新规则重新计算一个 div 所有已结束比赛的排名与得分，并与数据库中存储的现行结果对照
+
+        只读取数据库，不修改存储的排名与得分；两个口径的 Excel 共用同一份数据"""
+        self.div: str | None = div
+        self.rules: ScoringRules = rules
+        finished_vjudge_contests = VjudgeContest.query_finished_contests(div=div)
+        finished_vjudge_contests.sort(key=lambda x: x.end)
+        self.contests, submissions = load_submissions(finished_vjudge_contests)
+        contest_ids: list[int] = [contest.id for contest in self.contests]
+
+        # 一次查询取出所有比赛存储的（现行规则的）排名与得分
+        stmt = select(
+            VjudgeRanking.contest_id,
+            VjudgeRanking.account_id,
+            VjudgeRanking.competition_rank,
+            VjudgeRanking.attendance_rank,
+            VjudgeRanking.upsolved_cnt,
+            VjudgeRanking.score,
+            VjudgeRanking.attendance_score,
+        ).where(VjudgeRanking.contest_id.in_(contest_ids))
+        result = sqlsession.execute(stmt)
+        self.current: pd.DataFrame = pd.DataFrame(
+            result.all(), columns=list(result.keys())
+        ).set_index(["contest_id", "account_id"])
+
+        # 一次查询取出所有涉及的账号与学生信息
+        account_ids = set(self.current.index.get_level_values("account_id")) | set(
+            submissions["account_ids"].tolist()
+        )
+        stmt = (
+            select(
+                VjudgeAccount.id.label("account_id"),
+                VjudgeAccount.nickname,
+                VjudgeAccount.username,
+                Student.real_name,
+                Student.id.label("student_id"),
+                Student.in_course,
+            )
+            .outerjoin(Student)
+            .where(VjudgeAccount.id.in_(account_ids))
+        )
+        result = sqlsession.execute(stmt)
+        self.accounts: pd.DataFrame = pd.DataFrame(
+            result.all(), columns=list(result.keys())
+        ).set_index("account_id")
+        self.accounts["in_course"] = (
+            self.accounts["in_course"].fillna(False).astype(bool)
+        )
+
+        self.rescored: pd.DataFrame = rescore_contests(
+            self.contests, submissions, self.accounts["in_course"], rules
+        )
+
+    def comparison(self, only_attendance: bool) -> pd.DataFrame:
+        """(contest_id, account_id) 为 index 的现行规则与新规则的排名、补题数、得分"""
+        rank_column, score_column = (
+            ("attendance_rank", "attendance_score")
+            if only_attendance
+            else ("competition_rank", "score")
+        )
+        columns = [rank_column, "upsolved_cnt", score_column]
+        df = self.current[columns].join(
+            self.rescored[columns], how="outer", lsuffix="_current", rsuffix="_rescored"
+        )
+        df = df.join(self.accounts, on="account_id")
+        df["in_course"] = df["in_course"].fillna(False).astype(bool)
+        if only_attendance:
+            df = df[df["in_course"]]
+        return df.rename(
+            columns={
+                f"{rank_column}_current": "rank_current",
+                f"{rank_column}_rescored": "rank_rescored",
+                f"{score_column}_current": "score_current",
+                f"{score_column}_rescored": "score_rescored",
+            }
+        )
+
+
+class RescoringExcelBook:
+    def __init__(
+        self,
+        path: str,
+        only_attendance: bool,
+        rescoring_data: VjudgeRescoringData,
+        sheet_name_remover: str | None = None,
+        constant_memory: bool = False,
+    ) -> None:
+        """现行规则与新规则的对比：规则、按账号汇总的得分、每场比赛的排名与得分，每一项左右并列
+
+        :param: sheet_name_remover, constant_memory: 参见 `VjudgeExcelBook`
+        """
+        self.path: str = path
+        self.only_attendance: bool = only_attendance
+        self.rescoring_data: VjudgeRescoringData = rescoring_data
+        self.sheet_name_remover: str | None = sheet_name_remover
+        self.constant_memory: bool = constant_memory
+
+    def write_book(self):
+        self.writer = pd.ExcelWriter(
+            self.path,
+            engine="xlsxwriter",
+            engine_kwargs={"options": {"constant_memory": self.constant_memory}},
+        )
+        self.workbook = self.writer.book
+        comparison = self.rescoring_data.comparison(self.only_attendance)
+        sheets: list[Sheet] = [
+            RulesSheet(self),
+            RescoringSummarySheet(self, comparison),
+        ] + [
+            RescoringContestSheet(
+                self,
+                contest,
+                comparison[
+                    comparison.index.get_level_values("contest_id") == contest.id
+                ],
+            )
+            for contest in self.rescoring_data.contests
+        ]
+        for sheet in sheets:
+            if (
+                acmana.config["common"]["upsolve"]["sort_by_score"]
+                and "Score(新规则)" in sheet.df
+            ):
+                sheet.df.sort_values(by=["Score(新规则)"], ascending=False, inplace=True)
+            sheet.write_sheet()
+        self.writer.close()
+
+
+def _comparison_columns(df: pd.DataFrame) -> dict[str, pd.Series]:
+    return {
+        "姓名": df["real_name"].fillna(""),
+        "学号": df["student_id"].fillna(""),
+        "Nickname": df["nickname"],
+        "Username": df["username"],
+    }
+
+
+class RulesSheet(Sheet):
+    def __init__(self, excel_book: RescoringExcelBook) -> None:
+        self.excel_book: RescoringExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Rules"
+        self.sheet_title: str = "计分规则"
+        self.df = pd.DataFrame(
+            {
+                "规则": ["补题有效期", "错误提交罚时", "每补一题得分", "100/90/80/70 分的排名分位"],
+                "现行规则": ScoringRules.current().describe(),
+                "新规则": excel_book.rescoring_data.rules.describe(),
+            }
+        )
+
+
+class RescoringSummarySheet(Sheet):
+    def __init__(
+        self, excel_book: RescoringExcelBook, comparison: pd.DataFrame
+    ) -> None:
+        self.excel_book: RescoringExcelBook = excel_book  # type: ignore
+        self.sheet_name: str = "Summary"
+        self.sheet_title: str = "Summary"
+        if excel_book.only_attendance:
+            self.sheet_title += "(选课同学)"
+        else:
+            self.sheet_title += "(所有同学)"
+
+        scores = (
+            comparison[["score_current", "score_rescored"]]
+            .fillna(0)
+            .groupby(level="account_id")
+            .sum()
+            .astype(int)
+        )
+        df = scores.join(excel_book.rescoring_data.accounts)
+        self.df = pd.DataFrame(
+            {
+                **_comparison_columns(df),
+                "Score(现行)": df["score_current"],
+                "Score(新规则)": df["score_rescored"],
+                "变化": df["score_rescored"] - df["score_current"],
+                "选课": df["in_course"].fillna(False).astype(bool),
+            }
+        ).reset_index(drop=True)
+
+
+class RescoringContestSheet(Sheet):
+    def __init__(
+        self,
+        excel_book: RescoringExcelBook,
+        vjudge_contest: VjudgeContest,
+        comparison: pd.DataFrame,
+    ) -> None:
+        self.excel_book: RescoringExcelBook = excel_book  # type: ignore
+        self.vjudge_contest: VjudgeContest = vjudge_contest
+        self.sheet_title: str = self.vjudge_contest.title
+        self.sheet_name: str = self.vjudge_contest.title
+        if self.excel_book.sheet_name_remover:
+            self.sheet_name = self.sheet_name.replace(
+                self.excel_book.sheet_name_remover, ""
+            )
+        if excel_book.only_attendance:
+            self.sheet_title += "(选课同学)"
+        else:
+            self.sheet_title += "(所有同学)"
+
+        df = comparison
+        score_current = df["score_current"].fillna(0).astype(int)
+        score_rescored = df["score_rescored"].fillna(0).astype(int)
+        self.df = pd.DataFrame(
+            {
+                **_comparison_columns(df),
+                "Ranking(现行)": df["rank_current"].astype("Int64"),
+                "Ranking(新规则)": df["rank_rescored"].astype("Int64"),
+                "Upsolved(现行)": df["upsolved_cnt_current"].astype("Int64"),
+                "Upsolved(新规则)": df["upsolved_cnt_rescored"].astype("Int64"),
+                "Score(现行)": score_current,
+                "Score(新规则)": score_rescored,
+                "变化": score_rescored - score_current,
+                "选课": df["in_course"],
+            }
+        ).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    from acmana.app import rescore_vjudge_contests
+
+    rescore_vjudge_contests()
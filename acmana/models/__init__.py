@@ -1,11 +1,29 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-engine = create_engine("sqlite:///acmana/resources/sqlite_data.db", echo=False)
+SQLITE_PATH = "acmana/resources/sqlite_data.db"
+engine = create_engine(f"sqlite:///{SQLITE_PATH}", echo=False)
 SessionMaker = sessionmaker(bind=engine)
 sqlsession = SessionMaker()
 
 
+def use_read_only_engine():
+    """将全局的 `sqlsession` 切换为只读的 SQLite 连接（`mode=ro` + `PRAGMA query_only`）
+
+    用于并行导出的子进程：多个进程同时读取同一个数据库文件，且保证不会写入"""
+    read_only_engine = create_engine(
+        f"sqlite:///file:{SQLITE_PATH}?mode=ro&uri=true", echo=False
+    )
+
+    @event.listens_for(read_only_engine, "connect")
+    def set_query_only(dbapi_connection, connection_record):
+        dbapi_connection.execute("PRAGMA query_only = ON")
+
+    sqlsession.close()
+    engine.dispose(close=False)  # fork 出来的子进程不能复用父进程的连接
+    sqlsession.bind = read_only_engine
+
+
 class SQLBase(DeclarativeBase):
     pass
 
@@ -14,8 +32,35 @@ import acmana.models.account.nowcoder_account
 import acmana.models.account.vjudge_account
 import acmana.models.contest.nowcoder_contest
 import acmana.models.contest.vjudge_contest
+import acmana.models.problem_stats.nowcoder_problem_stats
+import acmana.models.problem_stats.vjudge_problem_stats
 import acmana.models.ranking.nowcoder_ranking
 import acmana.models.ranking.vjudge_ranking
+import acmana.models.rating.nowcoder_rating
+import acmana.models.rating.vjudge_rating
 import acmana.models.student
+import acmana.models.submission.nowcoder_submission
+import acmana.models.submission.vjudge_submission
 
 SQLBase.metadata.create_all(engine)
+
+
+def _add_missing_columns():
+    """`create_all` 不会修改已经存在的表，这里为旧的数据库补上之后新增的列（值为 NULL）"""
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLBase.metadata.sorted_tables:
+            existing_columns = {
+                column["name"] for column in inspector.get_columns(table.name)
+            }
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    connection.execute(
+                        text(
+                            f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                        )
+                    )
+
+
+_add_missing_columns()
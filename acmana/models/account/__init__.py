@@ -1,13 +1,14 @@
+import datetime
 import logging
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import ForeignKey, Integer, String
+import pandas as pd
+from sqlalchemy import ForeignKey, Integer, String, and_, func, select
 from sqlalchemy.orm import Mapped, Session, mapped_column
 
 from acmana.models import sqlsession
-
-if TYPE_CHECKING:
-    from acmana.models.student import Student
+from acmana.models.ranking import interval_seconds
+from acmana.models.student import Student
 
 logger = logging.getLogger(__name__)
 
@@ -24,7 +25,97 @@ class OJAccountBase:
         sqlsession.add(self)
         sqlsession.commit()
 
+    @classmethod
+    def commit_all_to_db(
+        cls, accounts: list["OJAccountBase"], sqlsession: Session = sqlsession
+    ):
+        """在一个事务中批量提交多个账号，代替逐个账号的 `commit_to_db`"""
+        logger.debug(f"commiting {len(accounts)} {cls.__name__} to db......")
+        sqlsession.add_all(accounts)
+        sqlsession.commit()
+
     @classmethod
     def query_from_account_id(cls, id: int) -> Optional["OJAccountBase"]:
         stmt = sqlsession.query(cls).filter_by(id=id)
         return sqlsession.execute(stmt).scalar_one_or_none()
+
+    @classmethod
+    def query_rankings_summary(
+        cls,
+        contest_ids: list[int],
+        only_attendance: bool,
+        *columns,
+        sqlsession: Session = sqlsession,
+    ) -> pd.DataFrame:
+        """在数据库中按账号聚合 `contest_ids` 这些比赛的过题数、补题数和罚时（秒）
+
+        只读查询，不会加载或修改 `rankings` 关系。没有参加这些比赛的账号聚合结果为 0
+
+        :param only_attendance: 只保留选课的同学（按学号排序），否则已注册的账号按学号排在未注册的账号之前
+        :param columns: 额外需要一并查询出来的列，只能来自 account, student 两张表
+        :return: 以 account_id 为 index 的 DataFrame"""
+        ranking_cls = cls.rankings.property.mapper.class_  # type: ignore
+        stmt = (
+            select(
+                cls.id.label("account_id"),
+                Student.in_course,
+                *columns,
+                func.coalesce(func.sum(ranking_cls.solved_cnt), 0).label("solved_cnt"),
+                func.coalesce(func.sum(ranking_cls.upsolved_cnt), 0).label(
+                    "upsolved_cnt"
+                ),
+                func.coalesce(func.sum(interval_seconds(ranking_cls.penalty)), 0).label(
+                    "penalty_seconds"
+                ),
+            )
+            .outerjoin(Student)
+            .outerjoin(
+                ranking_cls,
+                and_(
+                    ranking_cls.account_id == cls.id,
+                    ranking_cls.contest_id.in_(contest_ids),
+                ),
+            )
+            .group_by(cls.id)
+        )
+        if only_attendance:
+            stmt = stmt.where(Student.in_course == True).order_by(Student.id)
+        else:
+            stmt = stmt.order_by(cls.student_id.is_(None), cls.student_id, cls.id)
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys())).set_index(
+            "account_id"
+        )
+
+    @classmethod
+    def query_student_totals_by_div(
+        cls, only_attendance: bool, sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """在数据库中按 (学号, 比赛组别) 聚合已经结束的比赛的得分、过题数、补题数
+
+        通过账号将排名与学生关联，没有关联学生的账号不参与聚合
+
+        :param only_attendance: 只聚合选课的同学，得分使用在选课同学中的得分
+        :return: 包含 student_id, div, score, solved_cnt, upsolved_cnt 列的 DataFrame"""
+        ranking_cls = cls.rankings.property.mapper.class_  # type: ignore
+        contest_cls = ranking_cls.contest.property.mapper.class_
+        score = ranking_cls.attendance_score if only_attendance else ranking_cls.score
+        stmt = (
+            select(
+                Student.id.label("student_id"),
+                contest_cls.div,
+                func.coalesce(func.sum(score), 0).label("score"),
+                func.sum(ranking_cls.solved_cnt).label("solved_cnt"),
+                func.sum(ranking_cls.upsolved_cnt).label("upsolved_cnt"),
+            )
+            .select_from(ranking_cls)
+            .join(ranking_cls.account)
+            .join(Student)
+            .join(ranking_cls.contest)
+            .where(contest_cls.end <= datetime.datetime.now(datetime.timezone.utc))
+            .group_by(Student.id, contest_cls.div)
+        )
+        if only_attendance:
+            stmt = stmt.where(Student.in_course == True)
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys()))
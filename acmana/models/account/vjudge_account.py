@@ -1,7 +1,7 @@
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import String, select
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy import String, or_, select
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
 from acmana.models import SQLBase, sqlsession
 from acmana.models.account import OJAccountBase
@@ -62,6 +62,16 @@ class VjudgeAccount(OJAccountBase, SQLBase):
 
         return sqlsession.execute(stmt).scalar_one_or_none()
 
+    @staticmethod
+    def query_from_usernames_or_ids(
+        usernames: list[str], ids: list[int], sqlsession: Session = sqlsession
+    ) -> List["VjudgeAccount"]:
+        """一次 `IN (...)` 查询取出用户名或账号 id 在其中的所有账号，代替逐个账号的 `query_from_username`"""
+        stmt = select(VjudgeAccount).where(
+            or_(VjudgeAccount.username.in_(usernames), VjudgeAccount.id.in_(ids))
+        )
+        return list(sqlsession.execute(stmt).scalars())
+
     @staticmethod
     def query_from_student_id(student_id: str) -> Optional["VjudgeAccount"]:
         """根据学号查询"""
@@ -1,13 +1,27 @@
 import datetime
+import hashlib
 import logging
-from typing import Optional
+from typing import ClassVar, Optional
 
+import numpy as np
+import pandas as pd
 import pytz
 import sqlalchemy
-from sqlalchemy import DateTime, Select, String, select
+from sqlalchemy import (
+    Boolean,
+    DateTime,
+    Integer,
+    LargeBinary,
+    Select,
+    String,
+    or_,
+    select,
+)
 from sqlalchemy.orm import Mapped, Session, mapped_column
 
+import acmana
 from acmana.models import sqlsession
+from acmana.models.contest.activity import bucket_activity
 
 
 logger = logging.getLogger(__name__)
@@ -44,6 +58,9 @@ class BeijingDatetime(sqlalchemy.types.TypeDecorator):
 class ContestBase:
     """比赛元信息的基类"""
 
+    # 是否存储了比赛期间的提交（牛客只存储补题提交），没有时不导出比赛期间的提交活跃度
+    has_contest_submissions: ClassVar[bool] = True
+
     id: Mapped[int] = mapped_column(primary_key=True)  # 该平台 api 接口的的比赛 id
     title: Mapped[str] = mapped_column(String())  # 比赛名称
     begin: Mapped[datetime.datetime] = mapped_column(BeijingDatetime())
@@ -51,6 +68,21 @@ class ContestBase:
     div: Mapped[Optional[str]] = mapped_column(
         String()
     )  # 比赛组别："div1", "div2", "div1 & div2"
+    # 以下由 `refresh_aggregates` 在爬取比赛、导入问卷时计算并存储，导出时直接读取
+    participants_num: Mapped[Optional[int]] = mapped_column(Integer())  # 比赛期间参与的人数
+    attendance_participants_num: Mapped[Optional[int]] = mapped_column(
+        Integer()
+    )  # 比赛期间参与的选课同学人数
+    # 比赛结束后已经模拟过的提交数（按时间排序），补题期间增量模拟时从这里继续；为 None 时需要完整模拟
+    processed_submissions_num: Mapped[Optional[int]] = mapped_column(Integer())
+    # 前 `processed_submissions_num` 个提交的指纹（`digest_submissions`），增量模拟之前用于检查这些提交没有变化
+    processed_submissions_digest: Mapped[Optional[str]] = mapped_column(String())
+    # 提交活跃度（比赛期间每小时、补题期间每天的提交数，选课同学与其他同学分开），参见 `bucket_activity`
+    activity: Mapped[Optional[bytes]] = mapped_column(LargeBinary())
+    # 是否已经计算过 rating（`RatingBase.update_div_ratings`），为 None 时还没有计算
+    rated: Mapped[Optional[bool]] = mapped_column(Boolean())
+    # 排名与每道题的统计的指纹，导出时不需要查询排名就可以判断这场比赛是否变化
+    standings_digest: Mapped[Optional[str]] = mapped_column(String())
 
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.title}, id: {self.id}, div: {self.div}, {self.begin} ~ {self.end})"
@@ -64,6 +96,114 @@ class ContestBase:
         sqlsession.add(self)
         sqlsession.commit()
 
+    def refresh_aggregates(
+        self,
+        sqlsession: Session = sqlsession,
+        commit: bool = True,
+        new_submissions: pd.DataFrame | None = None,
+    ):
+        """根据当前的排名和选课名单重新计算参赛人数、选课同学的「相对排名」、两种口径的得分与提交活跃度，并存储到数据库
+
+        排名或者选课名单（问卷）改变之后都需要调用
+
+        :param commit: 是否提交，为 False 时只 flush（由调用者将多场比赛一起提交）
+        :param new_submissions: 增量模拟补题时上一次爬取之后的新提交，参见 `refresh_activity`"""
+        ranking_cls = type(self).rankings.property.mapper.class_  # type: ignore
+        sqlsession.add(self)
+        sqlsession.flush()  # 让还没有提交的排名也参与计算
+        scoreboard = ranking_cls.query_contest_scoreboard(
+            self.id, sqlsession=sqlsession
+        )
+        self.participants_num = scoreboard.participants_num
+        self.attendance_participants_num = scoreboard.attendance_participants_num
+
+        attendance_rank = scoreboard.df["attendance_rank"].astype(object)
+        attendance_rank = attendance_rank.where(attendance_rank.notna(), None).to_dict()
+        score = scoreboard.df["score"].to_dict()
+        attendance_score = scoreboard.df["attendance_score"].to_dict()
+        for ranking in self.rankings:  # type: ignore
+            ranking.attendance_rank = attendance_rank[ranking.account_id]
+            ranking.score = int(score[ranking.account_id])
+            ranking.attendance_score = int(attendance_score[ranking.account_id])
+        self.refresh_activity(scoreboard.df["in_course"], new_submissions, sqlsession)
+        sqlsession.flush()
+        self.standings_digest = self._digest_standings(sqlsession)
+        if commit:
+            self.commit_to_db(sqlsession)
+        else:
+            sqlsession.flush()
+
+    def refresh_activity(
+        self,
+        in_course: pd.Series,
+        new_submissions: pd.DataFrame | None = None,
+        sqlsession: Session = sqlsession,
+    ):
+        """用存储的提交重新计算提交活跃度（每场比赛只在这里扫描一次提交），学期的活跃度直接读取 `activity`
+
+        :param in_course: 以 account_id 为 index，每个账号是否为选课同学
+        :param new_submissions: 包含 account_id, seconds 列。给出时只将这些提交（增量模拟补题时的新提交）
+            累加到已经存储的活跃度上；为 None 时（重新模拟整场比赛、选课名单改变）扫描所有存储的提交重新计算
+        """
+        if new_submissions is None:
+            submission_cls = type(self).submissions.property.mapper.class_  # type: ignore
+            submissions = submission_cls.query_contests_submissions(
+                [self.id], sqlsession=sqlsession
+            )
+        else:
+            submissions = new_submissions
+        activity = bucket_activity(
+            submissions["seconds"].to_numpy(),
+            submissions["account_id"].map(in_course).fillna(False).to_numpy(dtype=bool),
+            self.length.total_seconds(),
+            datetime.timedelta(
+                days=acmana.config["common"]["upsolve"]["expiration"]
+            ).total_seconds(),
+        )
+        if new_submissions is not None:
+            stored = (
+                np.frombuffer(self.activity, dtype=np.int32)
+                if self.activity is not None
+                else None
+            )
+            if stored is None or stored.size != activity.size:  # 旧数据库、补题有效期改变
+                self.refresh_activity(in_course, None, sqlsession)
+                return
+            activity = activity + stored.reshape(activity.shape)
+        self.activity = activity.tobytes()
+
+    def _digest_standings(self, sqlsession: Session = sqlsession) -> str:
+        """这场比赛所有排名与每道题的统计（按主键排序）的 sha1"""
+        sha1 = hashlib.sha1()
+        for relationship in (type(self).rankings, type(self).problem_stats):  # type: ignore
+            table = relationship.property.mapper.class_.__table__
+            rows = sqlsession.execute(
+                select(table)
+                .where(table.c.contest_id == self.id)
+                .order_by(*table.primary_key.columns)
+            ).all()
+            sha1.update(repr([tuple(row) for row in rows]).encode())
+        return sha1.hexdigest()
+
+    @classmethod
+    def refresh_all_aggregates(cls, sqlsession: Session = sqlsession):
+        """重新计算所有比赛的参赛人数与得分（导入问卷、选课名单改变之后调用）"""
+        for contest in sqlsession.execute(select(cls)).scalars().all():
+            contest.refresh_aggregates(sqlsession)
+
+    @classmethod
+    def refresh_missing_aggregates(cls, sqlsession: Session = sqlsession):
+        """为还没有存储参赛人数与得分（或者提交活跃度、排名的指纹）的比赛（旧数据库）计算并存储"""
+        stmt = select(cls).where(
+            or_(
+                cls.participants_num == None,
+                cls.activity == None,
+                cls.standings_digest == None,
+            )
+        )
+        for contest in sqlsession.execute(stmt).scalars().all():
+            contest.refresh_aggregates(sqlsession)
+
     @classmethod
     def _get_query_stmt(
         cls, id: int | None = None, title: str | None = None, div: str | None = None
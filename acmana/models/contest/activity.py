@@ -0,0 +1,64 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+ACTIVITY_COHORTS = ("选课同学", "其他同学")  # 活跃度数组的两行
+HOUR = 3600
+DAY = 86400
+
+
+def bucket_activity(
+    seconds: np.ndarray,
+    in_course: np.ndarray,
+    length: float,
+    expiration: float,
+) -> np.ndarray:
+    """将一场比赛的提交按时间分桶计数：比赛期间每小时一个桶，补题有效期内每天一个桶，选课同学与其他同学分别计数
+
+    :param seconds: 每个提交从比赛开始到提交的秒数
+    :param in_course: 每个提交的账号是否为选课同学
+    :param length: 比赛时长（秒）
+    :param expiration: 补题有效期（秒）
+    :return: 形状为 (2, 比赛小时数 + 补题天数) 的 int32 数组，两行依次为 `ACTIVITY_COHORTS`，超过补题有效期的提交不计入
+    """
+    hours, days = math.ceil(length / HOUR), max(math.ceil(expiration / DAY), 1)
+    width = hours + days
+    seconds = np.asarray(seconds, dtype=np.int64)
+    in_contest = (seconds >= 0) & (seconds < length)
+    in_upsolve = (seconds >= length) & (seconds <= length + expiration)
+    bucket = np.where(
+        in_contest,
+        seconds // HOUR,
+        hours + np.minimum((seconds - int(length)) // DAY, days - 1),  # 最后一刻计入最后一天
+    )
+    cohort = np.where(np.asarray(in_course, dtype=bool), 0, 1)
+    valid = in_contest | in_upsolve
+    counts = np.bincount(
+        (cohort * width + bucket)[valid], minlength=len(ACTIVITY_COHORTS) * width
+    )
+    return counts.reshape(len(ACTIVITY_COHORTS), width).astype(np.int32)
+
+
+def unpack_activity(
+    activity: bytes, length: float
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """将存储的活跃度还原为两个 DataFrame（列为 `ACTIVITY_COHORTS`）
+
+    :param activity: `bucket_activity` 的结果（`tobytes()`）
+    :param length: 比赛时长（秒），用于区分比赛期间与补题的桶
+    :return: 比赛期间每小时的提交数（index 为第几小时，从 0 开始）, 补题期间每天的提交数（index 为第几天，从 0 开始）
+    """
+    counts = np.frombuffer(activity, dtype=np.int32).reshape(len(ACTIVITY_COHORTS), -1)
+    hours = math.ceil(length / HOUR)
+    hourly = pd.DataFrame(
+        counts[:, :hours].T,
+        columns=list(ACTIVITY_COHORTS),
+        index=pd.RangeIndex(hours, name="hour"),
+    )
+    daily = pd.DataFrame(
+        counts[:, hours:].T,
+        columns=list(ACTIVITY_COHORTS),
+        index=pd.RangeIndex(counts.shape[1] - hours, name="day"),
+    )
+    return hourly, daily
@@ -10,16 +10,23 @@ from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
 from acmana.models.student import Student
 
 if TYPE_CHECKING:
+    from acmana.models.problem_stats.nowcoder_problem_stats import NowcoderProblemStats
     from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
+    from acmana.models.submission.nowcoder_submission import NowcoderSubmissionRecord
 
 
 class NowcoderContest(ContestBase, SQLBase):
     """存储牛客 所有比赛元信息 的表"""
 
     __tablename__ = "nowcoder_contest"
+    has_contest_submissions = False
     rankings: Mapped[List["NowcoderRanking"]] = relationship(
         back_populates="contest", cascade="all, delete-orphan"
     )
+    # 只用于找到存储提交的表（`refresh_activity`），提交通过 `query_contests_submissions` 查询
+    submissions: Mapped[List["NowcoderSubmissionRecord"]] = relationship(viewonly=True)
+    # 只用于找到存储每道题统计的表（`_digest_standings`）
+    problem_stats: Mapped[List["NowcoderProblemStats"]] = relationship(viewonly=True)
 
     @staticmethod
     def query_from_id(id: int) -> Optional["NowcoderContest"]:
@@ -32,29 +39,9 @@ class NowcoderContest(ContestBase, SQLBase):
     def get_competition_participants_num(self, only_attendance) -> int:
         """在比赛结束前参与的人数（当场比赛排名最大的数值）"""
         if not only_attendance:  # 所有在比赛期间参加比赛的人数
-            cnt1 = len(
-                list(filter(lambda x: x.competition_rank is not None, self.rankings))
-            )
-            cnt = (
-                sqlsession.query(NowcoderRanking)
-                .where(NowcoderRanking.contest_id == self.id)
-                .where(NowcoderRanking.competition_rank != None)
-                .count()
-            )
-            assert cnt1 == cnt
-            return cnt
+            return self.participants_num  # type: ignore
         else:
-            cnt = (
-                sqlsession.query(NowcoderRanking)
-                .join(NowcoderAccount)
-                .join(Student)
-                .where(NowcoderRanking.contest_id == self.id)
-                .where(Student.in_course == True)
-                .where(NowcoderRanking.competition_rank != None)
-                .count()
-            )
-
-            return cnt
+            return self.attendance_participants_num  # type: ignore
 
     def get_only_attendance_rankings(self) -> List["NowcoderRanking"]:
         """获取所有参加了比赛的 NowcoderRanking"""
@@ -10,7 +10,9 @@ from acmana.models.student import Student
 from acmana.models.ranking.vjudge_ranking import VjudgeRanking
 
 if TYPE_CHECKING:
+    from acmana.models.problem_stats.vjudge_problem_stats import VjudgeProblemStats
     from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+    from acmana.models.submission.vjudge_submission import VjudgeSubmissionRecord
 
 
 class VjudgeContest(ContestBase, SQLBase):
@@ -20,43 +22,17 @@ class VjudgeContest(ContestBase, SQLBase):
     rankings: Mapped[List["VjudgeRanking"]] = relationship(
         back_populates="contest", cascade="all, delete-orphan"
     )
+    # 只用于找到存储提交的表（`refresh_activity`），提交通过 `query_contests_submissions` 查询
+    submissions: Mapped[List["VjudgeSubmissionRecord"]] = relationship(viewonly=True)
+    # 只用于找到存储每道题统计的表（`_digest_standings`）
+    problem_stats: Mapped[List["VjudgeProblemStats"]] = relationship(viewonly=True)
 
     def get_competition_participants_num(self, only_attendance) -> int:
         """在比赛结束前参与的人数（当场比赛排名最大的数值）"""
         if not only_attendance:  # 所有在比赛期间参加比赛的人数
-            cnt1 = len(
-                list(filter(lambda x: x.competition_rank is not None, self.rankings))
-            )
-            cnt = (
-                sqlsession.query(VjudgeRanking)
-                .where(VjudgeRanking.contest_id == self.id)
-                .where(VjudgeRanking.competition_rank != None)
-                .count()
-            )
-            assert cnt1 == cnt
-            return cnt
+            return self.participants_num  # type: ignore
         else:
-            # cnt1 = len(
-            #     list(
-            #         filter(
-            #             lambda x: x.competition_rank is not None  # 有排名(参加了比赛)
-            #             and x.account.student  # 在 student 数据库中
-            #             and x.account.student.in_course,  # 参加了课程
-            #             self.rankings,
-            #         )
-            #     )
-            # )
-            cnt = (
-                sqlsession.query(VjudgeRanking)
-                .join(VjudgeAccount)
-                .join(Student)
-                .where(VjudgeRanking.contest_id == self.id)
-                .where(Student.in_course == True)
-                .where(VjudgeRanking.competition_rank != None)
-                .count()
-            )
-
-            return cnt
+            return self.attendance_participants_num  # type: ignore
 
     def get_only_attendance_rankings(self) -> List["VjudgeRanking"]:
         """获取所有参加了比赛的 VjudgeRanking"""
@@ -0,0 +1,91 @@
+import logging
+
+import pandas as pd
+from sqlalchemy import Float, Integer, delete, insert, select
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from acmana.models import sqlsession
+
+logger = logging.getLogger(__name__)
+
+PROBLEM_STATS_COLUMNS = (
+    "first_blood_account_id",
+    "first_blood_seconds",
+    "attempt_cnt",
+    "accepted_cnt",
+    "solved_cnt",
+    "upsolved_cnt",
+    "ac_rate",
+    "upsolve_rate",
+)
+
+
+class ProblemStatsBase:
+    """每场比赛每道题统计的基类：首杀、比赛期间的提交数与通过数、过题人数、补题人数以及由此得到的比率，
+    在模拟比赛时一起计算，导出时直接读取
+
+    子类需要定义 contest_id 与 first_blood_account_id（比赛期间第一个通过的账号，没有人通过为 None）两个外键，
+    以及 first_blood_account 关系"""
+
+    # 题号（从 0 开始）
+    problem_index: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    first_blood_seconds: Mapped[int | None] = mapped_column(Integer())  # 首杀时间（秒）
+    attempt_cnt: Mapped[int] = mapped_column(Integer())  # 比赛期间的提交数
+    accepted_cnt: Mapped[int] = mapped_column(Integer())  # 比赛期间通过的提交数
+    solved_cnt: Mapped[int] = mapped_column(Integer())  # 比赛期间通过的人数
+    upsolved_cnt: Mapped[int] = mapped_column(Integer())  # 补题通过的人数
+    ac_rate: Mapped[float | None] = mapped_column(Float())  # 通过的提交数 / 提交数
+    upsolve_rate: Mapped[float | None] = mapped_column(Float())  # 补题人数 / 比赛期间没有通过的人数
+
+    @classmethod
+    def replace_contest_stats(
+        cls, contest_id: int, stats: pd.DataFrame, sqlsession: Session = sqlsession
+    ):
+        """用新的统计替换一场比赛已有的统计（不提交）
+
+        :param stats: 以 problem_index 为 index，包含 `PROBLEM_STATS_COLUMNS` 列的 DataFrame
+        """
+        sqlsession.execute(delete(cls).where(cls.contest_id == contest_id))  # type: ignore
+        if stats.empty:
+            return
+        rows: list[dict] = [
+            dict(
+                contest_id=contest_id,
+                problem_index=int(problem_index),
+                **{
+                    column: None if pd.isna(value) else value
+                    for column, value in row.items()
+                },
+            )
+            for problem_index, row in zip(
+                stats.index,
+                stats[list(PROBLEM_STATS_COLUMNS)].astype(object).to_dict("records"),
+            )
+        ]
+        logger.debug(f"inserting {len(rows)} {cls.__name__} to db......")
+        sqlsession.execute(insert(cls), rows)
+
+    @classmethod
+    def query_contests_stats(
+        cls, contest_ids: list[int], *columns, sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """一次查询取出这些比赛所有题目的统计
+
+        :param columns: 额外需要一并查询出来的列（如首杀账号的昵称），只能来自统计与首杀账号两张表
+        :return: 以 (contest_id, problem_index) 为 index，包含 `PROBLEM_STATS_COLUMNS` 列的 DataFrame
+        """
+        stmt = (
+            select(
+                cls.contest_id,  # type: ignore
+                cls.problem_index,
+                *[getattr(cls, column) for column in PROBLEM_STATS_COLUMNS],
+                *columns,
+            )
+            .outerjoin(cls.first_blood_account)  # type: ignore
+            .where(cls.contest_id.in_(contest_ids))  # type: ignore
+            .order_by(cls.contest_id, cls.problem_index)  # type: ignore
+        )
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys())).set_index(
+            ["contest_id", "problem_index"]
+        )
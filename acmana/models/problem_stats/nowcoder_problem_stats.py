@@ -0,0 +1,27 @@
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from acmana.models import SQLBase
+from acmana.models.problem_stats import ProblemStatsBase
+
+if TYPE_CHECKING:
+    from acmana.models.account.nowcoder_account import NowcoderAccount
+
+
+class NowcoderProblemStats(ProblemStatsBase, SQLBase):
+    """存储牛客 每场比赛每道题统计 的表"""
+
+    __tablename__ = "nowcoder_problem_stats"
+
+    contest_id: Mapped[int] = mapped_column(
+        ForeignKey("nowcoder_contest.id"), primary_key=True
+    )
+    first_blood_account_id: Mapped[int | None] = mapped_column(
+        ForeignKey("nowcoder_account.id")
+    )
+    first_blood_account: Mapped[Optional["NowcoderAccount"]] = relationship()
+
+    def __repr__(self) -> str:
+        return f"NowcoderProblemStats(contest_id={self.contest_id}, problem_index={self.problem_index}, solved_cnt={self.solved_cnt}, upsolved_cnt={self.upsolved_cnt})"
@@ -0,0 +1,27 @@
+from typing import TYPE_CHECKING, Optional
+
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from acmana.models import SQLBase
+from acmana.models.problem_stats import ProblemStatsBase
+
+if TYPE_CHECKING:
+    from acmana.models.account.vjudge_account import VjudgeAccount
+
+
+class VjudgeProblemStats(ProblemStatsBase, SQLBase):
+    """存储 vjudge 每场比赛每道题统计 的表"""
+
+    __tablename__ = "vjudge_problem_stats"
+
+    contest_id: Mapped[int] = mapped_column(
+        ForeignKey("vjudge_contest.id"), primary_key=True
+    )
+    first_blood_account_id: Mapped[int | None] = mapped_column(
+        ForeignKey("vjudge_account.id")
+    )
+    first_blood_account: Mapped[Optional["VjudgeAccount"]] = relationship()
+
+    def __repr__(self) -> str:
+        return f"VjudgeProblemStats(contest_id={self.contest_id}, problem_index={self.problem_index}, solved_cnt={self.solved_cnt}, upsolved_cnt={self.upsolved_cnt})"
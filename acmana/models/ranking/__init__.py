@@ -1,14 +1,28 @@
 import datetime
 import logging
 
-from sqlalchemy import Integer, Interval, Select, select
+import pandas as pd
+from sqlalchemy import Float, Integer, Interval, Select, cast, func, select
 from sqlalchemy.orm import Mapped, Session, mapped_column
 
 from acmana.models import sqlsession
+from acmana.models.ranking.scoreboard import ContestScoreboard
+from acmana.models.student import Student
 
 logger = logging.getLogger(__name__)
 
 
+def interval_seconds(column):
+    """将 Interval 列转换为秒数的 SQL 表达式，以便在数据库中聚合罚时
+
+    SQLite 没有原生的 Interval 类型，SQLAlchemy 将其存储为 `1970-01-01 00:00:00 + 间隔` 的 DATETIME"""
+    return (
+        cast(func.strftime("%s", column), Integer)
+        + cast(func.strftime("%f", column), Float)  # 带小数的秒数
+        - cast(func.strftime("%S", column), Integer)
+    )
+
+
 class RankingBase:
     """排名信息的基类(各场比赛混在一起)"""
 
@@ -17,6 +31,12 @@ class RankingBase:
     solved_cnt: Mapped[int] = mapped_column(Integer())
     upsolved_cnt: Mapped[int] = mapped_column(Integer())  # 补题数
     penalty: Mapped[datetime.timedelta] = mapped_column(Interval())  # 罚时
+    # 以下由 `ContestBase.refresh_aggregates` 计算并存储
+    attendance_rank: Mapped[int | None] = mapped_column(Integer())  # 选课同学的「相对排名」
+    score: Mapped[int | None] = mapped_column(Integer())  # 在所有同学中的得分
+    attendance_score: Mapped[int | None] = mapped_column(Integer())  # 在选课同学中的得分
+    # 已经通过（比赛期间或者补题）的题目，第 i 位为比赛中的第 i 题，补题期间增量模拟时从这里继续
+    accepted_mask: Mapped[int | None] = mapped_column(Integer())
 
     def commit_to_db(self, sqlsession: Session = sqlsession):
         logger.info(f"commiting {self} to db......")
@@ -29,3 +49,80 @@ class RankingBase:
         if id is not None:
             stmt = stmt.where(cls.id == id)
         return stmt
+
+    @classmethod
+    def query_contest_scoreboard(
+        cls, contest_id: int, *columns, sqlsession: Session = sqlsession
+    ) -> ContestScoreboard:
+        """一次查询取出一场比赛的所有排名，并计算得分表
+
+        :param columns: 额外需要一并查询出来的列（如 Student.real_name），
+            只能来自 ranking, account, student 三张表"""
+        stmt = (
+            select(
+                cls.account_id,  # type: ignore
+                cls.competition_rank,
+                cls.upsolved_cnt,
+                Student.in_course,
+                *columns,
+            )
+            .join(cls.account)  # type: ignore
+            .outerjoin(Student)
+            .where(cls.contest_id == contest_id)  # type: ignore
+        )
+        result = sqlsession.execute(stmt)
+        return ContestScoreboard(
+            pd.DataFrame(result.all(), columns=list(result.keys()))
+        )
+
+    @classmethod
+    def query_contest_standings(
+        cls, contest_id: int, *columns, sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """一次查询取出一场比赛所有排名已经存储的排名与得分（index 为 account_id）
+
+        :param columns: 额外需要一并查询出来的列（如 Student.real_name），
+            只能来自 ranking, account, student 三张表"""
+        stmt = (
+            select(
+                cls.account_id,  # type: ignore
+                cls.competition_rank,
+                cls.attendance_rank,
+                cls.score,
+                cls.attendance_score,
+                cls.upsolved_cnt,
+                Student.in_course,
+                *columns,
+            )
+            .join(cls.account)  # type: ignore
+            .outerjoin(Student)
+            .where(cls.contest_id == contest_id)  # type: ignore
+        )
+        result = sqlsession.execute(stmt)
+        df = pd.DataFrame(result.all(), columns=list(result.keys()))
+        df = df.set_index("account_id")
+        df["in_course"] = df["in_course"].fillna(False).astype(bool)
+        df["competition_rank"] = df["competition_rank"].astype("Int64")
+        df["attendance_rank"] = df["attendance_rank"].astype("Int64")
+        return df
+
+    def _check_in_course(self) -> None:
+        if self.account.student is None or not self.account.student.in_course:  # type: ignore
+            raise ValueError(
+                f"账号 {self.account} 不是选课的同学或者不在 student 数据库中，不应该在 only_among_attendance=True 的情况下计算"  # type: ignore
+            )
+
+    def get_attendance_ranking(self) -> int | None:
+        """选课的同学的「相对排名」（排除未选课的同学）"""
+        self._check_in_course()
+        return self.attendance_rank
+
+    def get_score(self, only_among_attendance: bool) -> int:
+        """得分
+        :param: only_among_attendance: 是否只计算在课程中的同学的得分
+        :return: 得分
+        """
+        if only_among_attendance:
+            self._check_in_course()
+            return self.attendance_score  # type: ignore
+        return self.score  # type: ignore
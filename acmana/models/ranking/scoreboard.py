@@ -0,0 +1,84 @@
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+SCORE_BANDS = (0.2, 0.4, 0.6, 0.8)  # 排名百分比不超过这些分位时分别得 100, 90, 80, 70 分，其余 60 分
+UPSOLVE_WEIGHT = 6  # 每补一题的得分
+
+
+def calculate_scores(
+    rank: np.ndarray | pd.Series,
+    total: int | np.ndarray,
+    upsolved_cnt: np.ndarray | pd.Series,
+    score_bands: Sequence[float] = SCORE_BANDS,
+    upsolve_weight: int = UPSOLVE_WEIGHT,
+) -> np.ndarray:
+    """向量化计算一场比赛中每个排名的得分
+
+    :param rank: 比赛期间的排名，NaN 表示没有参加比赛
+    :param total: 参与排名的总人数（同时计算多场比赛时为每个排名所在比赛的人数）
+    :param upsolved_cnt: 补题数
+    :param score_bands: 4 个递增的排名百分比分位，参见 `SCORE_BANDS`
+    :param upsolve_weight: 参见 `UPSOLVE_WEIGHT`
+    :return: 得分（不超过 100 分）"""
+    rank = np.asarray(rank, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):  # 没有人参加比赛时 total 为 0
+        percentage = rank / total
+
+    # 1. 参加了比赛——>比赛期间得分
+    score = np.select(
+        [np.isnan(percentage)] + [percentage <= band for band in score_bands],
+        [0, 100, 90, 80, 70],
+        default=60,
+    )
+    # 2. 补题得分
+    score += np.asarray(upsolved_cnt, dtype=int) * upsolve_weight
+    return np.minimum(score, 100)
+
+
+class ContestScoreboard:
+    """一场比赛所有排名的得分表
+
+    一次性计算参赛人数、选课同学的「相对排名」以及两种口径下的得分，
+    由 `ContestBase.refresh_aggregates` 存储到数据库"""
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        """
+        :param df: 一场比赛的所有排名，需要包含 account_id, competition_rank, upsolved_cnt, in_course 列
+        """
+        self.df: pd.DataFrame = df.set_index("account_id")
+        self.df["in_course"] = self.df["in_course"].fillna(False).astype(bool)
+        competition_rank = self.df["competition_rank"].astype(float)
+
+        participated = competition_rank.notna()
+        attendance_participated = participated & self.df["in_course"]
+        self.participants_num: int = int(participated.sum())  # 在比赛结束前参与的人数
+        self.attendance_participants_num: int = int(attendance_participated.sum())
+
+        # 只计算在课程中的同学的排名（排除未选课的同学）
+        attendance_rank = competition_rank.where(attendance_participated).rank(
+            method="first"
+        )
+        self.df["competition_rank"] = competition_rank.astype("Int64")
+        self.df["attendance_rank"] = attendance_rank.astype("Int64")
+        self.df["score"] = calculate_scores(
+            competition_rank, self.participants_num, self.df["upsolved_cnt"]
+        )
+        self.df["attendance_score"] = calculate_scores(
+            attendance_rank, self.attendance_participants_num, self.df["upsolved_cnt"]
+        )
+
+    def __repr__(self) -> str:
+        return f"ContestScoreboard(participants_num={self.participants_num}, attendance_participants_num={self.attendance_participants_num}, rankings={len(self.df)})"
+
+    def in_course(self, account_id: int) -> bool:
+        return bool(self.df.at[account_id, "in_course"])
+
+    def get_attendance_ranking(self, account_id: int) -> int | None:
+        attendance_rank = self.df.at[account_id, "attendance_rank"]
+        return None if pd.isna(attendance_rank) else int(attendance_rank)
+
+    def get_score(self, account_id: int, only_among_attendance: bool) -> int:
+        column = "attendance_score" if only_among_attendance else "score"
+        return int(self.df.at[account_id, column])
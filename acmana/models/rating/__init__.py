@@ -0,0 +1,212 @@
+import datetime
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Boolean, Integer, String, func, insert, select, update
+from sqlalchemy.orm import Mapped, Session, aliased, mapped_column
+
+from acmana.models import sqlsession
+from acmana.models.rating.codeforces import INITIAL_RATING, rating_deltas
+
+logger = logging.getLogger(__name__)
+
+
+class RatingBase:
+    """rating 历史的基类：每个账号在一个 div 中参加的每场比赛一行，记录赛前赛后的 rating
+
+    一个 div 的比赛按结束时间依次计算（Codeforces 的规则，参见 `rating_deltas`），
+    每个账号最新的一行（latest）即为当前的 rating，计算新的一场比赛只需要读写这场比赛参赛者的行
+
+    子类需要定义 contest_id 与 account_id 两个外键（联合主键），以及 contest 与 account 两个关系"""
+
+    div: Mapped[str] = mapped_column(String())
+    competition_rank: Mapped[int] = mapped_column(Integer())
+    rating_before: Mapped[int] = mapped_column(Integer())  # 赛前的 rating
+    rating: Mapped[int] = mapped_column(Integer())  # 赛后的 rating
+    contests_num: Mapped[int] = mapped_column(Integer())  # 包括这场在内，在这个 div 中参加过的比赛数
+    latest: Mapped[bool] = mapped_column(Boolean())  # 是否为这个账号在这个 div 中最新的一行
+
+    @classmethod
+    def update_div_ratings(
+        cls, div: str, rebuild: bool = False, sqlsession: Session = sqlsession
+    ) -> int:
+        """按结束时间依次计算 div 中还没有计算 rating 的已结束比赛（`ContestBase.rated`），并提交
+
+        通常只有上一次计算之后新结束的比赛；如果有比已经计算过的比赛更早结束的比赛（之后才爬取），
+        从这场比赛开始重新计算
+
+        :param rebuild: 清空这个 div 的 rating 历史，重新计算所有比赛（修改 rating 规则之后）
+        :return: 这次计算的比赛数
+        """
+        contest_cls = cls.contest.property.mapper.class_  # type: ignore
+        if rebuild:
+            cls._rollback(div, None, sqlsession)
+        stmt = (
+            select(contest_cls)
+            .where(contest_cls.div == div)
+            .where(contest_cls.end <= datetime.datetime.now(datetime.timezone.utc))
+            .where(contest_cls.rated.is_not(True))
+            .order_by(contest_cls.end)
+        )
+        pending = sqlsession.execute(stmt).scalars().all()
+        if not pending:
+            return 0
+        last_end: datetime.datetime | None = sqlsession.execute(
+            select(contest_cls.end)
+            .where(contest_cls.div == div)
+            .where(contest_cls.rated == True)
+            .order_by(contest_cls.end.desc())
+            .limit(1)
+        ).scalar_one_or_none()
+        if last_end is not None and pending[0].end < last_end:
+            logger.warning(
+                f"{pending[0]} ended before the last rated contest, re-rating {div} from it......"
+            )
+            cls._rollback(div, pending[0].end, sqlsession)
+            pending = sqlsession.execute(stmt).scalars().all()
+
+        for contest in pending:
+            cls.rate_contest(contest, sqlsession)
+        sqlsession.commit()
+        return len(pending)
+
+    @classmethod
+    def rate_contest(cls, contest, sqlsession: Session = sqlsession):
+        """用参赛者（有比赛期间排名的账号）当前的 rating 计算一场比赛，写入 rating 历史（不提交）
+
+        比赛必须比这个 div 中已经计算过的比赛都晚结束"""
+        ranking_cls = type(contest).rankings.property.mapper.class_
+        participants = pd.DataFrame(
+            sqlsession.execute(
+                select(ranking_cls.account_id, ranking_cls.competition_rank)
+                .where(ranking_cls.contest_id == contest.id)
+                .where(ranking_cls.competition_rank.is_not(None))
+            ).all(),
+            columns=["account_id", "competition_rank"],
+        ).set_index("account_id")
+        account_ids: list[int] = participants.index.tolist()
+
+        previous = pd.DataFrame(
+            sqlsession.execute(
+                select(cls.account_id, cls.rating, cls.contests_num)  # type: ignore
+                .where(cls.div == contest.div)
+                .where(cls.latest == True)
+                .where(cls.account_id.in_(account_ids))  # type: ignore
+            ).all(),
+            columns=["account_id", "rating", "contests_num"],
+        ).set_index("account_id")
+        previous = previous.reindex(participants.index)
+        rating_before = previous["rating"].fillna(INITIAL_RATING).to_numpy(np.int64)
+        contests_num = previous["contests_num"].fillna(0).to_numpy(np.int64) + 1
+        deltas = rating_deltas(
+            rating_before, participants["competition_rank"].to_numpy(np.int64)
+        )
+
+        sqlsession.execute(
+            update(cls)
+            .where(cls.div == contest.div)
+            .where(cls.latest == True)
+            .where(cls.account_id.in_(account_ids))  # type: ignore
+            .values(latest=False)
+        )
+        if account_ids:
+            logger.debug(f"inserting {len(account_ids)} {cls.__name__} to db......")
+            sqlsession.execute(
+                insert(cls),
+                [
+                    dict(
+                        contest_id=contest.id,
+                        account_id=account_id,
+                        div=contest.div,
+                        competition_rank=int(competition_rank),
+                        rating_before=int(before),
+                        rating=int(before + delta),
+                        contests_num=int(num),
+                        latest=True,
+                    )
+                    for account_id, competition_rank, before, delta, num in zip(
+                        account_ids,
+                        participants["competition_rank"],
+                        rating_before,
+                        deltas,
+                        contests_num,
+                    )
+                ],
+            )
+        contest.rated = True
+        sqlsession.flush()
+
+    @classmethod
+    def _rollback(
+        cls, div: str, since: datetime.datetime | None, sqlsession: Session = sqlsession
+    ):
+        """删除 div 中 `since` 及之后结束的比赛（为 None 时所有比赛）的 rating 历史，并重新标记每个账号最新的一行（不提交）"""
+        contest_cls = cls.contest.property.mapper.class_  # type: ignore
+        stmt = select(contest_cls).where(contest_cls.div == div)
+        if since is not None:
+            stmt = stmt.where(contest_cls.end >= since)
+        contests = sqlsession.execute(stmt).scalars().all()
+        sqlsession.execute(
+            cls.__table__.delete().where(  # type: ignore
+                cls.contest_id.in_([contest.id for contest in contests])  # type: ignore
+            )
+        )
+        for contest in contests:
+            contest.rated = None
+
+        other = aliased(cls)
+        sqlsession.execute(
+            update(cls)
+            .where(cls.div == div)
+            .values(
+                latest=cls.contests_num
+                == select(func.max(other.contests_num))
+                .where(other.div == div)
+                .where(other.account_id == cls.account_id)  # type: ignore
+                .scalar_subquery()
+            )
+        )
+        sqlsession.flush()
+
+    @classmethod
+    def query_div_ratings(
+        cls, div: str, *columns, sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """一次查询取出 div 中每个账号当前的 rating
+
+        :param columns: 额外需要一并查询出来的列，只能来自 rating 与 account 两张表
+        :return: 以 account_id 为 index，包含 rating, contests_num 列的 DataFrame
+        """
+        stmt = (
+            select(cls.account_id, cls.rating, cls.contests_num, *columns)  # type: ignore
+            .join(cls.account)  # type: ignore
+            .where(cls.div == div)
+            .where(cls.latest == True)
+        )
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys())).set_index(
+            "account_id"
+        )
+
+    @classmethod
+    def query_account_history(
+        cls, div: str, account_id: int, sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """一个账号在 div 中的 rating 历史（按参加的顺序）
+
+        :return: 包含 contest_id, competition_rank, rating_before, rating 列的 DataFrame
+        """
+        stmt = (
+            select(
+                cls.contest_id,  # type: ignore
+                cls.competition_rank,
+                cls.rating_before,
+                cls.rating,
+            )
+            .where(cls.div == div)
+            .where(cls.account_id == account_id)  # type: ignore
+            .order_by(cls.contests_num)
+        )
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys()))
@@ -0,0 +1,63 @@
+import math
+
+import numpy as np
+
+INITIAL_RATING = 1500  # 第一次参加比赛之前的 rating
+MIN_RATING, MAX_RATING = 1, 8000  # 二分「期望排名对应的 rating」的范围
+BLOCK_SIZE = 1 << 20  # 每次计算的胜率矩阵最多的元素个数（8 MB）
+
+
+def _expected_seed(ratings: np.ndarray, opponents: np.ndarray) -> np.ndarray:
+    """rating 为 `ratings[i]` 的人与 `opponents` 中所有人比赛时的期望排名
+
+    按行分块计算胜率矩阵，内存只与 `BLOCK_SIZE` 和对手人数有关（每行单独求和，结果与一次计算相同）
+    """
+    seed = np.empty(len(ratings))
+    step = max(1, BLOCK_SIZE // max(1, len(opponents)))
+    for start in range(0, len(ratings), step):
+        block = ratings[start : start + step]
+        # win[i, j]：rating 为 opponents[j] 的人排在 rating 为 block[i] 的人之前的概率
+        win = 1 / (1 + np.power(10.0, (block[:, None] - opponents[None, :]) / 400))
+        seed[start : start + step] = 1 + win.sum(axis=1)
+    return seed
+
+
+def rating_deltas(ratings: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """按照 Codeforces 的规则计算一场比赛之后每个参赛者 rating 的变化
+
+    所有参赛者同时向量化计算：期望排名是 n × n 的胜率矩阵按行求和（按行分块，内存与 n 成线性），
+    「期望排名等于几何平均排名时的 rating」对所有人同时二分，代价只取决于这场比赛的参赛人数
+
+    :param ratings: 每个参赛者赛前的 rating
+    :param ranks: 每个参赛者的排名（并列排名相同，如 1, 2, 2, 4）
+    :return: 每个参赛者 rating 的变化（整数）
+    """
+    ratings = np.asarray(ratings, dtype=np.int64)
+    n = len(ratings)
+    if n < 2:
+        return np.zeros(n, dtype=np.int64)
+    # 并列时按照并列的最后一名计算
+    sorted_ranks = np.sort(np.asarray(ranks))
+    ranks = np.searchsorted(sorted_ranks, ranks, side="right")
+
+    opponents = ratings.astype(float)
+    seed = _expected_seed(opponents, opponents) - 0.5  # 去掉自己与自己（胜率 1/2）
+    mid_rank = np.sqrt(seed * ranks)
+    # 对所有人同时二分期望排名为 mid_rank 的 rating（与 Codeforces 相同，对手包括赛前的自己）
+    low = np.full(n, MIN_RATING, dtype=np.int64)
+    high = np.full(n, MAX_RATING, dtype=np.int64)
+    while (searching := high - low > 1).any():
+        mid = (low + high) // 2
+        too_high = _expected_seed(mid.astype(float), opponents) < mid_rank
+        high = np.where(searching & too_high, mid, high)
+        low = np.where(searching & ~too_high, mid, low)
+    deltas = np.trunc((low - ratings) / 2).astype(np.int64)
+
+    # 所有人的变化之和不超过 0
+    deltas += math.trunc(-deltas.sum() / n) - 1
+    # rating 最高的若干人的变化之和也不超过 0（最多每人 -10）
+    top = min(n, 4 * round(math.sqrt(n)))
+    # 与 Codeforces 相同：按 rating 从高到低，rating 相同时排名靠前的在前
+    top_sum = deltas[np.lexsort((ranks, -ratings))[:top]].sum()
+    deltas += min(max(math.trunc(-top_sum / top), -10), 0)
+    return deltas
@@ -0,0 +1,38 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from acmana.models import SQLBase
+from acmana.models.rating import RatingBase
+
+if TYPE_CHECKING:
+    from acmana.models.account.nowcoder_account import NowcoderAccount
+    from acmana.models.contest.nowcoder_contest import NowcoderContest
+
+
+class NowcoderRating(RatingBase, SQLBase):
+    """存储牛客 每个账号每场比赛 rating 历史 的表"""
+
+    __tablename__ = "nowcoder_rating"
+
+    contest_id: Mapped[int] = mapped_column(
+        ForeignKey("nowcoder_contest.id"), primary_key=True
+    )
+    contest: Mapped["NowcoderContest"] = relationship()
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("nowcoder_account.id"), primary_key=True
+    )
+    account: Mapped["NowcoderAccount"] = relationship()
+
+    def __repr__(self) -> str:
+        return f"NowcoderRating(contest_id={self.contest_id}, account_id={self.account_id}, {self.rating_before} -> {self.rating})"
+
+
+# 计算一场比赛时按照参赛者查询、更新每个账号最新的一行
+Index(
+    "nc_rating_div_account_latest",
+    NowcoderRating.div,
+    NowcoderRating.account_id,
+    NowcoderRating.latest,
+)
@@ -0,0 +1,38 @@
+from typing import TYPE_CHECKING
+
+from sqlalchemy import ForeignKey, Index
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from acmana.models import SQLBase
+from acmana.models.rating import RatingBase
+
+if TYPE_CHECKING:
+    from acmana.models.account.vjudge_account import VjudgeAccount
+    from acmana.models.contest.vjudge_contest import VjudgeContest
+
+
+class VjudgeRating(RatingBase, SQLBase):
+    """存储 vjudge 每个账号每场比赛 rating 历史 的表"""
+
+    __tablename__ = "vjudge_rating"
+
+    contest_id: Mapped[int] = mapped_column(
+        ForeignKey("vjudge_contest.id"), primary_key=True
+    )
+    contest: Mapped["VjudgeContest"] = relationship()
+    account_id: Mapped[int] = mapped_column(
+        ForeignKey("vjudge_account.id"), primary_key=True
+    )
+    account: Mapped["VjudgeAccount"] = relationship()
+
+    def __repr__(self) -> str:
+        return f"VjudgeRating(contest_id={self.contest_id}, account_id={self.account_id}, {self.rating_before} -> {self.rating})"
+
+
+# 计算一场比赛时按照参赛者查询、更新每个账号最新的一行
+Index(
+    "vj_rating_div_account_latest",
+    VjudgeRating.div,
+    VjudgeRating.account_id,
+    VjudgeRating.latest,
+)
@@ -0,0 +1,73 @@
+import hashlib
+import logging
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import Boolean, Integer, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from acmana.models import sqlsession
+
+logger = logging.getLogger(__name__)
+
+
+def digest_submissions(rows: list[tuple[int, ...]]) -> str:
+    """按照模拟顺序排列的提交（每个提交若干个整数）的 sha1
+
+    比赛结束之后与已经模拟过的提交数一起存储（`ContestBase.processed_submissions_digest`），
+    增量模拟之前对 api 中同样数量的提交计算一次并比较，不需要读取存储的提交"""
+    return hashlib.sha1(np.asarray(rows, dtype=np.int64).tobytes()).hexdigest()
+
+
+class SubmissionBase:
+    """提交记录的基类(各场比赛混在一起)：以平台的提交标识为主键，保存模拟比赛需要的全部信息，
+    之后不需要联网、不需要解析 api json 就可以重新计算排名"""
+
+    problem_id: Mapped[int] = mapped_column(Integer())
+    accepted: Mapped[bool] = mapped_column(Boolean())
+    seconds: Mapped[int] = mapped_column(Integer())  # 从比赛开始到提交的秒数
+
+    @classmethod
+    def upsert_all(cls, rows: list[dict], sqlsession: Session = sqlsession):
+        """一条 `INSERT ... ON CONFLICT DO UPDATE` 批量写入（不提交）
+
+        已经存在的提交按照主键覆盖（重测之后结果可能改变），重复写入同一批提交结果不变"""
+        if not rows:
+            return
+        logger.debug(f"upserting {len(rows)} {cls.__name__} to db......")
+        primary_key: list[str] = [
+            column.name for column in cls.__table__.primary_key.columns  # type: ignore
+        ]
+        stmt = insert(cls)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=primary_key,
+            set_={
+                column.name: stmt.excluded[column.name]
+                for column in cls.__table__.columns  # type: ignore
+                if column.name not in primary_key
+            },
+        )
+        sqlsession.execute(stmt, rows)
+
+    @classmethod
+    def query_contests_submissions(
+        cls, contest_ids: list[int], sqlsession: Session = sqlsession
+    ) -> pd.DataFrame:
+        """一次查询取出这些比赛的所有提交（每场比赛按照提交顺序排序）
+
+        :return: 包含 contest_id, account_id, problem_id, accepted, seconds 列的 DataFrame
+        """
+        stmt = (
+            select(
+                cls.contest_id,  # type: ignore
+                cls.account_id,  # type: ignore
+                cls.problem_id,
+                cls.accepted,
+                cls.seconds,
+            )
+            .where(cls.contest_id.in_(contest_ids))  # type: ignore
+            .order_by(cls.contest_id, *cls.__table__.primary_key.columns)  # type: ignore
+        )
+        result = sqlsession.execute(stmt)
+        return pd.DataFrame(result.all(), columns=list(result.keys()))
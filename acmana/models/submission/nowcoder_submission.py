@@ -0,0 +1,30 @@
+from sqlalchemy import ForeignKey, Index, delete
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from acmana.models import SQLBase, sqlsession
+from acmana.models.submission import SubmissionBase
+
+
+class NowcoderSubmissionRecord(SubmissionBase, SQLBase):
+    """存储牛客 所有比赛提交 的表(目前只有爬取的补题提交)，以牛客 api 的提交 id 作为主键"""
+
+    __tablename__ = "nowcoder_submission"
+
+    id: Mapped[int] = mapped_column(primary_key=True)  # 牛客 api 的提交 id
+    contest_id: Mapped[int] = mapped_column(ForeignKey("nowcoder_contest.id"))
+    account_id: Mapped[int] = mapped_column(ForeignKey("nowcoder_account.id"))
+
+    def __repr__(self) -> str:
+        return f"NowcoderSubmissionRecord(id={self.id}, contest_id={self.contest_id}, account_id={self.account_id}, problem_id={self.problem_id}, accepted={self.accepted}, seconds={self.seconds})"
+
+    @staticmethod
+    def delete_contest_submissions(contest_id: int, sqlsession: Session = sqlsession):
+        """删除一场比赛的所有提交（重新模拟所有补题之前，api 中的提交可能变少，不提交）"""
+        sqlsession.execute(
+            delete(NowcoderSubmissionRecord).where(
+                NowcoderSubmissionRecord.contest_id == contest_id
+            )
+        )
+
+
+Index("nowcoder_submission_contest", NowcoderSubmissionRecord.contest_id)
@@ -0,0 +1,32 @@
+from sqlalchemy import ForeignKey, Integer, delete
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from acmana.models import SQLBase, sqlsession
+from acmana.models.submission import SubmissionBase
+
+
+class VjudgeSubmissionRecord(SubmissionBase, SQLBase):
+    """存储 vjudge 所有比赛提交 的表
+
+    vjudge 排名 api 中的提交没有提交 id，以 (比赛 id, 提交按时间排序后的序号) 作为提交的标识，
+    与 `ContestBase.processed_submissions_num` 使用同一个顺序"""
+
+    __tablename__ = "vjudge_submission"
+
+    contest_id: Mapped[int] = mapped_column(
+        ForeignKey("vjudge_contest.id"), primary_key=True
+    )
+    seq: Mapped[int] = mapped_column(Integer(), primary_key=True)
+    account_id: Mapped[int] = mapped_column(ForeignKey("vjudge_account.id"))
+
+    def __repr__(self) -> str:
+        return f"VjudgeSubmissionRecord(contest_id={self.contest_id}, seq={self.seq}, account_id={self.account_id}, problem_id={self.problem_id}, accepted={self.accepted}, seconds={self.seconds})"
+
+    @staticmethod
+    def delete_from_seq(contest_id: int, seq: int, sqlsession: Session = sqlsession):
+        """删除一场比赛中序号不小于 `seq` 的提交（api 中的提交变少时，不提交）"""
+        sqlsession.execute(
+            delete(VjudgeSubmissionRecord)
+            .where(VjudgeSubmissionRecord.contest_id == contest_id)
+            .where(VjudgeSubmissionRecord.seq >= seq)
+        )
@@ -0,0 +1,45 @@
+import unittest
+
+import numpy as np
+
+from acmana.models.contest.activity import bucket_activity, unpack_activity
+
+LENGTH = 5 * 3600 - 60  # 不足整小时的部分算作最后一个小时
+EXPIRATION = 7 * 86400
+
+
+class TestActivity(unittest.TestCase):
+    def test_bucket_activity(self):
+        """比赛期间按小时、补题期间按天分桶，选课同学与其他同学分别计数"""
+        seconds = np.array(
+            [
+                0,  # 第 1 小时
+                3599,  # 第 1 小时
+                LENGTH - 1,  # 第 5 小时
+                LENGTH,  # 补题第 1 天
+                LENGTH + 86400,  # 补题第 2 天
+                LENGTH + EXPIRATION,  # 有效期的最后一刻：补题第 7 天
+                LENGTH + EXPIRATION + 1,  # 超过补题有效期
+            ]
+        )
+        in_course = np.array([True, False, True, True, False, False, True])
+        activity = bucket_activity(seconds, in_course, LENGTH, EXPIRATION)
+        self.assertEqual(activity.shape, (2, 5 + 7))
+        self.assertEqual(activity.sum(), 6)
+
+        hourly, daily = unpack_activity(activity.tobytes(), LENGTH)
+        self.assertEqual(hourly["选课同学"].tolist(), [1, 0, 0, 0, 1])
+        self.assertEqual(hourly["其他同学"].tolist(), [1, 0, 0, 0, 0])
+        self.assertEqual(daily["选课同学"].tolist(), [1, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(daily["其他同学"].tolist(), [0, 1, 0, 0, 0, 0, 1])
+
+    def test_empty(self):
+        empty = np.zeros(0, dtype=np.int64)
+        activity = bucket_activity(empty, empty.astype(bool), LENGTH, 0)
+        hourly, daily = unpack_activity(activity.tobytes(), LENGTH)
+        self.assertEqual((len(hourly), len(daily)), (5, 1))
+        self.assertEqual(activity.sum(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
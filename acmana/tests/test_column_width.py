@@ -0,0 +1,21 @@
+import unittest
+
+import pandas as pd
+
+from acmana.export.column_width import column_width, display_widths
+
+
+class TestColumnWidth(unittest.TestCase):
+    def test_display_widths(self):
+        """中文、全角字符占 2 个宽度，空值按字符串 `None` 计算"""
+        series = pd.Series(["张三", "ab", "", "（测试）x", None, 12, "ＡＢ"])
+        self.assertEqual(display_widths(series).tolist(), [4, 2, 0, 9, 4, 2, 4])
+
+    def test_column_width(self):
+        """列宽取最宽的单元格与列名中较大者"""
+        self.assertEqual(column_width(pd.Series(["李四（选课）"], name="姓名")), 12)
+        self.assertEqual(column_width(pd.Series([], name="Nickname", dtype=object)), 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,15 +2,19 @@ import datetime
 import logging
 import unittest
 
+import pandas as pd
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from acmana.models import SQLBase
 from acmana.models.account.vjudge_account import VjudgeAccount
 from acmana.models.contest.vjudge_contest import VjudgeContest
+from acmana.models.problem_stats.vjudge_problem_stats import VjudgeProblemStats
 from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
 from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+from acmana.models.rating.vjudge_rating import VjudgeRating
 from acmana.models.student import Student
+from acmana.models.submission.vjudge_submission import VjudgeSubmissionRecord
 
 logger = logging.getLogger(__name__)
 
@@ -78,6 +82,7 @@ class TestRankingDB(unittest.TestCase):
 
     def tearDown(self):
         logger.info("Finished, Dropping all tables......")
+        self.testsqlsession.close()  # 丢弃失败的事务与已加载的对象
         SQLBase.metadata.drop_all(self.engine)
         pass
 
@@ -101,6 +106,256 @@ class TestRankingDB(unittest.TestCase):
             self.testsqlsession,
         )
 
+    def test_query_contest_rankings(self):
+        """一次查询取出一场比赛已有的所有排名"""
+        rankings = VjudgeRanking.query_contest_rankings(
+            self.contest1.id, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(list(rankings), [self.student1.vjudge_account.id])  # type: ignore
+        self.assertIs(
+            rankings[self.student1.vjudge_account.id],  # type: ignore
+            self.student1_vj_contest1_ranking,
+        )
+        self.assertEqual(
+            VjudgeRanking.query_contest_rankings(-1, sqlsession=self.testsqlsession),
+            {},
+        )
+
+    def test_query_accounts_in_bulk(self):
+        """批量插入账号后，一次查询按用户名或账号 id 取出"""
+        VjudgeAccount.commit_all_to_db(
+            [
+                VjudgeAccount(username="bulk_a", id=20001),
+                VjudgeAccount(username="bulk_b", id=20002),
+            ],
+            self.testsqlsession,
+        )
+        accounts = VjudgeAccount.query_from_usernames_or_ids(
+            usernames=["bulk_a", "student1_vjudge_username", "not_exists"],
+            ids=[20002],
+            sqlsession=self.testsqlsession,
+        )
+        self.assertEqual(
+            sorted(account.id for account in accounts), [15354, 20001, 20002]
+        )
+
+    def test_contest_scoreboard(self):
+        """选课同学的「相对排名」与得分"""
+        VjudgeAccount(  # 未选课（不在 student 数据库中）且排名第一的同学
+            username="unregistered_vjudge_username", id=15355
+        ).commit_to_db(self.testsqlsession)
+        self.student1_vj_contest1_ranking.competition_rank = 2
+        for account_id, competition_rank, upsolved_cnt in (
+            (15355, 1, 0),
+            (15356, None, 2),  # 没有参加比赛，只补题
+        ):
+            if account_id == 15356:
+                VjudgeAccount(username="upsolve_only", id=account_id).commit_to_db(
+                    self.testsqlsession
+                )
+            VjudgeRanking(
+                account_id=account_id,
+                contest_id=self.contest1.id,
+                competition_rank=competition_rank,
+                solved_cnt=1,
+                upsolved_cnt=upsolved_cnt,
+                penalty=datetime.timedelta(minutes=10),
+            ).commit_to_db(self.testsqlsession)
+
+        scoreboard = VjudgeRanking.query_contest_scoreboard(
+            self.contest1.id, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(scoreboard.participants_num, 2)
+        self.assertEqual(scoreboard.attendance_participants_num, 1)
+
+        student1_account_id = self.student1.vjudge_account.id  # type: ignore
+        self.assertTrue(scoreboard.in_course(student1_account_id))
+        self.assertEqual(scoreboard.get_attendance_ranking(student1_account_id), 1)
+        self.assertEqual(scoreboard.get_score(student1_account_id, False), 66)
+        self.assertEqual(scoreboard.get_score(student1_account_id, True), 66)
+        self.assertIsNone(scoreboard.get_attendance_ranking(15355))
+        self.assertEqual(scoreboard.get_score(15355, False), 80)
+        self.assertEqual(scoreboard.get_score(15356, False), 12)
+
+        # 存储到数据库之后直接读取
+        self.contest1.refresh_aggregates(self.testsqlsession)
+        self.assertEqual(self.contest1.get_competition_participants_num(False), 2)
+        self.assertEqual(self.contest1.get_competition_participants_num(True), 1)
+        self.assertEqual(self.student1_vj_contest1_ranking.get_attendance_ranking(), 1)
+        self.assertEqual(self.student1_vj_contest1_ranking.get_score(True), 66)
+        standings = VjudgeRanking.query_contest_standings(
+            self.contest1.id, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(standings.at[15355, "score"], 80)
+        self.assertTrue(standings["attendance_rank"].isna()[15355])
+
+    def test_student_totals_by_div(self):
+        """按学号、比赛组别汇总得分"""
+        self.contest1.refresh_aggregates(self.testsqlsession)
+        totals = VjudgeAccount.query_student_totals_by_div(
+            True, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(
+            totals.to_dict("records"),
+            [
+                {
+                    "student_id": self.student1.id,
+                    "div": "div1",
+                    "score": 66,  # 1/1 名：60 分 + 补题 6 分
+                    "solved_cnt": 3,
+                    "upsolved_cnt": 1,
+                }
+            ],
+        )
+
+    def test_upsert_submissions(self):
+        """重复写入同一批提交结果不变，已经存在的提交被覆盖"""
+        account_id = self.student1.vjudge_account.id  # type: ignore
+        submissions = [
+            dict(
+                contest_id=self.contest1.id,
+                seq=seq,
+                account_id=account_id,
+                problem_id=seq,
+                accepted=False,
+                seconds=60 * seq,
+            )
+            for seq in range(3)
+        ]
+        VjudgeSubmissionRecord.upsert_all(submissions, self.testsqlsession)
+        VjudgeSubmissionRecord.upsert_all(submissions, self.testsqlsession)
+        submissions[1]["accepted"] = True  # 重测
+        VjudgeSubmissionRecord.upsert_all(submissions[1:2], self.testsqlsession)
+        self.testsqlsession.commit()
+
+        stored = VjudgeSubmissionRecord.query_contests_submissions(
+            [self.contest1.id], sqlsession=self.testsqlsession
+        )
+        self.assertEqual(stored["problem_id"].tolist(), [0, 1, 2])
+        self.assertEqual(stored["accepted"].tolist(), [False, True, False])
+
+        VjudgeSubmissionRecord.delete_from_seq(
+            self.contest1.id, 2, sqlsession=self.testsqlsession
+        )
+        stored = VjudgeSubmissionRecord.query_contests_submissions(
+            [self.contest1.id], sqlsession=self.testsqlsession
+        )
+        self.assertEqual(stored["seconds"].tolist(), [0, 60])
+
+    def test_replace_problem_stats(self):
+        """重新模拟之后替换一场比赛已有的统计，首杀账号的信息可以一并查询"""
+        account_id = self.student1.vjudge_account.id  # type: ignore
+        stats = pd.DataFrame(
+            {
+                "first_blood_account_id": pd.array([account_id, None], dtype="Int64"),
+                "first_blood_seconds": pd.array([600, None], dtype="Int64"),
+                "attempt_cnt": [3, 0],
+                "accepted_cnt": [1, 0],
+                "solved_cnt": [1, 0],
+                "upsolved_cnt": [0, 1],
+                "ac_rate": [1 / 3, float("nan")],
+                "upsolve_rate": [0.0, 0.5],
+            },
+            index=pd.Index([0, 1], name="problem_index"),
+        )
+        VjudgeProblemStats.replace_contest_stats(
+            self.contest1.id, stats, self.testsqlsession
+        )
+        VjudgeProblemStats.replace_contest_stats(
+            self.contest1.id, stats.iloc[1:], self.testsqlsession
+        )
+        self.testsqlsession.commit()
+
+        stored = VjudgeProblemStats.query_contests_stats(
+            [self.contest1.id], VjudgeAccount.username, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(stored.index.tolist(), [(self.contest1.id, 1)])
+        self.assertIsNone(stored.iloc[0]["username"])
+        self.assertIsNone(stored.iloc[0]["ac_rate"])
+
+        VjudgeProblemStats.replace_contest_stats(
+            self.contest1.id, stats, self.testsqlsession
+        )
+        stored = VjudgeProblemStats.query_contests_stats(
+            [self.contest1.id], VjudgeAccount.username, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(
+            stored["username"].tolist(),
+            [self.student1.vjudge_account.username, None],  # type: ignore
+        )
+        self.assertEqual(stored["attempt_cnt"].tolist(), [3, 0])
+
+    def test_update_ratings(self):
+        """按结束时间依次计算 rating，只计算新结束的比赛；更早结束的比赛之后才出现时从它开始重新计算"""
+        VjudgeAccount(username="rating_b", id=15355).commit_to_db(self.testsqlsession)
+        VjudgeAccount(username="rating_c", id=15356).commit_to_db(self.testsqlsession)
+        for account_id, competition_rank in ((15355, 2), (15356, None)):  # 15356 只补题
+            VjudgeRanking(
+                account_id=account_id,
+                contest_id=self.contest1.id,
+                competition_rank=competition_rank,
+                solved_cnt=1,
+                upsolved_cnt=1,
+                penalty=datetime.timedelta(minutes=10),
+            ).commit_to_db(self.testsqlsession)
+
+        def add_contest(contest_id: int, days: int, ranks: dict[int, int]):
+            contest = VjudgeContest(
+                id=contest_id,
+                title=f"rating 测试 {contest_id}",
+                div="div1",
+                begin=self.contest1.begin + datetime.timedelta(days=days),
+                end=self.contest1.end + datetime.timedelta(days=days),
+            )
+            contest.commit_to_db(self.testsqlsession)
+            for account_id, competition_rank in ranks.items():
+                VjudgeRanking(
+                    account_id=account_id,
+                    contest_id=contest_id,
+                    competition_rank=competition_rank,
+                    solved_cnt=1,
+                    upsolved_cnt=0,
+                    penalty=datetime.timedelta(minutes=10),
+                ).commit_to_db(self.testsqlsession)
+
+        def update(rebuild: bool = False) -> int:
+            return VjudgeRating.update_div_ratings(
+                "div1", rebuild=rebuild, sqlsession=self.testsqlsession
+            )
+
+        def current() -> dict[int, tuple[int, int]]:
+            ratings = VjudgeRating.query_div_ratings(
+                "div1", sqlsession=self.testsqlsession
+            )
+            return {
+                account_id: (row["rating"], row["contests_num"])
+                for account_id, row in ratings.iterrows()
+            }
+
+        self.assertEqual(update(), 1)
+        ratings = current()
+        self.assertEqual(set(ratings), {15354, 15355})  # 只补题的账号不计算 rating
+        self.assertEqual(ratings, {15354: (1565, 1), 15355: (1433, 1)})
+        self.assertEqual(update(), 0)  # 已经计算过的比赛不重新计算
+
+        add_contest(9002, 14, {15355: 1, 15356: 1, 15354: 3})
+        self.assertEqual(update(), 1)
+        add_contest(9001, 7, {15356: 1, 15354: 2})  # 更早结束的比赛之后才爬取
+        self.assertEqual(update(), 2)
+        incremental = current()
+        self.assertEqual(incremental[15356][1], 2)
+        self.assertEqual(incremental[15354][1], 3)
+        history = VjudgeRating.query_account_history(
+            "div1", 15354, sqlsession=self.testsqlsession
+        )
+        self.assertEqual(history["contest_id"].tolist(), [self.contest1.id, 9001, 9002])
+        self.assertEqual(
+            history["rating_before"].tolist()[1:], history["rating"].tolist()[:-1]
+        )
+
+        self.assertEqual(update(rebuild=True), 3)
+        self.assertEqual(current(), incremental)
+
 
 if __name__ == "__main__":
     unittest.main()
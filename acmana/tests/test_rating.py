@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from acmana.models.rating.codeforces import rating_deltas
+
+# 按照 Codeforces 的算法逐个参赛者计算的结果
+ALL_1500_DELTAS = [
+    174, 133, 109, 91, 77, 66, 56, 47, 39, 32,
+    25, 19, 13, 7, 2, -3, -8, -13, -18, -22,
+    -26, -30, -34, -38, -42, -46, -50, -54, -58, -61,
+    -65, -69, -72, -76, -80, -83, -87, -91, -94, -98,
+]  # fmt: skip
+
+
+class TestRating(unittest.TestCase):
+    def test_rating_deltas(self):
+        """与 Codeforces 的结果完全相同，包括并列的排名与相同的 rating"""
+        self.assertEqual(
+            rating_deltas(np.array([1500, 1500]), np.array([1, 2])).tolist(), [65, -67]
+        )
+        self.assertEqual(
+            rating_deltas(
+                np.array([1500, 1500, 1600, 1400, 1500, 1700]),
+                np.array([2, 1, 1, 4, 5, 5]),
+            ).tolist(),
+            [25, 68, 42, 19, -62, -94],
+        )
+        self.assertEqual(
+            rating_deltas(np.full(40, 1500), np.arange(1, 41)).tolist(),
+            ALL_1500_DELTAS,
+        )
+
+    def test_rating_deltas_order(self):
+        """结果与参赛者的顺序无关（rating 相同时按排名决定 rating 最高的若干人）"""
+        permutation = np.random.default_rng(0).permutation(40)
+        deltas = rating_deltas(np.full(40, 1500), np.arange(1, 41)[permutation])
+        self.assertEqual(
+            deltas.tolist(), np.array(ALL_1500_DELTAS)[permutation].tolist()
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
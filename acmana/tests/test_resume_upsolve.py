@@ -0,0 +1,315 @@
+import random
+import unittest
+from unittest import mock
+
+import pandas as pd
+from sqlalchemy import create_engine, select
+
+import acmana
+import acmana.crawler.nowcoder.contest as nowcoder_contest_crawler
+from acmana.crawler.vjudge.contest import VjudgeContestCrawler
+from acmana.crawler.vjudge.contest.parallel_simulation import (
+    simulate_contests_in_parallel,
+)
+from acmana.models import SQLBase, sqlsession
+from acmana.models.contest.nowcoder_contest import NowcoderContest
+from acmana.models.contest.vjudge_contest import VjudgeContest
+from acmana.models.problem_stats.nowcoder_problem_stats import NowcoderProblemStats
+from acmana.models.problem_stats.vjudge_problem_stats import VjudgeProblemStats
+from acmana.models.ranking.nowcoder_ranking import NowcoderRanking
+from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+
+BEGIN_MS = 1700000000000
+LENGTH = 5 * 3600
+DAY = 86400
+
+
+class TestResumeUpsolve(unittest.TestCase):
+    """比赛结束之后增量模拟补题（从存储的排名、题目状态、每道题的统计与活跃度继续）与完整模拟的结果一致
+
+    爬虫使用全局的 `sqlsession`，这里将其切换到内存数据库"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        SQLBase.metadata.create_all(self.engine)
+        sqlsession.close()
+        self.bind = sqlsession.bind
+        sqlsession.bind = self.engine
+        self.incremental = mock.patch.dict(
+            acmana.config["common"]["upsolve"], {"incremental": True}
+        )
+        self.incremental.start()
+
+    def tearDown(self):
+        self.incremental.stop()
+        sqlsession.close()
+        sqlsession.bind = self.bind
+        self.engine.dispose()
+
+    def _vjudge_submissions(self) -> list[list[int]]:
+        """按时间排序的提交：比赛期间、补题有效期内与超过有效期"""
+        rng = random.Random(0)
+        submissions = [
+            [
+                900000 + rng.randrange(12),
+                rng.randrange(5),
+                int(rng.random() < 0.4),
+                rng.choice(
+                    [
+                        rng.randrange(LENGTH),
+                        LENGTH + rng.randrange(8 * DAY),
+                    ]
+                ),
+            ]
+            for _ in range(300)
+        ]
+        return sorted(submissions, key=lambda submission: submission[3])
+
+    def _crawl_vjudge(self, contest_id: int, submissions: list[list[int]]):
+        metadata = {
+            "id": contest_id,
+            "title": f"resume {contest_id}",
+            "isReplay": False,
+            "length": LENGTH * 1000,
+            "begin": BEGIN_MS,
+            "participants": {
+                str(900000 + i): [f"resume_user{i}", f"nick{i}"] for i in range(12)
+            },
+            "submissions": submissions,
+        }
+        with mock.patch.object(
+            VjudgeContestCrawler, "crawl_ranking_metadata_json", return_value=metadata
+        ), mock.patch.object(
+            VjudgeContestCrawler,
+            "_simulate_upsolve_incrementally",
+            autospec=True,
+            side_effect=VjudgeContestCrawler._simulate_upsolve_incrementally,
+        ) as simulate_upsolve_incrementally:
+            crawler = VjudgeContestCrawler(contest_id, "div1")
+            crawler.db_vjudge_contest.commit_to_db()
+        return simulate_upsolve_incrementally.called
+
+    def _vjudge_result(self, contest_id: int) -> tuple[dict, pd.DataFrame, bytes]:
+        sqlsession.expire_all()
+        rankings = {
+            account_id: (
+                ranking.competition_rank,
+                ranking.solved_cnt,
+                ranking.upsolved_cnt,
+                ranking.penalty,
+                ranking.score,
+                ranking.accepted_mask,
+            )
+            for account_id, ranking in VjudgeRanking.query_contest_rankings(
+                contest_id
+            ).items()
+        }
+        stats = VjudgeProblemStats.query_contests_stats([contest_id])
+        activity = sqlsession.get(VjudgeContest, contest_id).activity
+        return rankings, stats.droplevel("contest_id"), activity
+
+    def assertSameResult(self, result, expected):
+        self.assertEqual(result[0], expected[0])
+        pd.testing.assert_frame_equal(result[1], expected[1])
+        self.assertEqual(result[2], expected[2])
+
+    def test_vjudge_resume(self):
+        """先模拟一部分补题，再从存储的状态继续模拟剩下的提交"""
+        submissions = self._vjudge_submissions()
+        self.assertFalse(self._crawl_vjudge(1, submissions))
+        processed = len(submissions) - 60  # 最后 60 个提交都是补题
+        self.assertGreater(submissions[processed][3], LENGTH)
+        self._crawl_vjudge(2, submissions[:processed])
+        self.assertTrue(self._crawl_vjudge(2, submissions))
+        self.assertSameResult(self._vjudge_result(2), self._vjudge_result(1))
+
+    def test_vjudge_resume_fallback(self):
+        """上一次爬取之后出现比赛期间的提交、或者提交变少时，重新模拟整场比赛"""
+        submissions = self._vjudge_submissions()
+        in_contest = next(
+            i for i, submission in enumerate(submissions) if submission[2]
+        )
+        self._crawl_vjudge(1, submissions)
+        self._crawl_vjudge(2, submissions[:in_contest] + submissions[in_contest + 1 :])
+        self.assertFalse(self._crawl_vjudge(2, submissions))
+        self.assertSameResult(self._vjudge_result(2), self._vjudge_result(1))
+
+        shrunken = submissions[:-30]
+        self._crawl_vjudge(3, shrunken)
+        self.assertFalse(self._crawl_vjudge(2, shrunken))
+        self.assertSameResult(self._vjudge_result(2), self._vjudge_result(3))
+
+        # 已经模拟过的补题提交被重测
+        rejudged = [list(submission) for submission in shrunken]
+        rejudged[-10][2] = 1 - rejudged[-10][2]
+        self._crawl_vjudge(4, rejudged)
+        self.assertFalse(self._crawl_vjudge(2, rejudged))
+        self.assertSameResult(self._vjudge_result(2), self._vjudge_result(4))
+
+    def test_vjudge_resume_in_parallel(self):
+        """并行模拟时可以增量模拟的比赛在父进程中继续模拟，是否可以继续只判断一次"""
+        submissions = self._vjudge_submissions()
+        processed = len(submissions) - 60
+        self._crawl_vjudge(1, submissions)
+        self._crawl_vjudge(2, submissions[:processed])
+        metadata = {
+            contest_id: {
+                "id": contest_id,
+                "title": f"resume {contest_id}",
+                "isReplay": False,
+                "length": LENGTH * 1000,
+                "begin": BEGIN_MS,
+                "participants": {
+                    str(900000 + i): [f"resume_user{i}", f"nick{i}"] for i in range(12)
+                },
+                "submissions": submissions,
+            }
+            for contest_id in (2, 3)
+        }
+        with mock.patch.object(
+            VjudgeContestCrawler,
+            "crawl_ranking_metadata_json",
+            autospec=True,
+            side_effect=lambda crawler: metadata[crawler._contest_id],
+        ), mock.patch.object(
+            VjudgeContestCrawler,
+            "_digest_submissions",
+            autospec=True,
+            side_effect=VjudgeContestCrawler._digest_submissions,
+        ) as digest_submissions:
+            crawlers = [
+                VjudgeContestCrawler(contest_id, "div1", simulate=False)
+                for contest_id in (2, 3)
+            ]
+            simulate_contests_in_parallel(crawlers, max_workers=1)
+        self.assertEqual(
+            [call.args[1] for call in digest_submissions.call_args_list],
+            [processed, len(submissions), len(submissions)],
+        )  # 继续模拟前检查一次，两场比赛模拟之后各存储一次
+        self.assertTrue(crawlers[0].resume_upsolve)
+        self.assertFalse(crawlers[1].resume_upsolve)
+        self.assertSameResult(self._vjudge_result(2), self._vjudge_result(1))
+        self.assertSameResult(self._vjudge_result(3), self._vjudge_result(1))
+
+    def _nowcoder_data(self) -> tuple[list[dict], list[dict]]:
+        """比赛期间的排名（api 中只有汇总的结果）与按时间排序的补题提交，包括只补题的账号"""
+        rng = random.Random(0)
+        api_ranking_list = []
+        for rank, uid in enumerate(range(100, 110), start=1):
+            score_list = [
+                dict(
+                    problemId=9000 + problem,
+                    accepted=rng.random() < 0.4,
+                    failedCount=rng.randrange(3),
+                    acceptedTime=BEGIN_MS + rng.randrange(LENGTH) * 1000,
+                )
+                for problem in range(4)
+            ]
+            api_ranking_list.append(
+                dict(
+                    uid=uid,
+                    userName=f"u{uid}",
+                    ranking=rank,
+                    acceptedCount=sum(problem["accepted"] for problem in score_list),
+                    penaltyTime=60000 * rank,
+                    scoreList=score_list,
+                )
+            )
+        upsolve_submissions = [
+            dict(
+                submissionId=5000 + i,
+                userId=100 + rng.randrange(13),
+                userName="upsolver",
+                problemId=9000 + rng.randrange(4),
+                statusMessage="答案正确" if rng.random() < 0.5 else "答案错误",
+                submitTime=BEGIN_MS + (LENGTH + 60 * (i + 1)) * 1000,
+            )
+            for i in range(80)
+        ]
+        return api_ranking_list, upsolve_submissions
+
+    def _crawl_nowcoder(
+        self, contest_id: int, api_ranking_list: list[dict], upsolve_submissions: list
+    ) -> bool:
+        """与 `app.retrive_nowcoder_contests` 相同：先获取比赛期间的排名，再模拟补题
+
+        :return: 是否增量模拟了补题"""
+
+        async def fetch_contest_ranking(contest_id):
+            return api_ranking_list
+
+        metadata = {
+            "name": f"resume {contest_id}",
+            "startTime": BEGIN_MS,
+            "endTime": BEGIN_MS + LENGTH * 1000,
+        }
+        crawler_cls = nowcoder_contest_crawler.NowcoderContestCrawler
+        with mock.patch.object(
+            crawler_cls, "crawl_contest_metadata_json", return_value=metadata
+        ), mock.patch.object(
+            crawler_cls, "get_upsolve_info", return_value=list(upsolve_submissions)
+        ), mock.patch.object(
+            nowcoder_contest_crawler, "fetch_contest_ranking", fetch_contest_ranking
+        ):
+            crawler = crawler_cls(contest_id, "div1")
+            crawler.get_competition_ranking()
+            crawler.db_nowcoder_contest.commit_to_db()
+            crawler.simulate_contest()
+        return crawler.resume_upsolve
+
+    def _nowcoder_result(self, contest_id: int) -> tuple[dict, pd.DataFrame, bytes]:
+        sqlsession.expire_all()
+        rankings = {
+            ranking.account_id: (
+                ranking.competition_rank,
+                ranking.solved_cnt,
+                ranking.upsolved_cnt,
+                ranking.score,
+                ranking.accepted_mask,
+            )
+            for ranking in sqlsession.execute(
+                select(NowcoderRanking).where(NowcoderRanking.contest_id == contest_id)
+            ).scalars()
+        }
+        stats = NowcoderProblemStats.query_contests_stats([contest_id])
+        activity = sqlsession.get(NowcoderContest, contest_id).activity
+        return rankings, stats.droplevel("contest_id"), activity
+
+    def test_nowcoder_resume(self):
+        """先模拟一部分补题，再从存储的状态继续模拟剩下的提交"""
+        api_ranking_list, upsolve_submissions = self._nowcoder_data()
+        self.assertFalse(self._crawl_nowcoder(1, api_ranking_list, upsolve_submissions))
+        self._crawl_nowcoder(2, api_ranking_list, upsolve_submissions[:50])
+        self.assertTrue(self._crawl_nowcoder(2, api_ranking_list, upsolve_submissions))
+        self.assertSameResult(self._nowcoder_result(2), self._nowcoder_result(1))
+
+    def test_nowcoder_resume_fallback(self):
+        """补题提交比上一次爬取时少时，在建立排名之前改为重新模拟所有补题"""
+        api_ranking_list, upsolve_submissions = self._nowcoder_data()
+        shrunken = upsolve_submissions[:50]
+        self._crawl_nowcoder(1, api_ranking_list, shrunken)
+        self._crawl_nowcoder(2, api_ranking_list, upsolve_submissions)
+        self.assertFalse(self._crawl_nowcoder(2, api_ranking_list, shrunken))
+        self.assertSameResult(self._nowcoder_result(2), self._nowcoder_result(1))
+
+    def test_nowcoder_resume_changed_submissions(self):
+        """已经模拟过的补题提交被重测、或者删除之后又有新的提交（数量不变）时，重新模拟所有补题"""
+        api_ranking_list, upsolve_submissions = self._nowcoder_data()
+        rejudged = [dict(submission) for submission in upsolve_submissions]
+        rejudged[10]["statusMessage"] = (
+            "答案错误" if rejudged[10]["statusMessage"] == "答案正确" else "答案正确"
+        )
+        replaced = upsolve_submissions[:10] + upsolve_submissions[11:]
+        replaced.append(dict(upsolve_submissions[10], submissionId=9999))
+        self._crawl_nowcoder(1, api_ranking_list, rejudged)
+        self._crawl_nowcoder(2, api_ranking_list, replaced)
+        for contest_id, changed in ((1, rejudged), (2, replaced)):
+            self._crawl_nowcoder(3, api_ranking_list, upsolve_submissions)
+            self.assertFalse(self._crawl_nowcoder(3, api_ranking_list, changed))
+            self.assertSameResult(
+                self._nowcoder_result(3), self._nowcoder_result(contest_id)
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
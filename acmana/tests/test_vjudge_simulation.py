@@ -0,0 +1,345 @@
+import unittest
+from multiprocessing import shared_memory
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+from acmana.crawler.vjudge.contest import VjudgeContestCrawler
+from acmana.crawler.vjudge.contest.parallel_simulation import (
+    _from_records,
+    _simulate_in_worker,
+)
+from acmana.crawler.vjudge.contest.vjudge_simulation import (
+    StandingsTimeline,
+    simulate_contests,
+    simulate_submissions,
+)
+from acmana.models import SQLBase, sqlsession
+from acmana.models.problem_stats.vjudge_problem_stats import VjudgeProblemStats
+from acmana.models.ranking.vjudge_ranking import VjudgeRanking
+
+LENGTH = 5 * 3600
+EXPIRATION = 7 * 86400
+
+
+class TestVjudgeSimulation(unittest.TestCase):
+    def test_simulate_submissions(self):
+        submissions = np.array(
+            [
+                # account, problem, accepted, seconds
+                [1, 0, 0, 600],  # 错误一次
+                [1, 0, 1, 1200],  # 通过：1200 + 20min
+                [1, 0, 0, 1300],  # 通过后的错误提交不计入罚时
+                [1, 1, 1, LENGTH + 60],  # 补题
+                [2, 0, 1, 1800],  # 罚时比账号 1 少
+                [2, 1, 1, LENGTH + 8 * 86400],  # 超过补题有效期
+                [3, 0, 1, LENGTH + 60],  # 只补题，不参与排名
+                [4, 0, 1, LENGTH],  # 比赛结束时刻提交：参与排名，但算作补题
+            ]
+        )
+        result = simulate_submissions(
+            account_ids=submissions[:, 0],
+            problem_ids=submissions[:, 1],
+            accepted=submissions[:, 2].astype(bool),
+            seconds=submissions[:, 3],
+            length=LENGTH,
+            expiration=EXPIRATION,
+        )
+        self.assertEqual(
+            result["competition_rank"].fillna(0).tolist(), [2, 1, 0, 3]
+        )  # 0: 不参与排名
+        self.assertEqual(result["solved_cnt"].tolist(), [1, 1, 0, 0])
+        self.assertEqual(result["upsolved_cnt"].tolist(), [1, 0, 1, 1])
+        self.assertEqual(result["penalty_seconds"].tolist(), [2400, 1800, 0, 0])
+        self.assertEqual(
+            result["accepted_mask"].tolist(), [0b11, 0b01, 0b01, 0b01]
+        )  # 超过补题有效期的通过不计入
+
+    def test_problem_stats(self):
+        """每道题的首杀、比赛期间的提交数与通过数、过题与补题人数"""
+        submissions = np.array(
+            [
+                # account, problem, accepted, seconds
+                [1, 0, 0, 600],
+                [1, 0, 1, 1200],  # 首杀
+                [1, 0, 0, 1300],
+                [2, 0, 1, 1200],  # 时间相同，但在 api 中的顺序靠后
+                [3, 0, 1, LENGTH + 60],  # 补题
+                [1, 1, 1, LENGTH + 60],  # 补题
+                [2, 1, 1, LENGTH + 8 * 86400],  # 超过补题有效期
+                [2, 2, 1, LENGTH + 8 * 86400],  # 只有超过补题有效期的提交，不统计
+            ]
+        )
+        _, problem_stats = simulate_submissions(
+            account_ids=submissions[:, 0],
+            problem_ids=submissions[:, 1],
+            accepted=submissions[:, 2].astype(bool),
+            seconds=submissions[:, 3],
+            length=LENGTH,
+            expiration=EXPIRATION,
+            with_problem_stats=True,
+        )
+        self.assertEqual(problem_stats.index.tolist(), [0, 1])
+        self.assertEqual(problem_stats.loc[0, "first_blood_account_id"], 1)
+        self.assertEqual(problem_stats.loc[0, "first_blood_seconds"], 1200)
+        self.assertTrue(pd.isna(problem_stats.loc[1, "first_blood_account_id"]))
+        self.assertEqual(problem_stats["attempt_cnt"].tolist(), [4, 0])
+        self.assertEqual(problem_stats["accepted_cnt"].tolist(), [2, 0])
+        self.assertEqual(problem_stats["solved_cnt"].tolist(), [2, 0])
+        self.assertEqual(problem_stats["upsolved_cnt"].tolist(), [1, 1])
+        self.assertEqual(problem_stats.loc[0, "ac_rate"], 0.5)
+        self.assertTrue(np.isnan(problem_stats.loc[1, "ac_rate"]))
+        # 3 个有提交的账号中比赛期间没有通过的人数分别为 1、3
+        self.assertEqual(problem_stats["upsolve_rate"].tolist(), [1.0, 1 / 3])
+
+    def test_tie_broken_by_account_id(self):
+        """过题数、罚时都相同时按照账号 id 排序"""
+        result = simulate_submissions(
+            account_ids=np.array([7, 5]),
+            problem_ids=np.array([0, 0]),
+            accepted=np.array([True, True]),
+            seconds=np.array([60, 60]),
+            length=LENGTH,
+            expiration=EXPIRATION,
+        )
+        self.assertEqual(result.loc[5, "competition_rank"], 1)
+        self.assertEqual(result.loc[7, "competition_rank"], 2)
+
+    def test_simulate_contests(self):
+        """一次模拟多场比赛，每场比赛的结果与单独模拟一致（账号在不同比赛中分别统计、排名）"""
+        rng = np.random.default_rng(2)
+        n = 3000
+        columns = dict(
+            contest_index=rng.integers(0, 3, n),
+            account_ids=rng.integers(0, 40, n),
+            problem_ids=rng.integers(0, 10, n),
+            accepted=rng.random(n) < 0.3,
+            seconds=rng.integers(0, 2 * LENGTH, n),
+        )
+        length = np.array([LENGTH, LENGTH / 2, 2 * LENGTH])
+        expiration = np.array([EXPIRATION, 600, 0])
+        result = simulate_contests(
+            length=length, expiration=expiration, wrong_attempt_penalty=600, **columns
+        )
+        for i in range(3):
+            in_contest = columns["contest_index"] == i
+            expected = simulate_submissions(
+                length=length[i],
+                expiration=expiration[i],
+                wrong_attempt_penalty=600,
+                **{
+                    key: value[in_contest]
+                    for key, value in columns.items()
+                    if key != "contest_index"
+                },
+            )
+            pd.testing.assert_frame_equal(result.xs(i, level="contest_index"), expected)
+
+    def test_simulate_contests_problem_stats(self):
+        """一次模拟多场比赛时每道题的统计与单独模拟一致"""
+        rng = np.random.default_rng(3)
+        n = 3000
+        columns = dict(
+            contest_index=rng.integers(0, 3, n),
+            account_ids=rng.integers(0, 40, n),
+            problem_ids=rng.integers(0, 10, n),
+            accepted=rng.random(n) < 0.3,
+            seconds=rng.integers(0, 2 * LENGTH, n),
+        )
+        length = np.array([LENGTH, LENGTH / 2, 2 * LENGTH])
+        expiration = np.array([EXPIRATION, 600, 0])
+        _, problem_stats = simulate_contests(
+            length=length, expiration=expiration, with_problem_stats=True, **columns
+        )
+        for i in range(3):
+            in_contest = columns["contest_index"] == i
+            _, expected = simulate_submissions(
+                length=length[i],
+                expiration=expiration[i],
+                with_problem_stats=True,
+                **{
+                    key: value[in_contest]
+                    for key, value in columns.items()
+                    if key != "contest_index"
+                },
+            )
+            pd.testing.assert_frame_equal(
+                problem_stats.xs(i, level="contest_index"), expected
+            )
+
+
+class TestStandingsTimeline(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        self.columns = dict(
+            account_ids=rng.integers(0, 50, n),
+            problem_ids=rng.integers(0, 10, n),
+            accepted=rng.random(n) < 0.3,
+            seconds=rng.integers(0, LENGTH + 3600, n),
+        )
+
+    def test_final_standings(self):
+        """终榜与一次性模拟的结果一致"""
+        final = StandingsTimeline(length=LENGTH, **self.columns).standings_at(LENGTH)
+        result = simulate_submissions(
+            length=LENGTH, expiration=EXPIRATION, **self.columns
+        )
+        result = result[result["competition_rank"].notna()].sort_values(
+            "competition_rank"
+        )
+        self.assertEqual(final.index.tolist(), result.index.tolist())
+        self.assertEqual(
+            final["competition_rank"].tolist(), result["competition_rank"].tolist()
+        )
+        self.assertEqual(final["solved_cnt"].tolist(), result["solved_cnt"].tolist())
+        self.assertEqual(
+            final["penalty_seconds"].tolist(), result["penalty_seconds"].tolist()
+        )
+
+    def test_standings_at(self):
+        """任意时刻的排名与只模拟这一时刻之前的提交一致（与检查点间隔无关）"""
+        for checkpoint_interval in (1, 7, None):
+            timeline = StandingsTimeline(
+                length=LENGTH, checkpoint_interval=checkpoint_interval, **self.columns
+            )
+            for t in (0, 60, 3600, 4 * 3600 + 1):
+                before = self.columns["seconds"] <= t
+                truncated = simulate_submissions(
+                    length=LENGTH,
+                    expiration=EXPIRATION,
+                    **{key: value[before] for key, value in self.columns.items()},
+                ).sort_values("competition_rank")
+                standings = timeline.standings_at(t)
+                self.assertEqual(standings.index.tolist(), truncated.index.tolist())
+                self.assertEqual(
+                    standings["solved_cnt"].tolist(), truncated["solved_cnt"].tolist()
+                )
+                self.assertEqual(
+                    standings["penalty_seconds"].tolist(),
+                    truncated["penalty_seconds"].tolist(),
+                )
+
+    def test_empty(self):
+        empty = np.zeros(0, dtype=np.int64)
+        standings = StandingsTimeline(
+            empty, empty, empty.astype(bool), empty, LENGTH
+        ).standings_at(LENGTH)
+        self.assertTrue(standings.empty)
+
+
+class TestParallelSimulation(unittest.TestCase):
+    def test_simulate_in_shared_memory(self):
+        """在共享内存中的一段提交上模拟，结果与直接模拟一致"""
+        rng = np.random.default_rng(1)
+        submissions = np.column_stack(
+            [
+                rng.integers(0, 30, 1000),
+                rng.integers(0, 8, 1000),
+                rng.random(1000) < 0.3,
+                rng.integers(0, LENGTH + 86400, 1000),
+            ]
+        ).astype(np.int64)
+        shm = shared_memory.SharedMemory(create=True, size=submissions.nbytes)
+        try:
+            np.ndarray(submissions.shape, dtype=np.int64, buffer=shm.buf)[
+                :
+            ] = submissions
+            records, problem_stats = _simulate_in_worker(
+                shm.name, len(submissions), 200, 700, LENGTH, EXPIRATION
+            )
+        finally:
+            shm.close()
+            shm.unlink()
+
+        expected, expected_problem_stats = simulate_submissions(
+            account_ids=submissions[200:700, 0],
+            problem_ids=submissions[200:700, 1],
+            accepted=submissions[200:700, 2].astype(bool),
+            seconds=submissions[200:700, 3],
+            length=LENGTH,
+            expiration=EXPIRATION,
+            with_problem_stats=True,
+        )
+        pd.testing.assert_frame_equal(_from_records(records), expected)
+        pd.testing.assert_frame_equal(problem_stats, expected_problem_stats)
+
+
+class TestSimulationEngines(unittest.TestCase):
+    """随机的比赛分别用 numpy 与逐个提交（object）两种方式模拟，存储的排名与每道题的统计一致
+
+    爬虫使用全局的 `sqlsession`，这里将其切换到内存数据库"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite:///:memory:")
+        SQLBase.metadata.create_all(self.engine)
+        sqlsession.close()
+        self.bind = sqlsession.bind
+        sqlsession.bind = self.engine
+
+    def tearDown(self):
+        sqlsession.close()
+        sqlsession.bind = self.bind
+        self.engine.dispose()
+
+    def _crawl(self, contest_id: int, engine: str, submissions: np.ndarray):
+        metadata = {
+            "id": contest_id,
+            "title": f"engine {contest_id}",
+            "isReplay": False,
+            "length": LENGTH * 1000,
+            "begin": 1700000000000,
+            "participants": {
+                str(800000 + i): [f"engine_user{i}", f"nick{i}"] for i in range(30)
+            },
+            "submissions": submissions.tolist(),
+        }
+        with mock.patch.object(
+            VjudgeContestCrawler, "crawl_ranking_metadata_json", return_value=metadata
+        ):
+            crawler = VjudgeContestCrawler(contest_id, "div1", engine=engine)
+            crawler.db_vjudge_contest.commit_to_db()
+
+    def _result(self, contest_id: int) -> tuple[dict, pd.DataFrame]:
+        sqlsession.expire_all()
+        rankings = {
+            account_id: (
+                ranking.competition_rank,
+                ranking.solved_cnt,
+                ranking.upsolved_cnt,
+                ranking.penalty,
+                ranking.accepted_mask,
+            )
+            for account_id, ranking in VjudgeRanking.query_contest_rankings(
+                contest_id
+            ).items()
+        }
+        stats = VjudgeProblemStats.query_contests_stats([contest_id])
+        return rankings, stats.droplevel("contest_id")
+
+    def test_numpy_and_object_engines(self):
+        for seed in range(10):
+            rng = np.random.default_rng(seed)
+            n = int(rng.integers(1, 400))
+            submissions = np.column_stack(
+                [
+                    800000 + rng.integers(0, 30, n),
+                    rng.integers(0, 6, n),
+                    rng.random(n) < 0.3,
+                    # 按分钟提交，制造罚时相同、提交时间相同的情况；包括补题与超过补题有效期的提交
+                    60 * rng.integers(0, (LENGTH + 9 * 86400) // 60, n),
+                ]
+            )
+            with self.subTest(seed=seed):
+                self._crawl(2 * seed + 1, "object", submissions)
+                self._crawl(2 * seed + 2, "numpy", submissions)
+                rankings, stats = self._result(2 * seed + 1)
+                numpy_rankings, numpy_stats = self._result(2 * seed + 2)
+                self.assertEqual(numpy_rankings, rankings)
+                pd.testing.assert_frame_equal(numpy_stats, stats)
+
+
+if __name__ == "__main__":
+    unittest.main()
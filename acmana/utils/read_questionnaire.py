@@ -9,6 +9,8 @@ from acmana.crawler.nowcoder.user_info import get_nowcoder_nickname
 from acmana.crawler.vjudge.user_info import get_vjudge_nickname, get_vjudge_user_id
 from acmana.models.account.nowcoder_account import NowcoderAccount
 from acmana.models.account.vjudge_account import VjudgeAccount
+from acmana.models.contest.nowcoder_contest import NowcoderContest
+from acmana.models.contest.vjudge_contest import VjudgeContest
 from acmana.models.student import Student
 
 logger = logging.getLogger(__name__)
@@ -186,6 +188,10 @@ def read_questionnaire_update_db():
 
     asyncio.run(main())
 
+    # 选课名单可能改变，重新计算所有比赛选课同学的「相对排名」与得分
+    VjudgeContest.refresh_all_aggregates()
+    NowcoderContest.refresh_all_aggregates()
+
 
 if __name__ == "__main__":
     read_questionnaire_update_db()